@@ -0,0 +1,177 @@
+"""
+Bit-packed assessment answers.
+
+An AnswerSet holds one integer bitmask per answer option: bit q of the mask
+for option 'B' is set when question q was answered 'B'. Sixty questions fit
+in a machine word per option, so scoring is a handful of AND + popcount
+operations against per-trait masks (see traits.py) instead of a walk over
+a dict of strings.
+
+Sessions and cohort job files store the compact text form from encode()
+('A=1f0c...;B=e0f3...'). AnswerSet.coerce() also accepts the older
+{question number: option} dicts, so existing sessions keep working.
+"""
+from question_bank import load_question_bank
+
+_QUESTION_BANK = load_question_bank()
+OPTIONS = _QUESTION_BANK.option_keys
+MAX_QUESTION = _QUESTION_BANK.total_questions
+_OPTION_SLOTS = {option: slot for slot, option in enumerate(OPTIONS)}
+# Bits 1..MAX_QUESTION; bit 0 is never used, so bit q is question q
+_VALID_BITS = ((1 << (MAX_QUESTION + 1)) - 1) & ~1
+# Question bit for each key in the two spellings answer dicts use, so from_dict() needs no int() parsing
+_QUESTION_BITS = {key: 1 << number for number in range(1, MAX_QUESTION + 1) for key in (number, str(number))}
+# Per option, a bytes.translate() table turning an answer string into '1' where it chose
+# that option and '0' elsewhere (only possible when every option key is one character)
+_VECTOR_TABLES = None
+if all(len(option) == 1 and option.isascii() for option in OPTIONS):
+    _VECTOR_TABLES = []
+    for _option in OPTIONS:
+        _table = bytearray(b'0' * 256)
+        _table[ord(_option)] = ord('1')
+        _VECTOR_TABLES.append(bytes(_table))
+
+
+def _question_number(question):
+    """Returns `question` (int or numeric str) as an int in 1..MAX_QUESTION, or None."""
+    if isinstance(question, str):
+        try:
+            question = int(question)
+        except ValueError:
+            return None
+    if isinstance(question, int) and 0 < question <= MAX_QUESTION:
+        return question
+    return None
+
+
+class AnswerSet:
+    """A set of answers, one bitmask per option in OPTIONS order. Treated as immutable (it is hashable)."""
+
+    __slots__ = ('masks',)
+
+    def __init__(self, masks=None):
+        masks = tuple(masks) if masks is not None else (0,) * len(OPTIONS)
+        if len(masks) != len(OPTIONS):
+            raise ValueError(f"Expected {len(OPTIONS)} option masks, got {len(masks)}")
+        self.masks = masks
+
+    # --- Construction ---
+    @classmethod
+    def from_dict(cls, answers) -> 'AnswerSet':
+        """
+        Builds an AnswerSet from {question number (int or str): option}.
+        Unknown questions and options are ignored, as they carry no trait.
+        """
+        masks = [0] * len(OPTIONS)
+        for question, option in (answers or {}).items():
+            slot = _OPTION_SLOTS.get(option)
+            if slot is None:
+                continue
+            bit = _QUESTION_BITS.get(question)
+            if bit is None:
+                # Other spellings, e.g. ' 7' or '07'
+                number = _question_number(question)
+                if number is None:
+                    continue
+                bit = 1 << number
+            masks[slot] |= bit
+        return cls(masks)
+
+    @classmethod
+    def from_vector(cls, vector: str) -> 'AnswerSet':
+        """Builds an AnswerSet from a string whose character i answers question i + 1 (others = unanswered)."""
+        vector = vector[:MAX_QUESTION]
+        if _VECTOR_TABLES is not None and vector:
+            # One C-level pass per option: the reversed '0'/'1' string is the mask (shifted past bit 0)
+            reversed_bytes = vector[::-1].encode('ascii', 'replace')
+            return cls(int(reversed_bytes.translate(table), 2) << 1 for table in _VECTOR_TABLES)
+        masks = [0] * len(OPTIONS)
+        for number, option in enumerate(vector, start=1):
+            slot = _OPTION_SLOTS.get(option)
+            if slot is not None:
+                masks[slot] |= 1 << number
+        return cls(masks)
+
+    @classmethod
+    def decode(cls, text: str) -> 'AnswerSet':
+        """Parses the encode() form. Raises ValueError if it is malformed."""
+        masks = [0] * len(OPTIONS)
+        if text:
+            for part in text.split(';'):
+                option, _, mask = part.partition('=')
+                if option not in _OPTION_SLOTS:
+                    raise ValueError(f"Unknown option '{option}' in encoded answers")
+                masks[_OPTION_SLOTS[option]] = int(mask, 16) & _VALID_BITS
+        # A question claimed by several options keeps the first one
+        seen = 0
+        for slot, mask in enumerate(masks):
+            masks[slot] = mask & ~seen
+            seen |= mask
+        return cls(masks)
+
+    @classmethod
+    def coerce(cls, answers) -> 'AnswerSet':
+        """Returns `answers` (an AnswerSet, its encode() form, a dict of answers or None) as an AnswerSet."""
+        if isinstance(answers, cls):
+            return answers
+        if isinstance(answers, str):
+            return cls.decode(answers)
+        return cls.from_dict(answers)
+
+    def encode(self) -> str:
+        """Returns the compact text form stored in sessions, e.g. 'A=1f0c;B=e0f2'."""
+        return ';'.join(f'{option}={mask:x}' for option, mask in zip(OPTIONS, self.masks) if mask)
+
+    # --- Queries ---
+    @property
+    def answered(self) -> int:
+        """Bitmask of the answered questions."""
+        answered = 0
+        for mask in self.masks:
+            answered |= mask
+        return answered
+
+    def get(self, question, default=None):
+        """Returns the option chosen for `question`, or `default`."""
+        number = _question_number(question)
+        if number is not None:
+            bit = 1 << number
+            for option, mask in zip(OPTIONS, self.masks):
+                if mask & bit:
+                    return option
+        return default
+
+    def with_answers(self, answers) -> 'AnswerSet':
+        """Returns a copy with `answers` ({question: option}) added, replacing earlier answers to those questions."""
+        update = AnswerSet.from_dict(answers)
+        replaced = update.answered
+        return AnswerSet(mask & ~replaced | new for mask, new in zip(self.masks, update.masks))
+
+    def items(self):
+        """Returns [(question number, option)] in question order."""
+        chosen = [None] * (MAX_QUESTION + 1)
+        for option, mask in zip(OPTIONS, self.masks):
+            # bin() reversed is the mask least significant bit first, i.e. indexed by question number
+            for number, bit in enumerate(bin(mask)[:1:-1]):
+                if bit == '1':
+                    chosen[number] = option
+        return [(number, option) for number, option in enumerate(chosen) if option is not None]
+
+    def to_dict(self) -> dict:
+        """Returns {question number (str): option}, the shape used before AnswerSet."""
+        return {str(number): option for number, option in self.items()}
+
+    def __len__(self):
+        return self.answered.bit_count()
+
+    def __bool__(self):
+        return any(self.masks)
+
+    def __eq__(self, other):
+        return isinstance(other, AnswerSet) and self.masks == other.masks
+
+    def __hash__(self):
+        return hash(self.masks)
+
+    def __repr__(self):
+        return f"AnswerSet({self.encode()!r})"
@@ -1,18 +1,37 @@
-from flask import Flask, render_template, request, redirect, session, send_file, flash, jsonify
-import google.generativeai as genai
+from flask import Flask, render_template, request, redirect, session, send_file, flash, jsonify, url_for, abort, Response, stream_with_context, g
 from dotenv import load_dotenv
+from markupsafe import Markup
 import os
 import io
-from fpdf import FPDF
+import hashlib
+import hmac
+from functools import wraps
 from config import Config
-import re
 import markdown
-import json
 import uuid
-from collections import defaultdict, Counter
-from pydantic import BaseModel, Field, ValidationError
-from typing import List, Optional
+from pydantic import ValidationError
+from models import FinalSuggestionModel
 import time
+from llm_client import LLMClient, CircuitBreaker, LazyModel
+from jobs import create_job_backend, JOB_DONE, JOB_FAILED, JOB_PENDING, JOB_RUNNING
+from suggestion_cache import SuggestionCache, make_cache_key
+from similarity_cache import SimilarityCache, make_partition_key
+from session_store import create_session_store
+from singleflight import SingleFlight
+from report_stream import ReportProgress, progress_events, MARKDOWN_RENDER_SECONDS
+from report_fanout import generate_sections, generate_personalized
+from suggestion_repair import SuggestionRepairer
+from server_session import ServerSideSessionInterface
+from artifact_store import ArtifactStore, make_artifact_key
+from static_assets import StaticAssets
+import response_compression
+from question_bank import load_question_bank
+from local_recommender import load_career_profiles
+from answer_set import AnswerSet
+from traits import TRAIT_NAMES, score_answers, get_trait_summary
+from cohort import CohortJob, CohortError, parse_cohort, run_cohort
+from batch_reports import iter_report_entries, stream_report_zip
+import metrics
 
 load_dotenv() # Load environment variables from .env
 
@@ -29,353 +48,204 @@ else:
 # --- END DEBUGGING ---
 
 # Gemini setup
-API_KEY = os.getenv('GEMINI_API_KEY')
-if not API_KEY:
-    raise ValueError("GEMINI_API_KEY not found in environment variables.")
-genai.configure(api_key=API_KEY)
-# We will use the model to get the response.
 # The user's original code used 'gemini-2.0-flash', so we will stick to that.
-model = genai.GenerativeModel('gemini-2.0-flash')
-
-# Define the path to your fonts directory (assuming 'fonts' folder is at the root)
-FONTS_DIR = os.path.join(os.path.dirname(__file__), 'fonts')
-
-# --- TRAIT MAPPING FOR DYNAMIC CALCULATION ---
-TRAIT_MAPPING = {
-    1: {'A': 'Logical Reasoning & Problem Solving', 'B': 'Creative Arts & Design'},
-    2: {'A': 'Organization & Planning', 'B': 'Adaptability & Flexibility'},
-    3: {'A': 'Emotional Intelligence & Empathy', 'B': 'Analytical & Critical Thinking'},
-    4: {'A': 'Leadership & Influence', 'B': 'Supportive & Collaborative Nature'},
-    5: {'A': 'Numerical & Quantitative Skills', 'B': 'Creative Arts & Design'},
-    6: {'A': 'Logical Reasoning & Problem Solving', 'B': 'Creative Arts & Design'},
-    7: {'A': 'Organization & Planning', 'B': 'Adaptability & Flexibility'},
-    8: {'A': 'Emotional Intelligence & Empathy', 'B': 'Analytical & Critical Thinking'},
-    9: {'A': 'Leadership & Influence', 'B': 'Supportive & Collaborative Nature'},
-    10: {'A': 'Numerical & Quantitative Skills', 'B': 'Creative Arts & Design'},
-    11: {'A': 'Analytical & Critical Thinking', 'B': 'Creative Arts & Design'},
-    12: {'A': 'Organization & Planning', 'B': 'Adaptability & Flexibility'},
-    13: {'A': 'Emotional Intelligence & Empathy', 'B': 'Analytical & Critical Thinking'},
-    14: {'A': 'Communication & Persuasion', 'B': 'Supportive & Collaborative Nature'},
-    15: {'A': 'Numerical & Quantitative Skills', 'B': 'Creative Arts & Design'},
-    16: {'A': 'Logical Reasoning & Problem Solving', 'B': 'Creative Arts & Design'},
-    17: {'A': 'Organization & Planning', 'B': 'Adaptability & Flexibility'},
-    18: {'A': 'Emotional Intelligence & Empathy', 'B': 'Analytical & Critical Thinking'},
-    19: {'A': 'Leadership & Influence', 'B': 'Supportive & Collaborative Nature'},
-    20: {'A': 'Numerical & Quantitative Skills', 'B': 'Creative Arts & Design'},
-    21: {'A': 'STEM & Technical Aptitude', 'B': 'Creative Arts & Design'},
-    22: {'A': 'Organization & Planning', 'B': 'Adaptability & Flexibility'},
-    23: {'A': 'Emotional Intelligence & Empathy', 'B': 'Analytical & Critical Thinking'},
-    24: {'A': 'Leadership & Influence', 'B': 'Supportive & Collaborative Nature'},
-    25: {'A': 'Numerical & Quantitative Skills', 'B': 'Creative Arts & Design'},
-    26: {'A': 'STEM & Technical Aptitude', 'B': 'Creative Arts & Design'},
-    27: {'A': 'Organization & Planning', 'B': 'Adaptability & Flexibility'},
-    28: {'A': 'Emotional Intelligence & Empathy', 'B': 'Analytical & Critical Thinking'},
-    29: {'A': 'Leadership & Influence', 'B': 'Supportive & Collaborative Nature'},
-    30: {'A': 'Numerical & Quantitative Skills', 'B': 'Creative Arts & Design'},
-    31: {'A': 'Analytical & Critical Thinking', 'B': 'Creative Arts & Design'},
-    32: {'A': 'Organization & Planning', 'B': 'Adaptability & Flexibility'},
-    33: {'A': 'Emotional Intelligence & Empathy', 'B': 'Analytical & Critical Thinking'},
-    34: {'A': 'Leadership & Influence', 'B': 'Supportive & Collaborative Nature'},
-    35: {'A': 'Numerical & Quantitative Skills', 'B': 'Creative Arts & Design'},
-    36: {'A': 'Logical Reasoning & Problem Solving', 'B': 'Research & Knowledge Exploration'},
-    37: {'A': 'Organization & Planning', 'B': 'Adaptability & Flexibility'},
-    38: {'A': 'Emotional Intelligence & Empathy', 'B': 'Analytical & Critical Thinking'},
-    39: {'A': 'Leadership & Influence', 'B': 'Supportive & Collaborative Nature'},
-    40: {'A': 'Numerical & Quantitative Skills', 'B': 'Creative Arts & Design'},
-    41: {'A': 'STEM & Technical Aptitude', 'B': 'Creative Arts & Design'},
-    42: {'A': 'Organization & Planning', 'B': 'Adaptability & Flexibility'},
-    43: {'A': 'Emotional Intelligence & Empathy', 'B': 'Analytical & Critical Thinking'},
-    44: {'A': 'Leadership & Influence', 'B': 'Supportive & Collaborative Nature'},
-    45: {'A': 'Numerical & Quantitative Skills', 'B': 'Business & Entrepreneurship'},
-    46: {'A': 'Logical Reasoning & Problem Solving', 'B': 'Creative Arts & Design'},
-    47: {'A': 'Organization & Planning', 'B': 'Adaptability & Flexibility'},
-    48: {'A': 'Emotional Intelligence & Empathy', 'B': 'Analytical & Critical Thinking'},
-    49: {'A': 'Leadership & Influence', 'B': 'Supportive & Collaborative Nature'},
-    50: {'A': 'Numerical & Quantitative Skills', 'B': 'Creative Arts & Design'},
-    51: {'A': 'Hands-on & Mechanical Skills', 'B': 'Creative Arts & Design'},
-    52: {'A': 'Organization & Planning', 'B': 'Adaptability & Flexibility'},
-    53: {'A': 'Emotional Intelligence & Empathy', 'B': 'Analytical & Critical Thinking'},
-    54: {'A': 'Communication & Persuasion', 'B': 'Supportive & Collaborative Nature'},
-    55: {'A': 'Numerical & Quantitative Skills', 'B': 'Creative Arts & Design'},
-    56: {'A': 'Organization & Planning', 'B': 'Research & Knowledge Exploration'},
-    57: {'A': 'Organization & Planning', 'B': 'Adaptability & Flexibility'},
-    58: {'A': 'Emotional Intelligence & Empathy', 'B': 'Analytical & Critical Thinking'},
-    59: {'A': 'Leadership & Influence', 'B': 'Supportive & Collaborative Nature'},
-    60: {'A': 'Numerical & Quantitative Skills', 'B': 'Creative Arts & Design'},
-}
-
-def calculate_top_traits(user_answers, top_n=5):
-    """
-    Calculate the top traits based on user answers to the assessment questions.
-    
-    Args:
-        user_answers (dict): Dictionary with question numbers as keys and 'A' or 'B' as values
-                            e.g., {1: 'A', 2: 'B', 3: 'A', ...}
-        top_n (int): Number of top traits to return (default: 5)
-    
-    Returns:
-        list: List of top N trait strings
-    """
-    trait_counts = Counter()
-    
-    # Count occurrences of each trait based on user answers
-    for question_num, answer in user_answers.items():
-        question_int = int(question_num) if isinstance(question_num, str) else question_num
-        if question_int in TRAIT_MAPPING and answer in TRAIT_MAPPING[question_int]:
-            trait = TRAIT_MAPPING[question_int][answer]
-            trait_counts[trait] += 1
-    
-    # Get the top N traits
-    top_traits = [trait for trait, count in trait_counts.most_common(top_n)]
-    
-    return top_traits
+GEMINI_MODEL_NAME = 'gemini-2.0-flash'
+if app.config['LLM_BACKEND'] == 'fake':
+    # Offline stand-in for load tests; never calls the API
+    from fake_gemini import FakeGeminiModel
+    model = FakeGeminiModel.from_config(app.config)
+elif app.config['LLM_BACKEND'] == 'gemini':
+    API_KEY = os.getenv('GEMINI_API_KEY')
+    if not API_KEY:
+        raise ValueError("GEMINI_API_KEY not found in environment variables.")
+
+    def _create_gemini_model():
+        import google.generativeai as genai
+        genai.configure(api_key=API_KEY, transport=app.config['GEMINI_TRANSPORT'])
+        # We will use the model to get the response.
+        return genai.GenerativeModel(GEMINI_MODEL_NAME)
+    # Imported and configured on the first generation (or by warm_up()), not by every worker at startup
+    model = LazyModel(_create_gemini_model)
+else:
+    raise ValueError(f"Unknown LLM_BACKEND '{app.config['LLM_BACKEND']}'. Choose from: gemini, fake")
+GENERATION_MODES = ('single', 'fanout')
+if app.config['GENERATION_MODE'] not in GENERATION_MODES:
+    raise ValueError(f"Unknown GENERATION_MODE '{app.config['GENERATION_MODE']}'. Choose from: {', '.join(GENERATION_MODES)}")
+# All generations share this client: one model, rate limit, concurrency cap and circuit breaker
+llm_client = LLMClient(
+    model,
+    rate_per_second=app.config['LLM_RATE_PER_SECOND'],
+    burst=app.config['LLM_BURST'],
+    max_concurrency=app.config['LLM_MAX_CONCURRENCY'],
+    max_retries=app.config['LLM_MAX_RETRIES'],
+    base_delay=app.config['LLM_RETRY_BASE_DELAY'],
+    max_delay=app.config['LLM_RETRY_MAX_DELAY'],
+    request_timeout=app.config['LLM_REQUEST_TIMEOUT'],
+    breaker=CircuitBreaker(app.config['LLM_BREAKER_FAILURES'], app.config['LLM_BREAKER_RESET_SECONDS'])
+)
+# Repairs near-miss responses instead of regenerating them, and counts how often each path is taken
+suggestion_repairer = SuggestionRepairer(llm_client)
+
+LOCAL_RECOMMENDER_MODES = ('off', 'fallback', 'instant')
+if app.config['LOCAL_RECOMMENDER'] not in LOCAL_RECOMMENDER_MODES:
+    raise ValueError(f"Unknown LOCAL_RECOMMENDER '{app.config['LOCAL_RECOMMENDER']}'. Choose from: {', '.join(LOCAL_RECOMMENDER_MODES)}")
+# Trait-vector career matching, used when the LLM is unavailable (and, in 'instant' mode, as the first response)
+local_recommender = load_career_profiles(app.config['CAREER_PROFILES_PATH'])
+
+# Background workers for report generation, keyed by session id
+job_queue = create_job_backend(
+    app.config['REPORT_JOB_BACKEND'], app.config['REPORT_JOB_WORKERS'], app.config['REPORT_JOB_TTL']
+)
+
+# Validated suggestions keyed on the prompt inputs, so repeat answer sets skip the API call
+suggestion_cache = SuggestionCache(
+    max_entries=app.config['SUGGESTION_CACHE_SIZE'],
+    disk_path=app.config['SUGGESTION_CACHE_PATH'],
+    ttl_seconds=app.config['SUGGESTION_CACHE_TTL']
+)
+# Generated reports indexed by trait-count vector, so near-identical profiles reuse their careers
+similarity_cache = SimilarityCache(
+    max_entries=app.config['SIMILARITY_CACHE_SIZE'],
+    threshold=app.config['SIMILARITY_CACHE_THRESHOLD'],
+    ttl_seconds=app.config['SUGGESTION_CACHE_TTL']
+)
+
+# Rendered reports, addressed by a digest of their inputs
+report_artifacts = ArtifactStore(
+    app.config['REPORT_ARTIFACT_DIR'] or os.path.join(app.instance_path, 'reports'),
+    max_memory_bytes=app.config['REPORT_ARTIFACT_MEMORY_MB'] * 1024 * 1024
+)
+
+# Rendered /result pages, addressed by a digest of everything on the page
+result_pages = ArtifactStore(max_memory_bytes=app.config['RESULT_PAGE_CACHE_MB'] * 1024 * 1024, suffix='.html')
+# Changes with result.html, so a deploy that edits the template invalidates cached pages and browser ETags
+with open(os.path.join(app.root_path, app.template_folder, 'result.html'), 'rb') as _template_file:
+    RESULT_PAGE_VERSION = hashlib.sha256(_template_file.read()).hexdigest()[:16]
+
+# Job files for bulk cohort runs
+COHORT_DIR = app.config['COHORT_DIR'] or os.path.join(app.instance_path, 'cohorts')
+
+# Session storage shared by every worker; the backend is chosen by SESSION_STORE_BACKEND
+session_store = create_session_store(app)
+# Coalesces identical suggestion generations, within this process and (via the store) across workers
+suggestion_flight = SingleFlight(
+    session_store,
+    lease_seconds=app.config['SINGLE_FLIGHT_LEASE_SECONDS'],
+    poll_interval=app.config['SINGLE_FLIGHT_POLL_INTERVAL']
+)
+
+if app.config['SESSION_MODE'] == 'server':
+    # The cookie only carries an opaque id; the session contents stay on the server
+    app.session_interface = ServerSideSessionInterface(session_store, app.config['SESSION_REFRESH_INTERVAL'])
+
+# --- Metrics (served by /metrics, see metrics.py) ---
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    'http_request_duration_seconds', 'Time to produce a response (first byte for streamed ones), by route.',
+    ('method', 'endpoint', 'status')
+)
+PROMPT_BUILD_SECONDS = metrics.histogram(
+    'prompt_build_duration_seconds', 'Time spent building generation prompts, by stage.', ('stage',)
+)
+PDF_RENDER_SECONDS = metrics.histogram('pdf_render_duration_seconds', 'Time spent rendering a report PDF.')
+PDF_SIZE_BYTES = metrics.histogram('pdf_size_bytes', 'Size of rendered report PDFs.', buckets=metrics.SIZE_BUCKETS)
+REPORT_ARTIFACT_LOOKUPS = metrics.counter(
+    'report_artifact_lookups_total', 'Report PDF downloads, by whether the rendered artifact was reused.', ('result',)
+)
+RESULT_PAGE_LOOKUPS = metrics.counter(
+    'result_page_lookups_total', 'Result page views by outcome (not_modified, hit, render).', ('result',)
+)
+SUGGESTION_CACHE_LOOKUPS = metrics.counter(
+    'suggestion_cache_lookups_total',
+    'Suggestion cache lookups by result (memory_hit, disk_hit, miss); hit ratio = rate of hits / rate of all.',
+    ('result',)
+)
+SIMILARITY_CACHE_LOOKUPS = metrics.counter(
+    'similarity_cache_lookups_total', 'Near-identical profile lookups by result (hit, miss).', ('result',)
+)
+SUGGESTION_FLIGHT_CALLS = metrics.counter(
+    'suggestion_flight_calls_total', 'Suggestion generations by single-flight role (leaders, coalesced, shared_from_store).',
+    ('role',)
+)
+SESSION_STORE_SIZE = metrics.gauge('session_store_entries', 'Entries in the shared session store.', aggregate='max')
+LOCAL_RECOMMENDATIONS = metrics.counter(
+    'local_recommendations_total', 'Reports served from the local recommender, by reason (instant, fallback).', ('reason',)
+)
+HTTP_IN_FLIGHT = metrics.gauge('http_requests_in_flight', 'Requests currently being handled.')
+REPORT_JOBS_ACTIVE = metrics.gauge('report_jobs_active', 'Report generation jobs pending or running.')
+
+def _collect_component_metrics():
+    cache_stats = suggestion_cache.stats()
+    for result in ('memory_hit', 'disk_hit'):
+        SUGGESTION_CACHE_LOOKUPS.set_total(cache_stats[f'{result}s'], result=result)
+    SUGGESTION_CACHE_LOOKUPS.set_total(cache_stats['misses'], result='miss')
+    similarity_stats = similarity_cache.stats()
+    SIMILARITY_CACHE_LOOKUPS.set_total(similarity_stats['hits'], result='hit')
+    SIMILARITY_CACHE_LOOKUPS.set_total(similarity_stats['misses'], result='miss')
+    flight_stats = suggestion_flight.stats()
+    for role in ('leaders', 'coalesced', 'shared_from_store'):
+        SUGGESTION_FLIGHT_CALLS.set_total(flight_stats[role], role=role)
+    SESSION_STORE_SIZE.set(session_store.count())
+    REPORT_JOBS_ACTIVE.set(job_queue.active_count())
+
+metrics.REGISTRY.add_callback(_collect_component_metrics)
+metrics.REGISTRY.enable_multiprocess(
+    app.config['METRICS_DIR'] or os.path.join(app.instance_path, 'metrics'),
+    app.config['METRICS_FLUSH_INTERVAL']
+)
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+    g.request_in_flight = True
+    HTTP_IN_FLIGHT.inc()
+
+@app.teardown_request
+def _finish_request(error=None):
+    if g.pop('request_in_flight', False):
+        HTTP_IN_FLIGHT.dec()
+
+@app.after_request
+def _observe_request(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            endpoint=request.endpoint or 'unmatched',
+            status=response.status_code
+        )
+    return response
 
-def get_trait_summary(user_answers):
-    """
-    Get a summary of all traits and their frequencies.
-    
-    Args:
-        user_answers (dict): Dictionary with question numbers as keys and 'A' or 'B' as values
-    
-    Returns:
-        dict: Dictionary with traits as keys and their counts as values
-    """
-    trait_counts = Counter()
-    
-    for question_num, answer in user_answers.items():
-        question_int = int(question_num) if isinstance(question_num, str) else question_num
-        if question_int in TRAIT_MAPPING and answer in TRAIT_MAPPING[question_int]:
-            trait = TRAIT_MAPPING[question_int][answer]
-            trait_counts[trait] += 1
-    
-    return dict(trait_counts)
-
-# --- Pydantic Models for Data Validation ---
-# This model reflects the MBTI output from the AI.
-class MbtiResultModel(BaseModel):
-    type: str
-    explanation: str
-    strengths: List[str]
-    weaknesses: List[str]
-
-class CareerDetail(BaseModel):
-    name: str
-    match_score: str
-    explanation: str
-    competitive_exams: List[str]
-    degree_courses: List[str]
-
-class FinalSuggestionModel(BaseModel):
-    mbti_result: MbtiResultModel  
-    career_alignments: List[CareerDetail] # Note: The prompt now requests exactly 8 careers.
-    clarity_and_impact: str
-
-# Dummy Firestore-like setup for Flask backend
-_firestore_db = defaultdict(dict)
-SESSIONS_COLLECTION_NAME = 'sessions'
-
-def get_session_doc_ref(session_id: str):
-    """Generates a dummy document reference for a session."""
-    return f"{SESSIONS_COLLECTION_NAME}/{session_id}"
+# Fingerprinted, precompressed static files (built by `python static_assets.py`) and compressed HTML/JSON
+static_assets = StaticAssets(app)
+response_compression.init_app(app)
 
 def get_session_data(session_id: str):
-    """Retrieves a session's data from the dummy database."""
-    return _firestore_db.get(get_session_doc_ref(session_id), {})
+    """Retrieves a session's data from the session store, keeping it alive while it is in use."""
+    return session_store.get_and_refresh(session_id, app.config['SESSION_REFRESH_INTERVAL'])
 
 def save_session_data(session_id: str, data: dict):
-    """Saves a session's data to the dummy database."""
-    _firestore_db[get_session_doc_ref(session_id)] = data
-
-# --- Assessment Questions (as a single string to be split) ---
-ASSESSMENT_QUESTIONS_RAW = """
- I enjoy solving complex logic puzzles. 
- I prefer brainstorming imaginative stories or ideas.
-
- I make detailed plans before starting anything. 
- I go with the flow and adjust as I go.
-
- I can sense people's emotions without them telling me. 
- I focus on facts and objective details in conversations.
-
- I like taking the lead in group work. 
- I like supporting others without being in charge.
-
- I enjoy working with numbers and statistics. 
- I enjoy sketching, painting, or designing.
-
- I break problems into small, logical steps. 
- I think of multiple creative possibilities at once.
-
- I keep my workspace organized and tidy. 
- I'm comfortable working in slightly chaotic environments.
-
- I can tell when someone is upset even if they act fine. 
- I rely on evidence and data before deciding.
-
- I motivate and guide others toward a goal. 
- I work best by contributing my part to a shared goal.
-
- I calculate budgets or expenses with ease. 
- I create visual concepts or artistic projects.
-
- I enjoy identifying patterns in data. 
- I enjoy experimenting with different artistic styles.
-
- I like planning events down to the smallest detail. 
- I like to keep plans loose and spontaneous.
-
- I can comfort others when they're stressed. 
- I assess situations logically without emotional influence.
-
- I enjoy persuading people toward my ideas. 
- I enjoy collaborating quietly toward common goals.
-
- I like solving math-related problems. 
- I like designing visually appealing layouts.
-
- I quickly understand cause-and-effect in problems. 
- I enjoy thinking of alternative, unconventional solutions.
-
- I prefer following a schedule daily. 
- I prefer changing my routine as needed.
-
- I easily empathize with characters in a story. 
- I focus on the author's message and reasoning.
-
- I enjoy coordinating and delegating tasks. 
- I enjoy helping without taking credit.
-
- I work well with formulas and equations. 
- I work well with images, colors, and patterns.
-
- I am drawn to solving scientific or technical problems. 
- I am drawn to artistic performances or exhibitions.
-
- I prepare checklists for my activities. 
- I handle tasks as they come without much prep.
-
- I can often "read between the lines" in conversations. 
- I prefer to stick to what's explicitly said.
-
- I enjoy being the spokesperson for a team. 
- I enjoy working behind the scenes.
-
- I feel energized when analyzing numerical trends. 
- I feel energized when creating unique designs.
-
- I like using logic to troubleshoot mechanical issues. 
- I like using creativity to reimagine how things could be.
-
- I prefer structured work environments. 
- I prefer open-ended, flexible environments.
-
- I respond compassionately when friends share problems. 
- I offer practical advice and solutions.
-
- I naturally influence group decisions. 
- I naturally offer help where needed without leading.
-
- I'm comfortable calculating percentages and ratios. 
- I'm comfortable creating illustrations or visual content.
-
- I think analytically when faced with challenges. 
- I think creatively when faced with challenges.
-
- I plan projects step-by-step. 
- I like improvising in projects.
-
- I can sense changes in someone's mood. 
- I focus on measurable signs or proof.
-
- I like public speaking to inspire others. 
- I like contributing through personal, quiet effort.
-
- I enjoy financial problem solving. 
- I enjoy visual arts.
-
- I look for logical flaws in arguments. 
- I think about symbolic meaning and underlying themes.
-
- I like mapping out long-term goals. 
- I like exploring options as they come.
-
- I comfort friends in difficult times. 
- I offer straightforward, logical feedback.
-
- I enjoy leading brainstorming sessions. 
- I enjoy refining and supporting existing ideas.
-
- I prefer working on spreadsheets. 
- I prefer working on visual presentations.
-
- I enjoy problem-solving in coding or science. 
- I enjoy choreographing, composing, or performing arts.
-
- I keep a strict calendar for tasks. 
- I allow room for spontaneous decisions.
-
- I quickly sense group tensions. 
- I identify process inefficiencies.
-
- I influence decisions in meetings. 
- I offer consistent team support.
-
- I enjoy tracking budgets. 
- I enjoy conceptualizing marketing campaigns.
-
- I focus on practical solutions. 
- I focus on innovative possibilities.
-
- I enjoy order and organization. 
- I enjoy change and adaptability.
-
- I connect emotionally with others easily. 
- I evaluate situations with facts.
-
- I enjoy making executive decisions. 
- I enjoy providing resources for decision-makers.
-
- I feel confident using mathematics in real life. 
- I feel confident creating visual concepts.
-
- I enjoy building or repairing things. 
- I enjoy imagining how things could be improved.
-
- I prefer following clear processes. 
- I prefer experimenting with new methods.
-
- I offer emotional comfort to friends. 
- I offer strategic solutions to friends.
-
- I am persuasive in debates. 
- I am cooperative in team efforts.
-
- I enjoy interpreting graphs and charts. 
- I enjoy creating storyboards and designs.
-
- I focus on step-by-step execution. 
- I focus on the bigger picture possibilities.
-
- I like consistent daily routines. 
- I like variety in my schedule.
-
- I am sensitive to how others feel. 
- I am more focused on factual accuracy.
-
- I naturally guide group projects. 
- I naturally assist without leading.
-
- I prefer accounting and record-keeping tasks. 
- I prefer creative marketing or design tasks.
-"""
-
-student_name1 = ''
-
-def get_paged_questions(page_num, questions_per_page=12):
-    questions_list = ASSESSMENT_QUESTIONS_RAW.strip().split('\n\n')
-    start_index = (page_num - 1) * questions_per_page
-    end_index = start_index + questions_per_page
-    return questions_list[start_index:end_index], len(questions_list)
+    """Saves a session's data to the session store."""
+    session_store.save(session_id, data)
+
+# --- Assessment Questions ---
+# Parsed once from the versioned question bank file (see question_bank.py)
+question_bank = load_question_bank(app.config['QUESTION_BANK_PATH'])
+
+# Rendered question blocks per (bank version, page); they do not depend on the session
+_page_fragments = {}
+
+def get_page_fragment(page_num: int) -> Markup:
+    cache_key = (question_bank.version, page_num)
+    fragment = _page_fragments.get(cache_key)
+    if fragment is None:
+        fragment = Markup(render_template(
+            '_assessment_questions.html',
+            questions=question_bank.page(page_num),
+            prompt=question_bank.prompt
+        ))
+        _page_fragments[cache_key] = fragment
+    return fragment
 
 @app.route('/')
 def index():
@@ -398,26 +268,26 @@ def preferences():
 
 @app.route('/assessment/<int:page_num>', methods=['GET', 'POST'])
 def assessment(page_num):
-    questions_list, total_questions = get_paged_questions(page_num)
-    # Calculate total pages, rounding up
-    total_pages = (total_questions + 11) // 12
-
-    if 'assessment_answers' not in session:
-        session['assessment_answers'] = {}
+    questions_list = question_bank.page(page_num)
+    if not questions_list:
+        abort(404)
+    total_pages = question_bank.total_pages
+    # Stored bit-packed (see answer_set.py); sessions from before that hold a dict
+    saved_answers = AnswerSet.coerce(session.get('assessment_answers'))
 
     if request.method == 'POST':
         # Process form data and save answers to the session
         answers = request.form
         # Check if all questions on the current page have been answered
-        expected_answers = len(questions_list)
-        if len(answers) != expected_answers:
+        page_answers = {
+            str(question.number): answers.get(question.field_name)
+            for question in questions_list
+        }
+        if not all(answer in question_bank.option_keys for answer in page_answers.values()):
             flash("Please answer all questions before proceeding.", 'warning')
             return redirect(f"/assessment/{page_num}")
-            
-        for key, value in answers.items():
-            if key.startswith('q'):
-                global_question_index = key[1:]
-                session['assessment_answers'][global_question_index] = value
+
+        session['assessment_answers'] = saved_answers.with_answers(page_answers).encode()
         
         # Check if this is the last page
         if page_num < total_pages:
@@ -431,8 +301,124 @@ def assessment(page_num):
             return redirect('/result')
 
     # For GET request, render the assessment page
-    # `session.get('assessment_answers', {})` is used to pre-fill answers if the user navigates back
-    return render_template('assessment_page.html', questions=questions_list, page_num=page_num, total_pages=total_pages)
+    # Saved answers for this page are passed separately so the question markup can be cached
+    page_saved_answers = {
+        question.field_name: saved_answers.get(question.number)
+        for question in questions_list
+        if saved_answers.get(question.number)
+    }
+    return render_template(
+        'assessment_page.html',
+        questions_html=get_page_fragment(page_num),
+        saved_answers=page_saved_answers,
+        page_num=page_num,
+        total_pages=total_pages
+    )
+
+def generate_suggestion_data(profile: dict, stream=None) -> dict:
+    """
+    Returns the validated suggestion dict for a student profile (the session data
+    fields used by generate_prompt()), from the cache or from the Gemini API.
+    Concurrent requests for the same prompt share a single API call. If `stream`
+    is given (see LLMClient.generate_json), the response is streamed into it.
+    """
+    cache_key = get_suggestion_cache_key(profile)
+    suggestion_data = suggestion_cache.get(cache_key)
+    if suggestion_data is not None:
+        return suggestion_data
+    return suggestion_flight.do(cache_key, lambda: _generate_and_cache(profile, cache_key, stream))
+
+def _generate_and_cache(profile: dict, cache_key: str, stream=None) -> dict:
+    # Another caller may have finished while this one waited for the lease
+    suggestion_data = suggestion_cache.get(cache_key)
+    if suggestion_data is not None:
+        return suggestion_data
+
+    with PROMPT_BUILD_SECONDS.time(stage='student_profile'):
+        student_profile = build_student_profile(profile)
+
+    similar = None
+    if similarity_cache.enabled:
+        partition, trait_vector = get_similarity_key(profile)
+        similar = similarity_cache.find(partition, trait_vector)
+    if similar is not None:
+        # A near-identical profile's careers are reused; only the personalized text is generated
+        suggestion_data_model = generate_personalized(
+            student_profile,
+            similar[0]['career_alignments'],
+            llm_client,
+            progress=stream,
+            repairer=suggestion_repairer
+        )
+    elif app.config['GENERATION_MODE'] == 'fanout':
+        suggestion_data_model = generate_sections(
+            student_profile,
+            llm_client,
+            max_workers=app.config['GENERATION_FANOUT_WORKERS'],
+            progress=stream,
+            repairer=suggestion_repairer
+        )
+    else:
+        with PROMPT_BUILD_SECONDS.time(stage='full_prompt'):
+            prompt = generate_prompt(profile)
+        # Near-miss responses are repaired (re-requesting only broken sections) before a full retry
+        parse = suggestion_repairer.suggestion_parser(student_profile)
+        suggestion_data_model = llm_client.generate_json(prompt, parse, stream=stream)
+    suggestion_data = suggestion_data_model.model_dump()
+    suggestion_cache.set(cache_key, suggestion_data)
+    if similar is None and similarity_cache.enabled:
+        # Only fully generated reports are indexed, so reused careers never drift further from their source
+        similarity_cache.add(partition, trait_vector, suggestion_data)
+    return suggestion_data
+
+def generate_suggestion(session_id: str):
+    """
+    Generates the career suggestion for a session and stores it with the session data.
+    Runs on the background job queue, never inside a request.
+    """
+    session_data = get_session_data(session_id)
+    # A local recommendation is only a stand-in; the LLM report replaces it
+    if session_data.get('suggestion_data') and session_data.get('suggestion_source') != 'local':
+        return
+
+    # Finished sections are published for /result/stream while the response arrives
+    progress = ReportProgress(session_store, session_id) if app.config['REPORT_STREAMING'] else None
+    try:
+        suggestion_data = generate_suggestion_data(session_data, stream=progress)
+        source = 'llm'
+    except Exception as e:
+        if app.config['LOCAL_RECOMMENDER'] == 'off':
+            if progress:
+                progress.fail(str(e))
+            raise
+        print(f"Suggestion generation failed, serving the local recommendation instead: {e}")
+        if session_data.get('suggestion_data'):
+            # The instant local result is already there; keep it
+            return
+        suggestion_data = local_recommender.recommend(session_data).model_dump()
+        source = 'local'
+        LOCAL_RECOMMENDATIONS.inc(reason='fallback')
+
+    session_data = dict(get_session_data(session_id))
+    session_data['suggestion_data'] = suggestion_data
+    session_data['suggestion_source'] = source
+    save_session_data(session_id, session_data)
+
+def save_local_suggestion(session_id: str, session_data: dict) -> dict:
+    """Stores the local recommendation as the session's report until the LLM report replaces it."""
+    session_data = dict(session_data)
+    session_data['suggestion_data'] = local_recommender.recommend(session_data).model_dump()
+    session_data['suggestion_source'] = 'local'
+    save_session_data(session_id, session_data)
+    LOCAL_RECOMMENDATIONS.inc(reason='instant')
+    return session_data
+
+def get_report_status(session_id: str) -> str:
+    """Returns 'done', 'failed', 'pending', 'running' or 'missing' for a session's report."""
+    if get_session_data(session_id).get('suggestion_data'):
+        return JOB_DONE
+    job = job_queue.status(session_id)
+    return job['status'] if job else 'missing'
 
 @app.route('/result')
 def result():
@@ -444,34 +430,75 @@ def result():
     session_data = get_session_data(session_id)
     
     if not session_data.get('suggestion_data'):
-        try:
-            prompt = generate_prompt(session_data)
-            retries = 0
-            while retries < 3:
-                try:
-                    response = genai.GenerativeModel('gemini-2.0-flash').generate_content(
-                        prompt,
-                        generation_config={"response_mime_type": "application/json"}
-                    )
-                    suggestion_json_string = response.candidates[0].content.parts[0].text
-                    suggestion_data_model = FinalSuggestionModel.model_validate_json(suggestion_json_string)
-                    session['suggestion_data'] = suggestion_data_model.model_dump()
-                    session['raw_suggestion_plain_text'] = json.dumps(session['suggestion_data'], indent=2)
-                    save_session_data(session_id, dict(session))
-                    break
-                except (ValidationError, Exception) as e:
-                    print(f"API call failed, retry {retries+1}: {e}")
-                    retries += 1
-                    time.sleep(2 ** retries)
-            else:
-                raise RuntimeError("Failed to get a valid response from the API after multiple retries.")
-            
-        except RuntimeError as e:
-            print(f"Final API call failed: {e}")
+        job = job_queue.status(session_id)
+        if job and job['status'] == JOB_FAILED:
+            print(f"Final API call failed: {job['error']}")
+            job_queue.forget(session_id)
             flash("An error occurred while generating your results. Please try again.", 'danger')
             return redirect('/preferences')
-    
-    suggestion_data = session.get('suggestion_data', {})
+        if job is None:
+            if not session_data:
+                flash("Assessment incomplete. Please start again.", 'warning')
+                return redirect('/preferences')
+            if app.config['LOCAL_RECOMMENDER'] == 'instant':
+                # Stored before the job starts, so a fast LLM result is never overwritten by it
+                session_data = save_local_suggestion(session_id, session_data)
+            job_queue.submit(session_id, generate_suggestion, session_id)
+        if not session_data.get('suggestion_data'):
+            return render_template(
+                'generating.html',
+                poll_interval=app.config['REPORT_POLL_INTERVAL_MS'],
+                stream_url=url_for('result_stream') if app.config['REPORT_STREAMING'] else None
+            )
+
+    suggestion_source = session_data.get('suggestion_source', 'llm')
+    enrichment_pending = False
+    if suggestion_source == 'local' and app.config['LOCAL_RECOMMENDER'] != 'off':
+        job = job_queue.status(session_id)
+        if job is None:
+            # Another worker served the local result (or this one restarted); try the LLM again
+            job = job_queue.submit(session_id, generate_suggestion, session_id)
+        enrichment_pending = job['status'] in (JOB_PENDING, JOB_RUNNING)
+
+    suggestion_data = session_data.get('suggestion_data', {})
+    student_name = session_data.get('student_name', 'Student')
+
+    def render() -> bytes:
+        return render_result_page(session_id, suggestion_data, student_name, suggestion_source, enrichment_pending).encode('utf-8')
+
+    if '_flashes' in session:
+        # Flashed messages are shown once, so this view can't be cached
+        RESULT_PAGE_LOOKUPS.inc(result='render')
+        response = Response(render(), mimetype='text/html')
+        response.cache_control.no_store = True
+        return response
+
+    # The page is fully determined by these, so their digest is a strong ETag
+    page_key = make_artifact_key(
+        RESULT_PAGE_VERSION, static_assets.version, session_id, student_name, suggestion_data,
+        suggestion_source, enrichment_pending, bool(session.get('is_admin'))
+    )
+    # Weak comparison, as compressed responses carry the ETag as a weak one
+    if request.if_none_match.contains_weak(page_key):
+        RESULT_PAGE_LOOKUPS.inc(result='not_modified')
+        response = Response(status=304)
+    else:
+        page = result_pages.get(page_key)
+        RESULT_PAGE_LOOKUPS.inc(result='hit' if page is not None else 'render')
+        if page is None:
+            page = render()
+            result_pages.put(page_key, page)
+        response = Response(page, mimetype='text/html')
+    response.set_etag(page_key)
+    # Kept by the browser (back navigation) but revalidated, since enrichment can replace the report
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add('Cookie')
+    return response
+
+def render_result_page(session_id: str, suggestion_data: dict, student_name: str,
+                       suggestion_source: str, enrichment_pending: bool) -> str:
+    """Renders result.html for a finished (or locally recommended) suggestion."""
     career_alignments = suggestion_data.get('career_alignments', [])
     mbti_result = suggestion_data.get('mbti_result', {})
     
@@ -480,14 +507,9 @@ def result():
         "Analytical and Structured",
     ]
     
-    mbti_explanation = markdown.markdown(mbti_result.get('explanation', ''), extensions=['nl2br'])
-    clarity_and_impact = markdown.markdown(suggestion_data.get('clarity_and_impact', ''), extensions=['nl2br'])
-    
-    raw_suggestion_plain_text = session.get('raw_suggestion_plain_text', '')
-
-    global student_name1 
-    student_name = session_data.get('student_name', 'Student')
-    student_name1 = student_name
+    with MARKDOWN_RENDER_SECONDS.time(view='result'):
+        mbti_explanation = markdown.markdown(mbti_result.get('explanation', ''), extensions=['nl2br'])
+        clarity_and_impact = markdown.markdown(suggestion_data.get('clarity_and_impact', ''), extensions=['nl2br'])
 
     return render_template(
         'result.html',
@@ -496,243 +518,135 @@ def result():
         clarity_and_impact=clarity_and_impact,
         mbti_result=mbti_result,
         mbti_explanation=mbti_explanation,
-        raw_suggestion_plain_text=raw_suggestion_plain_text,
-        student_name=student_name
+        student_name=student_name,
+        report_url=url_for('report_pdf_file', session_id=session_id),
+        suggestion_source=suggestion_source,
+        enrichment_pending=enrichment_pending
     )
 
-@app.route('/download', methods=['POST'])
-def download():
+@app.route('/result/status')
+def result_status():
+    """Polled by the generating page until the report is ready."""
+    session_id = session.get('session_id')
+    if not session_id:
+        return jsonify({"status": "missing"}), 404
+    return jsonify({"status": get_report_status(session_id)})
 
-    raw_suggestion_data = request.form.get('raw_suggestion_data')
-    if not raw_suggestion_data:
+@app.route('/result/stream')
+def result_stream():
+    """Server-Sent Events with each report section as soon as it has been generated."""
+    session_id = session.get('session_id')
+    if not session_id:
+        return jsonify({"status": "missing"}), 404
+    events = progress_events(
+        session_store,
+        session_id,
+        get_report_status,
+        timeout=app.config['REPORT_STREAM_TIMEOUT']
+    )
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/download', methods=['GET', 'POST'])
+def download():
+    """Kept for old links and forms; the report is served by report_pdf_file()."""
+    session_id = session.get('session_id')
+    if not session_id:
         flash("No results to download.", 'warning')
         return redirect('/result')
+    return redirect(url_for('report_pdf_file', session_id=session_id), code=303)
 
-    try:
-        suggestion_data = json.loads(raw_suggestion_data)
-        validated_data = FinalSuggestionModel.model_validate(suggestion_data)
-        
-        mbti_result = validated_data.mbti_result
-        career_alignments_data = validated_data.career_alignments
-        clarity_and_impact = validated_data.clarity_and_impact
-    except (json.JSONDecodeError, ValidationError) as e:
-        print(f"Error parsing or validating JSON data for download: {e}")
-        flash("An error occurred while processing the download request.", 'danger')
-        return redirect('/result')
-    
-    pdf = FPDF()
-    
-    try:
-        pdf.add_font('DejaVuSansCondensed', '', os.path.join(FONTS_DIR, 'DejaVuSansCondensed.ttf'), uni=True)
-        pdf.add_font('DejaVuSansCondensed', 'B', os.path.join(FONTS_DIR, 'DejaVuSansCondensed-Bold.ttf'), uni=True)
-        pdf.set_font('DejaVuSansCondensed', '', 12)
-    except Exception as e:
-        print(f"WARNING: Could not load DejaVuSansCondensed fonts: {e}. Falling back to Arial.")
-        pdf.set_font("Arial", size=12)
-        
-    pdf.add_page()
-    
-    pdf.set_font('DejaVuSansCondensed', 'B', 16)
-    pdf.ln()
-    pdf.cell(0, 10, 'Your Personalized Career Guidance Report', ln=1, align='C')
-    pdf.ln(10)
+@app.route('/report/<session_id>.pdf')
+def report_pdf_file(session_id):
+    # Reports are only served to the session they belong to
+    if session_id != session.get('session_id'):
+        abort(404)
 
+    session_data = get_session_data(session_id)
+    suggestion_data = session_data.get('suggestion_data')
+    if not suggestion_data:
+        flash("No results to download.", 'warning')
+        return redirect('/result')
+    student_name = session_data.get('student_name', 'Student')
 
-    intro1 = """We extend our heartfelt appreciation for your active participation in our psychometric assessment designed to evaluate engineering potential. Your thoughtful responses have significantly contributed to the creation of this comprehensive report, aimed at assessing your alignment with a future in engineering.
+    # fpdf is only imported once a report is downloaded (see warm_up())
+    from report_pdf import render_report, REPORT_VERSION
+    artifact_key = make_artifact_key(REPORT_VERSION, student_name, suggestion_data)
 
-As you embark on this journey of self-discovery and academic exploration, we invite you to engage deeply with the insights presented in the following pages. This report offers a detailed analysis of your inherent strengths, preferences, and aptitudes — serving as a personalized guide to help you make informed decisions about pursuing engineering as a potential career path. We encourage you to read the report in its entirety, as each section offers a valuable perspective that contributes to a well-rounded understanding of your suitability for the field.
-    """
-    pdf.set_font('DejaVuSansCondensed', '', 10)
-    
-    # Define a width for multi_cell to prevent horizontal overflow
-    page_width = pdf.w - 2 * pdf.l_margin # Calculate usable page width
-    pdf.multi_cell(page_width, 5, intro1.strip()) 
-    pdf.ln(10) 
+    rendered = []
 
-    intro2=f"""
-    Dear {student_name1},
-    """
-    pdf.set_font('DejaVuSansCondensed', 'B', 11)
-    pdf.multi_cell(page_width, 5, intro2.strip()) 
-    pdf.ln(10)
+    def render():
+        validated_data = FinalSuggestionModel.model_validate(suggestion_data)
+        with PDF_RENDER_SECONDS.time():
+            pdf_bytes = render_report(validated_data, student_name)
+        PDF_SIZE_BYTES.observe(len(pdf_bytes))
+        rendered.append(True)
+        return pdf_bytes
 
-    intro3="""Choosing a college major or academic discipline is often a complex and overwhelming decision, frequently influenced by external pressures such as job market trends, career prospects, and societal expectations. While seeking advice from parents, educators, and peers is a natural and often helpful step, it is equally important to reflect inward — to understand your own capabilities, interests, and aspirations.
-    
-Can we enhance our decision-making process by gaining clarity about ourselves? Are we aware of how our personal strengths and interests align with the unique demands of different academic fields?
-    
-Thriving in any discipline, especially engineering, requires a distinctive set of cognitive abilities — including logical reasoning, critical thinking, mathematical aptitude, and problem-solving skills. Each individual possesses a unique profile of abilities — some innate, others cultivated through experience and learning.
-    
-What if there were a structured and objective way to evaluate how well your natural strengths align with the demands of engineering? This report strives to do precisely that — to provide personalized, evidence-based insights to support your academic and career planning.
-    """
-    pdf.set_font('DejaVuSansCondensed', '', 10)
-    pdf.multi_cell(page_width, 5, intro3.strip()) 
-    pdf.ln(10)
-    
-    pdf.set_font('DejaVuSansCondensed', 'B', 12)
-    pdf.multi_cell(page_width, 10, 'Disclaimer:') 
-    pdf.ln(1)
-    
-    pdf.set_font('DejaVuSansCondensed', '', 10)
-    pdf.multi_cell(page_width, 5, 'This psychometric assessment has been developed with the intention of guiding students in evaluating their suitability for engineering studies. The analysis is based on your individual responses to scenario-based questions and should be viewed as one of several tools in your decision-making toolkit. We advise against relying solely on this report and recommend consulting with career counselors or academic advisors for additional perspective. Please refer to the terms and conditions section at the end of this report for further clarification.') 
-    pdf.ln(10)
-    
-    pdf.set_font('DejaVuSansCondensed', 'B', 12)
-    pdf.multi_cell(page_width, 10, 'Important Note:') 
-    pdf.ln(1)
-    
-    pdf.set_font('DejaVuSansCondensed', '', 10)
-    pdf.multi_cell(page_width, 5, 'This assessment specifically focuses on alignment with engineering disciplines. A result indicating a lower alignment does not imply an absence of potential or talent in other fields. Your strengths may lie in domains not covered by this evaluation. We urge you to interpret your results within the context of engineering suitability while remaining open to exploring a broad spectrum of academic and career opportunities.') 
-    pdf.ln(10)
-    
-    pdf.set_font('DejaVuSansCondensed', 'B', 12)
-    pdf.multi_cell(page_width, 10, 'Intended Audience:') 
-    pdf.ln(1)
-    
-    pdf.set_font('DejaVuSansCondensed', '', 10)
-    pdf.multi_cell(page_width, 5, 'This report is most beneficial for students who are in the process of selecting their undergraduate field of study, parents guiding their children through college decisions, and individuals preparing for engineering admission counseling or considering engineering as a future course of study.') 
-    pdf.ln(10)
-    
-    # Section for MBTI result
-    pdf.set_font('DejaVuSansCondensed', 'B', 14)
-    pdf.ln()
-    pdf.cell(0, 10, 'MBTI Personality Analysis', ln=1)
-    
-    pdf.set_font('DejaVuSansCondensed', 'B', 12)
-    pdf.ln()
-    pdf.cell(0, 10, f"Personality Type: {mbti_result.type}", ln=1)
-    
-    pdf.set_font('DejaVuSansCondensed', '', 10)
-    explanation_plain = re.sub(r'[\*_`]', '', mbti_result.explanation)
-    pdf.multi_cell(0, 5, f"Explanation: {explanation_plain}")
-    
-    pdf.set_font('DejaVuSansCondensed', 'B', 10)
-    pdf.ln()
-    pdf.cell(0, 10, "Strengths:", ln=1)
-    pdf.set_font('DejaVuSansCondensed', '', 10)
-    pdf.multi_cell(0, 5, ", ".join(mbti_result.strengths))
-    
-    pdf.set_font('DejaVuSansCondensed', 'B', 10)
-    pdf.ln()
-    pdf.cell(0, 10, "Weaknesses:", ln=1)
-    pdf.set_font('DejaVuSansCondensed', '', 10)
-    pdf.multi_cell(0, 5, ", ".join(mbti_result.weaknesses))
-
-    pdf.ln(10) # Add a bigger space before the next section
-
-    # The rest of the career alignments, clarity, and disclaimer sections
-    pdf.set_font('DejaVuSansCondensed', 'B', 14)
-    pdf.ln()
-    pdf.cell(0, 10, 'Recommended Career Alignments', ln=1)
-    
-    for career in career_alignments_data:
-        pdf.ln(2)
-        
-        pdf.set_font('DejaVuSansCondensed', 'B', 12)
-        pdf.multi_cell(0, 5, f"{career.name} ({career.match_score})")
-    
-        pdf.set_font('DejaVuSansCondensed', '', 10)
-        explanation_plain = re.sub(r'[\*_`]', '', career.explanation)
-        pdf.ln() # New line before explanation
-        pdf.multi_cell(0, 5, f"Explanation: {explanation_plain}\n")
-        
-        pdf.set_font('DejaVuSansCondensed', 'B', 10)
-        pdf.ln() # New line before exams heading
-        pdf.multi_cell(0, 5, "Competitive Exams:")
-        pdf.set_font('DejaVuSansCondensed', '', 10)
-        for exam in career.competitive_exams:
-            pdf.ln() # New line for each exam entry
-            pdf.multi_cell(0, 5, f"- {exam}")
-
-        pdf.set_font('DejaVuSansCondensed', 'B', 10)
-        pdf.ln() # New line before degree courses heading
-        pdf.multi_cell(0, 5, "Degree Courses:")
-        pdf.set_font('DejaVuSansCondensed', '', 10)
-        for course in career.degree_courses:
-            pdf.ln() # New line for each degree course entry
-            pdf.multi_cell(0, 5, f"- {course}")
-
-        pdf.ln(5)
-
-    pdf.set_font('DejaVuSansCondensed', 'B', 12)
-    pdf.cell(0, 5, 'Clarity and Impact', ln=1)
-    pdf.set_font('DejaVuSansCondensed', '', 10)
-    clarity_plain = re.sub(r'[\*_`]', '', clarity_and_impact)
-    pdf.ln() # New line before clarity content
-    pdf.multi_cell(0, 5, clarity_plain)
-    pdf.ln(5)
-
-    pdf.set_font('DejaVuSansCondensed', 'B', 12)
-    pdf.set_x(pdf.l_margin)
-    pdf.multi_cell(page_width, 10, 'About the Methodology:') 
-    pdf.ln(1)
-
-    concluding_text1 = """
-This assessment is grounded in a personality-driven framework. Your responses have been analyzed using associative techniques that map your answers to a defined set of personality traits. These traits are then correlated with specific factors relevant to your academic and career alignment.
-    
-It is important to recognize that, like any psychometric instrument, a degree of subjectivity and a margin of error may be present. Factors such as the test environment, individual context, and the ever-evolving landscape of education can influence results. To ensure relevance and accuracy, the assessment framework is regularly updated and refined in line with emerging academic standards and technological advancements.
-    
-The test design incorporates significant contributions from generative AI, which supports the creation, validation, and enhancement of content in accordance with psychometric best practices for reliability and validity.
-    """
-    pdf.set_font('DejaVuSansCondensed', '', 10)
-    pdf.set_x(pdf.l_margin)
-    pdf.multi_cell(page_width, 5, concluding_text1.strip())
-    pdf.ln(5) 
-
-    pdf.set_font('DejaVuSansCondensed', 'B', 12)
-    pdf.set_x(pdf.l_margin)
-    pdf.multi_cell(page_width, 10, 'Terms & Conditions:') 
-    pdf.ln(1)
-    
-    concluding_text2="""
-Disclaimer of Outcome: This assessment is intended solely for informational and guidance purposes. It does not guarantee specific academic, professional, or personal outcomes. The organization does not warrant the accuracy, completeness, or reliability of the information presented in the assessment.
-    
-Decision-Making Responsibility: Any actions or decisions taken based on this report are entirely the responsibility of the individual participant. The organization bears no responsibility for any direct or indirect consequences resulting from decisions made based on the assessment.
-    
-Limitation of Liability: Under no circumstances shall the organization be held liable for any direct, indirect, incidental, consequential, or special damages arising from the use or interpretation of the assessment results.
-    
-Indemnification: By participating in this assessment, you agree to indemnify and hold harmless the organization and its representatives (including officers, employees, and agents) from any claims or liabilities that may arise due to your decisions or actions based on the assessment findings.
-    
-Scope of Liability: To the fullest extent permitted by applicable law, the organization's liability in relation to this assessment is strictly limited to the amount paid, if any, for access to the assessment.
-    
-AI-Assisted Design: The assessment’s content and structure have been significantly informed by generative AI technologies. All prompts and processes used adhere to the foundational standards of reliability and validity as required in psychometric assessments.
-    
-Not a Substitute for Professional Advice: This assessment is not intended to replace expert guidance. Participants are encouraged to consult qualified academic or career professionals before making significant decisions based on the results.
-    
-Subject to Change: The organization reserves the right to update, modify, suspend, or terminate the assessment or its features at any time, without prior notification.
-    
-Acknowledgement & Consent: By undertaking this assessment, you acknowledge that your participation is voluntary and that you accept all the terms and conditions stated herein.
-    """
-    pdf.set_font('DejaVuSansCondensed', '', 10)
-    pdf.set_x(pdf.l_margin)
-    pdf.multi_cell(page_width, 5, concluding_text2.strip())
-    pdf.ln(5) 
-    
     try:
-        pdf_output = io.BytesIO(pdf.output(dest='S'))
-        pdf_output.seek(0)
-        return send_file(
-            pdf_output,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name='career_guidance_report.pdf'
-        )
-    except Exception as e:
+        pdf_bytes = report_artifacts.get_or_create(artifact_key, render)
+        REPORT_ARTIFACT_LOOKUPS.inc(result='miss' if rendered else 'hit')
+    except ValidationError as e:
+        # The stored suggestion no longer fits the model; nothing to render
         print(f"Error generating PDF: {e}")
         flash("An error occurred while creating the PDF.", 'danger')
         return redirect('/result')
+    except Exception:
+        # A rendering bug, not bad data: keep the traceback
+        app.logger.exception("Unexpected error rendering the PDF report for session %s", session_id)
+        flash("An error occurred while creating the PDF.", 'danger')
+        return redirect('/result')
 
-def generate_prompt(session_data: dict) -> str:
-    # This is a key function to construct the prompt for the Gemini API
-    # based on the user's session data.
-    
-    answers = session_data.get('assessment_answers', {})
-    questions_list = ASSESSMENT_QUESTIONS_RAW.strip().split('\n\n')
+    response = send_file(
+        io.BytesIO(pdf_bytes),
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name='career_guidance_report.pdf',
+        etag=artifact_key,
+        conditional=True,
+        max_age=0
+    )
+    # Personal data: browsers may keep it, but must revalidate (a cheap 304) and shared caches must not store it
+    response.cache_control.private = True
+    response.cache_control.public = False
+    return response
+
+# Bump whenever the prompt template below changes, so cached suggestions from the old prompt are not reused.
+PROMPT_VERSION = '2'
+
+def get_suggestion_cache_key(session_data: dict) -> str:
+    """Cache key covering every input of generate_prompt(), plus the prompt version, generation mode, question bank and model."""
+    return make_cache_key(
+        session_data.get('assessment_answers', {}),
+        session_data.get('graduation_subjects', 'None specified'),
+        session_data.get('preferred_field', 'None specified'),
+        f"{PROMPT_VERSION}:{app.config['GENERATION_MODE']}:{question_bank.version}",
+        GEMINI_MODEL_NAME
+    )
+
+def get_similarity_key(session_data: dict):
+    """Returns the (partition, trait-count vector) a profile is stored under in the similarity cache."""
+    summary = get_trait_summary(session_data.get('assessment_answers', {}))
+    partition = make_partition_key(
+        session_data.get('graduation_subjects', 'None specified'),
+        session_data.get('preferred_field', 'None specified'),
+        f"{PROMPT_VERSION}:{question_bank.version}:{GEMINI_MODEL_NAME}"
+    )
+    return partition, [summary.get(trait, 0) for trait in TRAIT_NAMES]
+
+def build_student_profile(session_data: dict) -> str:
+    """Returns the '### Student Profile' block shared by every generation prompt."""
+    answers = AnswerSet.coerce(session_data.get('assessment_answers'))
 
     # Use dynamic trait calculation instead of hardcoded scoring
     if answers:
         # Calculate traits dynamically
-        top_traits_list = calculate_top_traits(answers, top_n=10)  # Get more traits for AI analysis
-        trait_summary = get_trait_summary(answers)
+        trait_scores = score_answers(answers, top_n=10)  # Get more traits for AI analysis
+        top_traits_list = trait_scores.top
+        trait_summary = trait_scores.summary
         
         # Create personality summary from calculated traits
         personality_summary = f"Top identified traits: {', '.join(top_traits_list[:5])}"
@@ -750,23 +664,28 @@ def generate_prompt(session_data: dict) -> str:
     graduation_subjects = session_data.get('graduation_subjects', 'None specified')
     preferred_field = session_data.get('preferred_field', 'None specified')
     
-    selected_options = "\n".join([
-        f"Question {int(idx)+1}: {answer}" 
-        for idx, answer in sorted(answers.items(), key=lambda item: int(item[0]))
-    ])
+    # items() is already in question order
+    selected_options = "\n".join([f"Question {number}: {answer}" for number, answer in answers.items()])
     
-    prompt = f"""
-You are a career guidance expert for high school students.
-Based on the following information, generate a personalized career suggestion for Indian students in a specific JSON format.
-Also, analyze the assessment answers to determine the student's MBTI personality type. Include the MBTI type, a detailed explanation, and one-word strengths and weaknesses in the output.
-    
-### Student Profile
+    return f"""### Student Profile
 - **High School Subjects:** {graduation_subjects}
 - **Calculated Personality Traits:** {personality_summary}
 - **Assessment Answers:**
 {selected_options}
 - **Preferred Career Field (if any):** {preferred_field}
-- **Requested Response Tone:** Professional
+- **Requested Response Tone:** Professional"""
+
+def generate_prompt(session_data: dict) -> str:
+    # This is a key function to construct the prompt for the Gemini API
+    # based on the user's session data.
+    student_profile = build_student_profile(session_data)
+
+    prompt = f"""
+You are a career guidance expert for high school students.
+Based on the following information, generate a personalized career suggestion for Indian students in a specific JSON format.
+Also, analyze the assessment answers to determine the student's MBTI personality type. Include the MBTI type, a detailed explanation, and one-word strengths and weaknesses in the output.
+    
+{student_profile}
 
 ### Task:
 1. Return ONLY valid JSON - no trailing commas, code or text in the output
@@ -800,6 +719,97 @@ Focus on Indian education system, competitive exams, and degree courses.
     
     return prompt
 
+# --- BULK COHORT API ---
+def require_cohort_api_key(view):
+    """Rejects requests without the COHORT_API_KEY bearer token; every cohort student is a paid API call."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        expected = app.config['COHORT_API_KEY']
+        if not expected:
+            return jsonify({"error": "The cohort API is disabled; set COHORT_API_KEY to enable it"}), 403
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not hmac.compare_digest(token.strip().encode(), expected.encode()):
+            return jsonify({"error": "Missing or invalid cohort API key"}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+def _stream_cohort(job: CohortJob):
+    # One run per job at a time; a second resume would generate the same students again
+    if not job.acquire_run_lock():
+        return jsonify({"error": f"Cohort job {job.job_id} is already running"}), 409
+    response = Response(
+        stream_with_context(run_cohort(job, generate_suggestion_data, app.config['COHORT_MAX_CONCURRENCY'])),
+        mimetype='application/x-ndjson',
+        headers={'X-Cohort-Job-Id': job.job_id}
+    )
+    # run_cohort releases the lock when it ends; this covers a response closed before streaming started
+    response.call_on_close(job.release_run_lock)
+    return response
+
+@app.route('/cohort', methods=['POST'])
+@require_cohort_api_key
+def cohort_create():
+    """
+    Accepts a CSV or JSONL upload in the 'file' field (one student per row) and
+    streams one JSON result line per student as each one completes.
+    """
+    upload = request.files.get('file')
+    if not upload:
+        return jsonify({"error": "Upload the cohort as a 'file' field"}), 400
+    file_format = request.form.get('format') or os.path.splitext(upload.filename or '')[1].lstrip('.').lower()
+
+    try:
+        job = CohortJob.create(COHORT_DIR, parse_cohort(upload.stream, file_format, app.config['COHORT_MAX_STUDENTS']))
+    except CohortError as e:
+        return jsonify({"error": str(e)}), 400
+    return _stream_cohort(job)
+
+@app.route('/cohort/<job_id>/resume', methods=['POST'])
+@require_cohort_api_key
+def cohort_resume(job_id):
+    """Continues an interrupted cohort run, skipping students that already have a result."""
+    try:
+        job = CohortJob.load(COHORT_DIR, job_id)
+    except CohortError as e:
+        return jsonify({"error": str(e)}), 404
+    return _stream_cohort(job)
+
+@app.route('/cohort/<job_id>/results')
+@require_cohort_api_key
+def cohort_results(job_id):
+    """Streams the results recorded so far for a cohort run."""
+    try:
+        job = CohortJob.load(COHORT_DIR, job_id)
+    except CohortError as e:
+        return jsonify({"error": str(e)}), 404
+    return Response(job.results(), mimetype='application/x-ndjson', headers={'X-Cohort-Job-Id': job.job_id})
+
+@app.route('/cohort/<job_id>/reports.zip')
+@require_cohort_api_key
+def cohort_reports_zip(job_id):
+    """Streams a ZIP with one PDF report per student that has a successful result."""
+    try:
+        job = CohortJob.load(COHORT_DIR, job_id)
+    except CohortError as e:
+        return jsonify({"error": str(e)}), 404
+    from report_pdf import REPORT_VERSION
+    chunks = stream_report_zip(
+        iter_report_entries(job.results()),
+        REPORT_VERSION,
+        artifacts=report_artifacts,
+        max_workers=app.config['BATCH_REPORT_WORKERS']
+    )
+    return Response(
+        stream_with_context(chunks),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename=cohort_{job.job_id}_reports.zip'}
+    )
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape endpoint; values are merged across every worker sharing METRICS_DIR."""
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
 # --- ADDITIONAL ROUTE FOR DEBUGGING TRAITS ---
 @app.route('/debug/traits')
 def debug_traits():
@@ -809,19 +819,50 @@ def debug_traits():
         return jsonify({"error": "No active session"})
     
     session_data = get_session_data(session_id)
-    user_answers = session_data.get('assessment_answers', {})
+    user_answers = AnswerSet.coerce(session_data.get('assessment_answers'))
     
     if not user_answers:
         return jsonify({"error": "No assessment answers found"})
     
-    top_traits = calculate_top_traits(user_answers, top_n=10)
-    trait_summary = get_trait_summary(user_answers)
+    trait_scores = score_answers(user_answers, top_n=10)
     
     return jsonify({
-        "user_answers": user_answers,
-        "top_traits": top_traits,
-        "trait_summary": trait_summary
+        "user_answers": user_answers.to_dict(),
+        "top_traits": trait_scores.top,
+        "trait_summary": trait_scores.summary
     })
 
+@app.route('/debug/cache')
+def debug_cache():
+    """Debug route to see suggestion cache hit/miss counters (remove in production)"""
+    return jsonify({**suggestion_cache.stats(), 'similarity': similarity_cache.stats()})
+
+@app.route('/debug/llm')
+def debug_llm():
+    """Debug route to see LLM client counters and circuit breaker state (remove in production)"""
+    return jsonify({
+        **llm_client.stats(),
+        'single_flight': suggestion_flight.stats(),
+        'repair': suggestion_repairer.stats()
+    })
+
+def warm_up():
+    """
+    Loads the subsystems that are otherwise loaded on first use: the Gemini
+    SDK and the PDF renderer with its parsed fonts. With WARM_UP on (set by
+    gunicorn.conf.py when preloading), this runs once in the gunicorn master
+    and the forked workers share the result copy-on-write.
+    """
+    started = time.perf_counter()
+    if app.config['LLM_BACKEND'] == 'gemini':
+        # Only the import: gRPC channels must not be opened before the fork
+        import google.generativeai  # noqa: F401
+    import report_pdf
+    report_pdf.preload_fonts()
+    print(f"Warm-up finished in {time.perf_counter() - started:.2f}s")
+
+if app.config['WARM_UP']:
+    warm_up()
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""
+Content-addressed store for rendered report artifacts.
+
+Artifacts are addressed by a SHA-256 digest of everything that determines
+their bytes, so a report is rendered once and every later download (from any
+worker sharing the directory) is served from disk or from a bounded in-memory
+LRU. The digest doubles as a strong ETag. Without a directory the store is
+memory-only, for artifacts that are cheap to rebuild (e.g. rendered pages).
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+def make_artifact_key(*parts) -> str:
+    """Returns the SHA-256 digest of the canonical JSON encoding of `parts`."""
+    canonical = json.dumps(parts, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class ArtifactStore:
+    """Disk-backed (or, with directory=None, memory-only) artifact store with an in-memory LRU bounded by total size."""
+
+    def __init__(self, directory: str = None, max_memory_bytes: int = 64 * 1024 * 1024, suffix: str = '.pdf'):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.suffix = suffix
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + self.suffix)
+
+    def get(self, key: str):
+        """Returns the artifact bytes for `key`, or None if it was never stored."""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                return data
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), 'rb') as artifact_file:
+                data = artifact_file.read()
+        except FileNotFoundError:
+            return None
+        self._remember(key, data)
+        return data
+
+    def put(self, key: str, data: bytes):
+        """Stores `data` under `key` on disk (atomically) and in memory."""
+        if not self.directory:
+            self._remember(key, data)
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                temp_file.write(data)
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self._remember(key, data)
+
+    def get_or_create(self, key: str, create):
+        """Returns the artifact for `key`, calling `create()` to build and store it on a miss."""
+        data = self.get(key)
+        if data is None:
+            data = create()
+            self.put(key, data)
+        return data
+
+    def _remember(self, key: str, data: bytes):
+        if len(data) > self.max_memory_bytes:
+            return
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= len(previous)
+            self._memory[key] = data
+            self._memory_bytes += len(data)
+            while self._memory_bytes > self.max_memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
@@ -0,0 +1,181 @@
+"""
+Bulk PDF reports for a cohort run.
+
+Renders one report per successful student result across a process pool and
+streams the finished PDFs into a ZIP archive as they complete. Only a bounded
+number of reports are in flight at a time, so a cohort of thousands never has
+to sit in memory at once. Reports already in the artifact store are reused
+instead of rendered again.
+
+Usage:
+    python batch_reports.py results.jsonl reports.zip [--workers N]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from artifact_store import make_artifact_key
+
+# Spawned (not forked) workers, so the pool is safe to start from a threaded web worker
+MP_START_METHOD = 'spawn'
+
+_UNSAFE_FILENAME_CHARS = re.compile(r'[^A-Za-z0-9._-]+')
+
+
+def _init_worker():
+    # Parse the fonts once per worker process instead of on its first report
+    import report_pdf
+    report_pdf.preload_fonts()
+
+
+def _render_entry(student_name: str, suggestion: dict) -> bytes:
+    from models import FinalSuggestionModel
+    from report_pdf import render_report
+
+    return render_report(FinalSuggestionModel.model_validate(suggestion), student_name)
+
+
+def report_filename(result: dict) -> str:
+    """Archive member name for a student's report, e.g. '17_Asha_Rao.pdf'."""
+    stem = f"{result['student_id']}_{result.get('student_name') or 'Student'}"
+    return _UNSAFE_FILENAME_CHARS.sub('_', stem).strip('._') + '.pdf'
+
+
+def iter_report_entries(lines):
+    """Yields the successful results from cohort results JSONL lines."""
+    for line in lines:
+        if not line.strip():
+            continue
+        result = json.loads(line)
+        if result.get('status') == 'ok' and result.get('suggestion'):
+            yield result
+
+
+class _ChunkBuffer:
+    """Write-only, non-seekable sink that lets zipfile stream into a generator."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_report_zip(entries, report_version: str, artifacts=None, max_workers: int = None, max_in_flight: int = None):
+    """
+    Renders reports for `entries` (successful cohort results) and yields the
+    bytes of a ZIP archive containing one PDF per student.
+
+    Args:
+        entries: Iterable of result dicts with student_id, student_name and suggestion
+        report_version (str): report_pdf.REPORT_VERSION, part of the artifact key
+        artifacts: Optional ArtifactStore to reuse and store rendered reports
+        max_workers (int): Render processes (default: all cores)
+        max_in_flight (int): Reports rendering or waiting to be zipped (default: 2 per worker)
+
+    Yields:
+        bytes: Consecutive chunks of the archive
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * max_workers
+
+    sink = _ChunkBuffer()
+    archive = zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED)
+    names = set()
+    failures = []
+    started = time.perf_counter()
+
+    def add_report(result, pdf_bytes):
+        name = report_filename(result)
+        if name in names:
+            name = f"{name[:-4]}_{len(names)}.pdf"
+        names.add(name)
+        # PDF streams are already compressed, so members are stored as-is
+        archive.writestr(name, pdf_bytes)
+        return sink.drain()
+
+    def collect(future, result, artifact_key):
+        try:
+            pdf_bytes = future.result()
+        except Exception as e:
+            failures.append({'student_id': result['student_id'], 'error': str(e)})
+            return b''
+        if artifacts is not None:
+            artifacts.put(artifact_key, pdf_bytes)
+        return add_report(result, pdf_bytes)
+
+    executor = ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context(MP_START_METHOD),
+        initializer=_init_worker,
+    )
+    in_flight = {}
+    try:
+        for result in entries:
+            student_name = result.get('student_name') or 'Student'
+            artifact_key = make_artifact_key(report_version, student_name, result['suggestion'])
+            cached = artifacts.get(artifact_key) if artifacts is not None else None
+            if cached is not None:
+                yield add_report(result, cached)
+                continue
+
+            if len(in_flight) >= max_in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield collect(future, *in_flight.pop(future))
+            future = executor.submit(_render_entry, student_name, result['suggestion'])
+            in_flight[future] = (result, artifact_key)
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield collect(future, *in_flight.pop(future))
+
+        archive.writestr('manifest.json', json.dumps({
+            'reports': len(names),
+            'failed': failures,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000),
+        }, indent=2))
+        archive.close()
+        yield sink.drain()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('results', help='cohort results.jsonl')
+    parser.add_argument('output', help="ZIP file to write ('-' for stdout)")
+    parser.add_argument('--workers', type=int, default=None, help='render processes (default: all cores)')
+    args = parser.parse_args()
+
+    from report_pdf import REPORT_VERSION
+
+    with open(args.results, encoding='utf-8') as results_file:
+        chunks = stream_report_zip(iter_report_entries(results_file), REPORT_VERSION, max_workers=args.workers)
+        if args.output == '-':
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+        else:
+            with open(args.output, 'wb') as output_file:
+                for chunk in chunks:
+                    output_file.write(chunk)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Micro-benchmark for PDF report rendering.
+
+Compares the uncached path (fonts parsed and boilerplate laid out for every
+report, as /download used to do) with the cached report engine, reporting
+per-report render time and peak traced memory.
+
+--check instead renders the same report from several threads at once (the
+cached fonts are shared between documents) and verifies every document is
+byte-for-byte identical to one rendered alone, for both engines. It exits
+with status 1 on any difference.
+
+Usage:
+    python benchmarks/bench_pdf_render.py [--runs 20]
+    python benchmarks/bench_pdf_render.py --check [--threads 8] [--runs 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import report_pdf  # noqa: E402
+
+
+def make_suggestion(careers=8):
+    """A fixed suggestion roughly the size the prompt asks for (400 + 8x250 + 400 words)."""
+    words = "analytical creative structured empathetic curious resilient focused **driven** _adaptable_".split()
+
+    def paragraph(count):
+        return ' '.join(words[i % len(words)] for i in range(count))
+
+    return SimpleNamespace(
+        mbti_result=SimpleNamespace(
+            type='INTJ - The Architect',
+            explanation=paragraph(400),
+            strengths=['Analytical', 'Strategic', 'Independent', 'Organized', 'Focused'],
+            weaknesses=['Stubborn', 'Critical', 'Impatient', 'Perfectionist', 'Overthinking'],
+        ),
+        career_alignments=[
+            SimpleNamespace(
+                name=f'Career {i + 1}',
+                match_score='Highly Aligned',
+                explanation=paragraph(250),
+                competitive_exams=['JEE Main', 'JEE Advanced', 'BITSAT'],
+                degree_courses=['B.Tech Computer Science', 'B.Sc. Mathematics'],
+            )
+            for i in range(careers)
+        ],
+        clarity_and_impact=paragraph(400),
+    )
+
+
+def measure(label, runs, **render_options):
+    suggestion = make_suggestion()
+    # Warm-up run, so the cached variant is measured in its steady state
+    report_pdf.render_report(suggestion, 'Benchmark Student', **render_options)
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        pdf_bytes = report_pdf.render_report(suggestion, 'Benchmark Student', **render_options)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    report_pdf.render_report(suggestion, 'Benchmark Student', **render_options)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        'label': label,
+        'mean_ms': statistics.mean(timings),
+        'p50_ms': statistics.median(timings),
+        'min_ms': min(timings),
+        'peak_kib': peak / 1024,
+        'pdf_bytes': len(pdf_bytes),
+    }
+    print(f"{label:<10} mean {result['mean_ms']:8.1f} ms   p50 {result['p50_ms']:8.1f} ms   "
+          f"min {result['min_ms']:8.1f} ms   peak {result['peak_kib']:9.0f} KiB   size {result['pdf_bytes']} B")
+    return result
+
+
+def check_concurrent(label, threads, runs, **render_options):
+    """Renders `runs` reports on `threads` threads. Returns how many differ from a report rendered alone."""
+    # Reports of different lengths have different PDF object layouts, which is
+    # what exposes state shared between documents
+    suggestions = {careers: make_suggestion(careers) for careers in range(1, 9)}
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    variants = [1 + index % len(suggestions) for index in range(runs)]
+
+    def render(careers):
+        return report_pdf.render_report(suggestions[careers], 'Benchmark Student', creation_date=created, **render_options)
+
+    expected = {careers: render(careers) for careers in suggestions}
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        rendered = list(pool.map(render, variants))
+    mismatches = sum(pdf_bytes != expected[careers] for careers, pdf_bytes in zip(variants, rendered))
+    print(f"{label:<10} {runs} reports on {threads} threads: {mismatches} differ from the sequential render")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=20, help='timed renders per variant (reports per variant with --check)')
+    parser.add_argument('--check', action='store_true', help='verify concurrent renders instead of timing')
+    parser.add_argument('--threads', type=int, default=8, help='render threads for --check')
+    args = parser.parse_args()
+
+    if args.check:
+        mismatches = (
+            check_concurrent('before', args.threads, args.runs, cache_fonts=False, cache_layout=False)
+            + check_concurrent('after', args.threads, args.runs, cache_fonts=True, cache_layout=True)
+        )
+        sys.exit(1 if mismatches else 0)
+
+    before = measure('before', args.runs, cache_fonts=False, cache_layout=False)
+    after = measure('after', args.runs, cache_fonts=True, cache_layout=True)
+    print(f"speed-up: {before['mean_ms'] / after['mean_ms']:.2f}x   "
+          f"peak memory: {after['peak_kib'] / before['peak_kib']:.2f}x of before")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,432 @@
+"""
+Benchmark suite for the hot functions and routes.
+
+Times trait scoring, question pages, prompt building, the markdown
+conversion done by /result and PDF rendering, both as plain function calls
+and as requests through Flask's test client, on fixed synthetic inputs
+(random and adversarial answer sets, typical and very long LLM outputs).
+Nothing is sent to Gemini.
+
+Results are written as JSON and can be compared with a stored baseline;
+any benchmark whose fastest sample is more than --threshold slower than the
+baseline's (the minimum is far less noisy than the median) is flagged and
+makes the run exit with status 1.
+
+Usage:
+    python benchmarks/bench_suite.py [--filter prompt] [--output results.json]
+    python benchmarks/bench_suite.py --save-baseline      # record benchmarks/baseline.json
+    python benchmarks/bench_suite.py --compare            # compare with benchmarks/baseline.json
+"""
+import argparse
+import atexit
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+_WORDS = ("analytical creative structured empathetic curious resilient focused **driven** _adaptable_ "
+          "problem-solving leadership communication research innovation").split()
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Registers `setup`, which prepares the inputs and returns the zero-argument callable to time."""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+# --- Synthetic inputs ---
+def _paragraphs(words, seed, paragraph_words=80):
+    rng = random.Random(seed)
+    chunks = []
+    for start in range(0, words, paragraph_words):
+        line = ' '.join(rng.choice(_WORDS) for _ in range(min(paragraph_words, words - start)))
+        chunks.append(f"- {line}" if rng.random() < 0.3 else line)
+    return '\n\n'.join(chunks)
+
+
+def make_suggestion_data(scale=1, seed=7) -> dict:
+    """A FinalSuggestionModel dict; scale=1 is the size the prompt asks for, larger values mimic runaway outputs."""
+    return {
+        'mbti_result': {
+            'type': 'INTJ - The Architect',
+            'explanation': _paragraphs(400 * scale, seed),
+            'strengths': ['Analytical', 'Strategic', 'Independent', 'Organized', 'Focused'],
+            'weaknesses': ['Stubborn', 'Critical', 'Impatient', 'Perfectionist', 'Overthinking'],
+        },
+        'career_alignments': [
+            {
+                'name': f'Career {index + 1}',
+                'match_score': ('Highly Aligned', 'Well Aligned', 'Decently Aligned')[index % 3],
+                'explanation': _paragraphs(250 * scale, seed + index),
+                'competitive_exams': ['JEE Main', 'JEE Advanced', 'BITSAT'],
+                'degree_courses': ['B.Tech Computer Science', 'B.Sc. Mathematics'],
+            }
+            for index in range(8)
+        ],
+        'clarity_and_impact': _paragraphs(400 * scale, seed + 100),
+    }
+
+
+def make_answer_sets(traits_module, seed=42):
+    """Named answer sets: a realistic random one plus adversarial shapes the scorer must tolerate."""
+    rng = random.Random(seed)
+    questions = range(1, traits_module.MAX_QUESTION + 1)
+    options = traits_module.OPTIONS
+    return {
+        'random': {str(q): rng.choice(options) for q in questions},
+        'all_first_option': {str(q): options[0] for q in questions},
+        'int_keys': {q: rng.choice(options) for q in questions},
+        # Unknown questions, unknown options and garbage keys mixed in with valid answers
+        'adversarial': {
+            **{str(q): rng.choice(options) for q in questions if q % 3},
+            **{str(q): 'Z' for q in questions if not q % 3},
+            **{str(traits_module.MAX_QUESTION + q): options[0] for q in range(1, 200)},
+            '-1': options[0], '0': options[-1],
+        },
+        'empty': {},
+    }
+
+
+def _profile(answers, subjects='Physics, Mathematics, Computer Science', field='Engineering'):
+    return {
+        'student_name': 'Benchmark Student',
+        'graduation_subjects': subjects,
+        'preferred_field': field,
+        'assessment_answers': answers,
+    }
+
+
+# --- Benchmarks: functions ---
+def _trait_benchmarks():
+    import traits
+    for answer_set in ('random', 'adversarial', 'empty'):
+        def top_traits(answer_set=answer_set):
+            answers = make_answer_sets(traits)[answer_set]
+            return lambda: traits.calculate_top_traits(answers, 10)
+
+        def summary(answer_set=answer_set):
+            answers = make_answer_sets(traits)[answer_set]
+            return lambda: traits.get_trait_summary(answers)
+
+        benchmark(f'traits.calculate_top_traits[{answer_set}]')(top_traits)
+        benchmark(f'traits.get_trait_summary[{answer_set}]')(summary)
+
+    @benchmark('traits.calculate_top_traits[int_keys]')
+    def top_traits_int_keys():
+        answers = make_answer_sets(traits)['int_keys']
+        return lambda: traits.calculate_top_traits(answers, 10)
+
+    # Sessions store answers encoded, so these are the shapes the app scores most
+    @benchmark('traits.score_answers[answer_set]')
+    def score_answer_set():
+        from answer_set import AnswerSet
+        answers = AnswerSet.from_dict(make_answer_sets(traits)['random'])
+        return lambda: traits.score_answers(answers, 10)
+
+    @benchmark('answer_set.encode')
+    def encode():
+        from answer_set import AnswerSet
+        answers = AnswerSet.from_dict(make_answer_sets(traits)['random'])
+        return answers.encode
+
+    @benchmark('answer_set.decode')
+    def decode():
+        from answer_set import AnswerSet
+        encoded = AnswerSet.from_dict(make_answer_sets(traits)['random']).encode()
+        return lambda: AnswerSet.decode(encoded)
+
+
+_trait_benchmarks()
+
+
+@benchmark('question_bank.page')
+def question_page():
+    # Takes the place of the old get_paged_questions()
+    from question_bank import load_question_bank
+    bank = load_question_bank()
+    return lambda: [bank.page(page_num) for page_num in range(1, bank.total_pages + 1)]
+
+
+@benchmark('app.generate_prompt[random]')
+def prompt_random():
+    app_module = _app()
+    import traits
+    profile = _profile(make_answer_sets(traits)['random'])
+    return lambda: app_module.generate_prompt(profile)
+
+
+@benchmark('app.generate_prompt[adversarial]')
+def prompt_adversarial():
+    app_module = _app()
+    import traits
+    profile = _profile(make_answer_sets(traits)['adversarial'], subjects=', '.join(['Other'] * 200), field='x' * 2000)
+    return lambda: app_module.generate_prompt(profile)
+
+
+def _markdown_benchmark(scale):
+    import markdown
+    suggestion_data = make_suggestion_data(scale)
+    explanation = suggestion_data['mbti_result']['explanation']
+    clarity = suggestion_data['clarity_and_impact']
+
+    def convert():
+        # Same conversions as result()
+        markdown.markdown(explanation, extensions=['nl2br'])
+        markdown.markdown(clarity, extensions=['nl2br'])
+    return convert
+
+
+benchmark('markdown.result_view[typical]')(lambda: _markdown_benchmark(1))
+benchmark('markdown.result_view[long]')(lambda: _markdown_benchmark(10))
+
+
+def _pdf_benchmark(scale):
+    import report_pdf
+    from models import FinalSuggestionModel
+    suggestion = FinalSuggestionModel.model_validate(make_suggestion_data(scale))
+    report_pdf.render_report(suggestion, 'Benchmark Student')  # warm the font and layout caches
+    return lambda: report_pdf.render_report(suggestion, 'Benchmark Student')
+
+
+benchmark('report_pdf.render_report[typical]')(lambda: _pdf_benchmark(1))
+benchmark('report_pdf.render_report[long]')(lambda: _pdf_benchmark(4))
+
+
+# --- Benchmarks: routes through the test client ---
+_APP = None
+
+
+def _app():
+    """Imports app.py with offline settings: in-memory sessions, throwaway directories, no Gemini calls."""
+    global _APP
+    if _APP is None:
+        scratch = tempfile.mkdtemp(prefix='bench-suite-')
+        atexit.register(shutil.rmtree, scratch, ignore_errors=True)
+        os.environ.setdefault('SECRET_KEY', 'benchmark')
+        os.environ.setdefault('GEMINI_API_KEY', 'benchmark-offline')
+        os.environ.setdefault('SESSION_STORE_BACKEND', 'memory')
+        os.environ.setdefault('REPORT_ARTIFACT_DIR', os.path.join(scratch, 'reports'))
+        os.environ.setdefault('METRICS_DIR', os.path.join(scratch, 'metrics'))
+        os.environ.setdefault('COHORT_DIR', os.path.join(scratch, 'cohorts'))
+        import app as app_module
+
+        class OfflineModel:
+            def generate_content(self, *args, **kwargs):
+                raise RuntimeError("The benchmark suite never calls Gemini")
+
+        app_module.llm_client.model = OfflineModel()
+        _APP = app_module
+    return _APP
+
+
+def _client_with_session(data: dict):
+    app_module = _app()
+    session_id = str(uuid.uuid4())
+    app_module.save_session_data(session_id, {**data, 'session_id': session_id})
+    client = app_module.app.test_client()
+    with client.session_transaction() as session:
+        session.update(data)
+        session['session_id'] = session_id
+    return client, session_id
+
+
+def _checked(response, status=200):
+    if response.status_code != status:
+        raise RuntimeError(f"Unexpected status {response.status_code} (expected {status})")
+    return response
+
+
+@benchmark('route GET /assessment/1')
+def route_assessment_get():
+    import traits
+    client, _ = _client_with_session(_profile(make_answer_sets(traits)['random']))
+    return lambda: _checked(client.get('/assessment/1'))
+
+
+@benchmark('route POST /assessment/1')
+def route_assessment_post():
+    app_module = _app()
+    client, _ = _client_with_session(_profile({}))
+    form = {question.field_name: app_module.question_bank.option_keys[0] for question in app_module.question_bank.page(1)}
+    return lambda: _checked(client.post('/assessment/1', data=form), 302)
+
+
+def _result_route(scale):
+    import traits
+    client, _ = _client_with_session({
+        **_profile(make_answer_sets(traits)['random']),
+        'suggestion_data': make_suggestion_data(scale),
+    })
+    return lambda: _checked(client.get('/result'))
+
+
+benchmark('route GET /result[typical]')(lambda: _result_route(1))
+benchmark('route GET /result[long]')(lambda: _result_route(10))
+
+
+@benchmark('route GET /report.pdf[render]')
+def route_report_render():
+    import traits
+    app_module = _app()
+    profile = {**_profile(make_answer_sets(traits)['random']), 'suggestion_data': make_suggestion_data(1)}
+    client, session_id = _client_with_session(profile)
+    counter = iter(range(10 ** 9))
+
+    def download():
+        # A new name each time changes the artifact key, so every request renders
+        app_module.save_session_data(
+            session_id, {**profile, 'session_id': session_id, 'student_name': f'Student {next(counter)}'}
+        )
+        _checked(client.get(f'/report/{session_id}.pdf'))
+    download()
+    return download
+
+
+@benchmark('route GET /report.pdf[cached]')
+def route_report_cached():
+    import traits
+    client, session_id = _client_with_session({
+        **_profile(make_answer_sets(traits)['random']),
+        'suggestion_data': make_suggestion_data(1),
+    })
+    _checked(client.get(f'/report/{session_id}.pdf'))
+    return lambda: _checked(client.get(f'/report/{session_id}.pdf'))
+
+
+# --- Runner ---
+def measure(fn, samples: int, min_sample_time: float) -> dict:
+    """Calibrates the iterations per sample to last about `min_sample_time`, then times `samples` samples."""
+    fn()
+    iterations = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_sample_time or iterations >= 1 << 20:
+            break
+        iterations *= 2 if elapsed == 0 else max(2, min(10, int(min_sample_time / elapsed) + 1))
+
+    per_call = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        per_call.append((time.perf_counter() - start) / iterations * 1e6)
+    return {
+        'median_us': statistics.median(per_call),
+        'min_us': min(per_call),
+        'stdev_us': statistics.stdev(per_call) if len(per_call) > 1 else 0.0,
+        'iterations': iterations,
+        'samples': samples,
+    }
+
+
+def run(names, samples: int, min_sample_time: float) -> dict:
+    results = {}
+    for name in names:
+        result = measure(BENCHMARKS[name](), samples, min_sample_time)
+        results[name] = result
+        print(f"{name:<46} median {_format_us(result['median_us']):>10}   min {_format_us(result['min_us']):>10}   "
+              f"x{result['iterations']}")
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Prints the change of every benchmark against the baseline and returns the names that regressed."""
+    regressions = []
+    print(f"\nCompared with baseline ({baseline.get('meta', {}).get('recorded_at', 'unknown date')}), threshold {threshold:.0%}:")
+    for name, result in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None:
+            print(f"  {name:<46} new")
+            continue
+        ratio = result['min_us'] / previous['min_us'] if previous['min_us'] else float('inf')
+        if ratio > 1 + threshold:
+            verdict = 'REGRESSION'
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            verdict = 'faster'
+        else:
+            verdict = 'ok'
+        print(f"  {name:<46} {_format_us(previous['min_us']):>10} -> {_format_us(result['min_us']):>10}"
+              f"   {ratio:5.2f}x   {verdict}")
+    return regressions
+
+
+def _format_us(value: float) -> str:
+    return f"{value / 1000:.2f} ms" if value >= 1000 else f"{value:.1f} us"
+
+
+def _meta(args) -> dict:
+    return {
+        'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'samples': args.samples,
+        'min_sample_time': args.min_sample_time,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filter', help='only run benchmarks whose name contains this text')
+    parser.add_argument('--list', action='store_true', help='list the benchmarks and exit')
+    parser.add_argument('--samples', type=int, default=7, help='timed samples per benchmark')
+    parser.add_argument('--min-sample-time', type=float, default=0.1, help='seconds each sample should last')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline JSON file')
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as the baseline')
+    parser.add_argument('--compare', action='store_true', help='compare the results with the baseline')
+    parser.add_argument('--threshold', type=float, default=0.2, help='relative slow-down flagged as a regression')
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if not args.filter or args.filter in name]
+    if args.list:
+        print('\n'.join(names))
+        return 0
+    if not names:
+        parser.error(f"No benchmark matches '{args.filter}'")
+
+    report = {'meta': _meta(args), 'results': run(names, args.samples, args.min_sample_time)}
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+    if args.save_baseline:
+        baseline = {'meta': report['meta'], 'results': {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as baseline_file:
+                baseline['results'] = json.load(baseline_file).get('results', {})
+        # A filtered run only replaces the benchmarks it ran
+        baseline['results'].update(report['results'])
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+        print(f"\nBaseline saved to {args.baseline}")
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            parser.error(f"No baseline at {args.baseline}; record one with --save-baseline")
+        with open(args.baseline) as baseline_file:
+            regressions = compare(report['results'], json.load(baseline_file), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
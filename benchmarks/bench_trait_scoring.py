@@ -0,0 +1,86 @@
+"""
+Benchmark for trait scoring.
+
+Compares the original dict-walking implementation (one walk in
+calculate_top_traits plus another in get_trait_summary, as generate_prompt()
+used to do) with the compiled index in traits.py, for single answer sets and
+for a cohort batch.
+
+Usage:
+    python benchmarks/bench_trait_scoring.py [--students 5000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import traits  # noqa: E402
+from traits import TRAIT_MAPPING  # noqa: E402
+
+
+def legacy_calculate_top_traits(user_answers, top_n=5):
+    trait_counts = Counter()
+    for question_num, answer in user_answers.items():
+        question_int = int(question_num) if isinstance(question_num, str) else question_num
+        if question_int in TRAIT_MAPPING and answer in TRAIT_MAPPING[question_int]:
+            trait_counts[TRAIT_MAPPING[question_int][answer]] += 1
+    return [trait for trait, count in trait_counts.most_common(top_n)]
+
+
+def legacy_get_trait_summary(user_answers):
+    trait_counts = Counter()
+    for question_num, answer in user_answers.items():
+        question_int = int(question_num) if isinstance(question_num, str) else question_num
+        if question_int in TRAIT_MAPPING and answer in TRAIT_MAPPING[question_int]:
+            trait_counts[TRAIT_MAPPING[question_int][answer]] += 1
+    return dict(trait_counts)
+
+
+def make_cohort(students, seed=42):
+    rng = random.Random(seed)
+    return [
+        {str(question): rng.choice('AB') for question in range(1, traits.MAX_QUESTION + 1)}
+        for _ in range(students)
+    ]
+
+
+def timed(label, fn, repeat=3):
+    best = min(_run(fn) for _ in range(repeat))
+    print(f"{label:<44} {best * 1000:9.2f} ms")
+    return best
+
+
+def _run(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=5000, help='answer sets in the cohort batch')
+    args = parser.parse_args()
+
+    cohort = make_cohort(args.students)
+    vectors = [''.join(answers[str(q)] for q in range(1, traits.MAX_QUESTION + 1)) for answers in cohort]
+
+    # Both implementations must agree before timing them
+    for answers in cohort[:200]:
+        assert traits.calculate_top_traits(answers, 10) == legacy_calculate_top_traits(answers, 10)
+        assert traits.get_trait_summary(answers) == legacy_get_trait_summary(answers)
+
+    print(f"{args.students} students x {traits.MAX_QUESTION} questions")
+    before = timed('before: top traits + summary (two walks)',
+                   lambda: [(legacy_calculate_top_traits(a, 10), legacy_get_trait_summary(a)) for a in cohort])
+    after = timed('after:  score_answers (one pass)', lambda: [traits.score_answers(a, 10) for a in cohort])
+    timed('after:  score_batch', lambda: traits.score_batch(cohort, 10))
+    timed('after:  count_matrix (answer strings)', lambda: traits.count_matrix(vectors))
+    print(f"speed-up (score_answers vs two walks): {before / after:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Cold-start budget check.
+
+Starts a fresh interpreter the way a new gunicorn worker (or a freshly
+scaled-out instance) does, imports the app under `python -X importtime`,
+and serves GET / through the test client. Reports the time to import the
+app and to answer that first request, the modules app.py pulls in by
+cumulative import time, and whether modules meant to load on first use
+(the Gemini SDK, fpdf) were imported anyway.
+
+Exits with status 1 when the median import time exceeds --budget-ms or a
+lazy module was loaded, so it can gate a deploy.
+
+The app runs with LLM_BACKEND=gemini and a placeholder API key (nothing is
+called) and the default SQLite session store, with every file it writes
+kept in a temporary directory.
+
+Usage:
+    python benchmarks/import_budget.py [--runs 5] [--budget-ms 900] [--top 15]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Loaded on first use by app.py (or by warm_up() in a preloading master), never by the import
+LAZY_MODULES = ('google.generativeai', 'fpdf')
+
+RESULT_MARKER = 'IMPORT_BUDGET '
+
+CHILD_SCRIPT = f"""
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get('/')
+served = time.perf_counter()
+print({RESULT_MARKER!r} + json.dumps({{
+    'import_ms': (imported - started) * 1000,
+    'first_request_ms': (served - imported) * 1000,
+    'status': response.status_code,
+    'loaded_lazy': [name for name in {LAZY_MODULES!r} if name in sys.modules],
+}}))
+"""
+
+
+def run_once(workdir: str) -> dict:
+    """Runs CHILD_SCRIPT in a new interpreter. Returns its measurements plus 'process_ms' and 'importtime' lines."""
+    env = dict(os.environ)
+    env.setdefault('SECRET_KEY', 'import-budget')
+    env.setdefault('LLM_BACKEND', 'gemini')
+    env.setdefault('GEMINI_API_KEY', 'import-budget-placeholder')
+    env.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(workdir, 'sessions.db')}")
+    for name, subdir in (('METRICS_DIR', 'metrics'), ('REPORT_ARTIFACT_DIR', 'reports'), ('COHORT_DIR', 'cohorts')):
+        env.setdefault(name, os.path.join(workdir, subdir))
+    env.setdefault('SUGGESTION_CACHE_PATH', os.path.join(workdir, 'suggestions.json'))
+    env.setdefault('WARM_UP', '0')
+
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD_SCRIPT],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    process_ms = (time.perf_counter() - started) * 1000
+    result_lines = [line for line in completed.stdout.splitlines() if line.startswith(RESULT_MARKER)]
+    if completed.returncode != 0 or not result_lines:
+        sys.exit(f"App import failed (exit {completed.returncode}):\n{completed.stdout}\n{completed.stderr[-4000:]}")
+    result = json.loads(result_lines[-1][len(RESULT_MARKER):])
+    result['process_ms'] = process_ms
+    result['importtime'] = [line for line in completed.stderr.splitlines() if line.startswith('import time:')]
+    return result
+
+
+def direct_imports(importtime_lines, parent: str = 'app') -> list:
+    """
+    Returns [(module, cumulative ms)] for the modules first imported directly by `parent`,
+    slowest first. Lines come innermost first, so a parent's children precede it.
+    """
+    entries = []
+    for line in importtime_lines[1:]:  # the first line is the column header
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        entries.append((name.strip(), depth, int(cumulative) / 1000))
+    for index, (name, depth, _) in enumerate(entries):
+        if name == parent:
+            children = []
+            for child_name, child_depth, cumulative_ms in reversed(entries[:index]):
+                if child_depth <= depth:
+                    break
+                if child_depth == depth + 1:
+                    children.append((child_name, cumulative_ms))
+            return sorted(children, key=lambda child: child[1], reverse=True)
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters to start; times are medians')
+    parser.add_argument('--budget-ms', type=float, default=900, help='maximum median time to import the app')
+    parser.add_argument('--top', type=int, default=15, help='direct imports of app.py to list')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='import-budget-') as workdir:
+        runs = [run_once(workdir) for _ in range(args.runs)]
+
+    import_ms = statistics.median(run['import_ms'] for run in runs)
+    first_request_ms = statistics.median(run['first_request_ms'] for run in runs)
+    process_ms = statistics.median(run['process_ms'] for run in runs)
+    print(f"import app        median {import_ms:8.1f} ms   (budget {args.budget_ms:.0f} ms)")
+    print(f"first GET /       median {first_request_ms:8.1f} ms   (status {runs[-1]['status']})")
+    print(f"process total     median {process_ms:8.1f} ms   (interpreter start to exit)")
+    print(f"\nSlowest direct imports of app.py (last run, cumulative, -X importtime):")
+    for name, cumulative_ms in direct_imports(runs[-1]['importtime'])[:args.top]:
+        print(f"  {cumulative_ms:8.1f} ms  {name}")
+
+    failures = []
+    if import_ms > args.budget_ms:
+        failures.append(f"importing the app took {import_ms:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+    loaded_lazy = sorted({name for run in runs for name in run['loaded_lazy']})
+    if loaded_lazy:
+        failures.append(f"imported at startup instead of on first use: {', '.join(loaded_lazy)}")
+    for failure in failures:
+        print(f"\nFAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("\nOK: within budget")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,508 @@
+"""
+Offline end-to-end load test.
+
+Simulates students going through the whole flow: /preferences, every
+/assessment page, /result (waiting for the report by polling /result/status
+or by following the /result/stream events), the final /result page and
+/download. The app is run with LLM_BACKEND=fake (see fake_gemini.py), so no
+network access or API quota is needed.
+
+Reports throughput, p50/p95/p99 latency per step, time until the report was
+ready, and saturation sampled from /metrics (requests in flight per worker
+slot, LLM calls in flight, active report jobs).
+
+Modes:
+  * by default, launches gunicorn on a local port once per --worker-class
+    (sync, gthread, eventlet, gevent; classes whose library is not installed
+    are skipped) and compares them. A worker slot serves one request at a
+    time: a sync worker has one, a gthread worker --threads and a
+    cooperative worker --worker-connections;
+  * --url drives an already running server (start it with LLM_BACKEND=fake);
+  * --in-process drives the app through Flask's test client, without gunicorn.
+
+Usage:
+    python benchmarks/load_test.py --students 2000 --users 100 --worker-class all
+    python benchmarks/load_test.py --in-process --students 50 --users 10 --llm-time-scale 0.01
+"""
+import argparse
+import http.cookiejar
+import importlib.util
+import json
+import os
+import random
+import re
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from question_bank import load_question_bank  # noqa: E402
+
+WORKER_CLASSES = {
+    # worker class -> library it needs (None = built in)
+    'sync': None,
+    'gthread': None,
+    'eventlet': 'eventlet',
+    'gevent': 'gevent',
+}
+
+_SAMPLE_PATTERN = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{[^}]*\})?\s+(\S+)$')
+
+
+# --- Transports ---
+class HTTPStudent:
+    """One browser: its own cookie jar, talking to a server over HTTP (redirects followed)."""
+
+    def __init__(self, base_url: str, timeout: float):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self._opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, method: str, path: str, data: dict = None):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        request = urllib.request.Request(self.base_url + path, data=body, method=method)
+        try:
+            with self._opener.open(request, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def events(self, path: str):
+        """Yields the event names of a Server-Sent Events response as they arrive."""
+        request = urllib.request.Request(self.base_url + path)
+        with self._opener.open(request, timeout=self.timeout) as response:
+            for line in response:
+                if line.startswith(b'event: '):
+                    yield line[7:].strip().decode()
+
+
+class TestClientStudent:
+    """One browser driven through Flask's test client."""
+
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def request(self, method: str, path: str, data: dict = None):
+        response = self._client.open(path, method=method, data=data, follow_redirects=True)
+        return response.status_code, response.get_data()
+
+    def events(self, path: str):
+        response = self._client.get(path, buffered=False)
+        try:
+            for chunk in response.response:
+                for line in (chunk.decode() if isinstance(chunk, bytes) else chunk).splitlines():
+                    if line.startswith('event: '):
+                        yield line[7:].strip()
+        finally:
+            response.close()
+
+
+# --- Statistics ---
+class Recorder:
+    """Thread-safe latency samples per step, plus outcome counters."""
+
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self.students = {'completed': 0, 'failed': 0}
+        self._lock = threading.Lock()
+
+    def add(self, step: str, seconds: float):
+        with self._lock:
+            self.samples.setdefault(step, []).append(seconds)
+
+    def error(self, step: str, detail: str):
+        with self._lock:
+            self.errors.setdefault(step, {}).setdefault(detail, 0)
+            self.errors[step][detail] += 1
+
+    def finish(self, ok: bool):
+        with self._lock:
+            self.students['completed' if ok else 'failed'] += 1
+
+
+def percentile(values, fraction: float) -> float:
+    """Nearest-rank percentile of `values`."""
+    ordered = sorted(values)
+    if not ordered:
+        return float('nan')
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))]
+
+
+class StepFailed(Exception):
+    pass
+
+
+def _timed(recorder, student, step, method, path, data=None, expect=200):
+    start = time.perf_counter()
+    try:
+        status, body = student.request(method, path, data)
+    except (OSError, urllib.error.URLError) as e:
+        recorder.error(step, type(e).__name__)
+        raise StepFailed(step)
+    recorder.add(step, time.perf_counter() - start)
+    if status != expect:
+        recorder.error(step, f'HTTP {status}')
+        raise StepFailed(step)
+    return body
+
+
+def _wait_for_report(recorder, student, use_sse: bool, poll_interval: float, deadline: float) -> str:
+    """Waits until the report status is no longer pending/running and returns the final status."""
+    if use_sse:
+        for event in student.events('/result/stream'):
+            if event in ('done', 'failed', 'missing', 'timeout'):
+                return event
+        return 'stream closed'
+    while time.perf_counter() < deadline:
+        status_body = _timed(recorder, student, 'GET /result/status', 'GET', '/result/status')
+        status = json.loads(status_body).get('status')
+        if status not in ('pending', 'running'):
+            return status
+        time.sleep(poll_interval)
+    return 'timeout'
+
+
+def run_student(student, recorder: Recorder, bank, rng, use_sse: bool, poll_interval: float, report_timeout: float):
+    """Takes one student through the whole flow; returns True if they downloaded their report."""
+    try:
+        _timed(recorder, student, 'GET /preferences', 'GET', '/preferences')
+        _timed(recorder, student, 'POST /preferences', 'POST', '/preferences', {
+            'student_name': f'Student {rng.randrange(10 ** 6)}',
+            'graduation_subjects': rng.choice(['Physics', 'Biology', 'Economics', 'Art', 'Computer Science']),
+            'preferred_field': rng.choice(['Engineering', 'Medicine', 'Design', 'None specified']),
+        })
+        for page_num in range(1, bank.total_pages + 1):
+            _timed(recorder, student, 'GET /assessment', 'GET', f'/assessment/{page_num}')
+            answers = {question.field_name: rng.choice(bank.option_keys) for question in bank.page(page_num)}
+            # The last page redirects to /result, which queues the report
+            step = 'POST /assessment' if page_num < bank.total_pages else 'POST /assessment (last) -> /result'
+            _timed(recorder, student, step, 'POST', f'/assessment/{page_num}', answers)
+
+        # Like the generating page: wait for a terminal status, then load /result. A worker that
+        # doesn't know the job answers 'missing', and /result then queues it there (the shared
+        # single-flight lease makes that wait for the original generation).
+        waited = time.perf_counter()
+        while True:
+            outcome = _wait_for_report(recorder, student, use_sse, poll_interval, waited + report_timeout)
+            page = _timed(recorder, student, 'GET /result', 'GET', '/result')
+            if b'Download as PDF' in page:
+                break
+            if b'generating-status' not in page:
+                recorder.error('report', outcome)
+                raise StepFailed('report')
+            if time.perf_counter() - waited > report_timeout:
+                recorder.error('report', 'timeout')
+                raise StepFailed('report')
+            time.sleep(poll_interval)
+        recorder.add('report ready (after last page)', time.perf_counter() - waited)
+
+        pdf = _timed(recorder, student, 'GET /download', 'GET', '/download')
+        if not pdf.startswith(b'%PDF'):
+            recorder.error('GET /download', 'not a PDF')
+            raise StepFailed('GET /download')
+    except StepFailed:
+        recorder.finish(False)
+        return False
+    recorder.finish(True)
+    return True
+
+
+# --- Saturation sampling ---
+def parse_metrics(text: str) -> dict:
+    """Sums every sample of each metric across its labels."""
+    totals = {}
+    for line in text.splitlines():
+        match = _SAMPLE_PATTERN.match(line)
+        if match:
+            try:
+                totals[match.group(1)] = totals.get(match.group(1), 0.0) + float(match.group(2))
+            except ValueError:
+                continue
+    return totals
+
+
+class SaturationSampler(threading.Thread):
+    GAUGES = ('http_requests_in_flight', 'llm_calls_in_flight', 'report_jobs_active')
+
+    def __init__(self, fetch, interval: float):
+        super().__init__(daemon=True)
+        self.fetch = fetch
+        self.interval = interval
+        self.samples = {name: [] for name in self.GAUGES}
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                values = parse_metrics(self.fetch())
+            except Exception:
+                continue
+            for name in self.GAUGES:
+                if name in values:
+                    # The scrape itself is one of the requests in flight
+                    self.samples[name].append(values[name] - (name == 'http_requests_in_flight'))
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+# --- Running ---
+def run_load(make_student, fetch_metrics, args, slots: int = None) -> dict:
+    bank = load_question_bank()
+    recorder = Recorder()
+    sampler = SaturationSampler(fetch_metrics, args.sample_interval) if fetch_metrics else None
+    if sampler:
+        sampler.start()
+
+    master_rng = random.Random(args.seed)
+    seeds = [master_rng.random() for _ in range(args.students)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users) as executor:
+        list(executor.map(
+            lambda seed: run_student(
+                make_student(), recorder, bank, random.Random(seed), args.sse, args.poll_interval, args.report_timeout
+            ),
+            seeds
+        ))
+    elapsed = time.perf_counter() - started
+    if sampler:
+        sampler.stop()
+
+    requests_made = sum(len(values) for step, values in recorder.samples.items() if not step.startswith('report'))
+    summary = {
+        'students': dict(recorder.students),
+        'elapsed_s': elapsed,
+        'students_per_s': recorder.students['completed'] / elapsed,
+        'requests_per_s': requests_made / elapsed,
+        'steps': {
+            step: {
+                'count': len(values),
+                'p50_ms': percentile(values, 0.50) * 1000,
+                'p95_ms': percentile(values, 0.95) * 1000,
+                'p99_ms': percentile(values, 0.99) * 1000,
+            }
+            for step, values in recorder.samples.items()
+        },
+        'errors': recorder.errors,
+    }
+    if sampler:
+        saturation = {}
+        for name, values in sampler.samples.items():
+            if values:
+                saturation[name] = {'mean': sum(values) / len(values), 'max': max(values)}
+        if slots and 'http_requests_in_flight' in saturation:
+            saturation['worker_slots'] = slots
+            saturation['busy_fraction_mean'] = saturation['http_requests_in_flight']['mean'] / slots
+            saturation['busy_fraction_max'] = saturation['http_requests_in_flight']['max'] / slots
+        summary['saturation'] = saturation
+    return summary
+
+
+def print_summary(label: str, summary: dict):
+    students = summary['students']
+    print(f"\n== {label}: {students['completed']} completed, {students['failed']} failed in "
+          f"{summary['elapsed_s']:.1f} s  ({summary['students_per_s']:.2f} students/s, "
+          f"{summary['requests_per_s']:.1f} requests/s)")
+    print(f"   {'step':<38} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for step, stats in summary['steps'].items():
+        print(f"   {step:<38} {stats['count']:>7} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}")
+    for step, details in summary['errors'].items():
+        print(f"   errors in {step}: " + ', '.join(f"{detail} x{count}" for detail, count in details.items()))
+    saturation = summary.get('saturation')
+    if saturation:
+        gauges = ', '.join(
+            f"{name} mean {values['mean']:.1f} / max {values['max']:.0f}"
+            for name, values in saturation.items() if isinstance(values, dict)
+        )
+        print(f"   saturation: {gauges}")
+        if 'busy_fraction_mean' in saturation:
+            print(f"   worker slots busy: mean {saturation['busy_fraction_mean']:.0%}, "
+                  f"max {saturation['busy_fraction_max']:.0%} of {saturation['worker_slots']}")
+
+
+def fake_llm_environment(args, scratch: str) -> dict:
+    """Environment for an app instance that answers with the fake model and keeps its state in `scratch`."""
+    return {
+        'LLM_BACKEND': 'fake',
+        'FAKE_LLM_LATENCY': args.llm_latency,
+        'FAKE_LLM_ERROR_RATE': str(args.llm_error_rate),
+        'FAKE_LLM_MALFORMED_RATE': str(args.llm_malformed_rate),
+        'FAKE_LLM_TIME_SCALE': str(args.llm_time_scale),
+        'FAKE_LLM_SEED': str(args.seed),
+        'REPORT_STREAMING': '1' if args.llm_stream else '0',
+        'SECRET_KEY': os.environ.get('SECRET_KEY', 'load-test'),
+        'DATABASE_URL': 'sqlite:///' + os.path.join(scratch, 'sessions.db'),
+        'SUGGESTION_CACHE_PATH': os.path.join(scratch, 'suggestions.db'),
+        'REPORT_ARTIFACT_DIR': os.path.join(scratch, 'reports'),
+        'METRICS_DIR': os.path.join(scratch, 'metrics'),
+        'METRICS_FLUSH_INTERVAL': str(min(1.0, args.sample_interval)),
+        'COHORT_DIR': os.path.join(scratch, 'cohorts'),
+        # The fake model is the thing being measured against; don't let the client pace it
+        'LLM_RATE_PER_SECOND': os.environ.get('LLM_RATE_PER_SECOND', '1000'),
+        'LLM_BURST': os.environ.get('LLM_BURST', '1000'),
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_up(url: str, process, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {process.returncode}")
+        try:
+            with urllib.request.urlopen(url + '/', timeout=2):
+                return
+        except OSError:
+            time.sleep(0.25)
+    raise RuntimeError(f"gunicorn did not answer on {url} within {timeout:.0f} s")
+
+
+def run_gunicorn(worker_class: str, args) -> dict:
+    scratch = tempfile.mkdtemp(prefix='load-test-')
+    port = _free_port()
+    command = [
+        sys.executable, '-m', 'gunicorn', 'app:app',
+        '--bind', f'127.0.0.1:{port}',
+        '--worker-class', worker_class,
+        '--workers', str(args.workers),
+        '--timeout', '120',
+        '--log-level', 'warning',
+    ]
+    slots = args.workers
+    if worker_class == 'gthread':
+        command += ['--threads', str(args.threads)]
+        slots *= args.threads
+    elif worker_class == 'sync':
+        # With more than one thread gunicorn would quietly run gthread workers instead
+        command += ['--threads', '1']
+    elif worker_class in ('eventlet', 'gevent'):
+        command += ['--worker-connections', str(args.worker_connections)]
+        slots *= args.worker_connections
+
+    log_path = os.path.join(scratch, 'gunicorn.log')
+    with open(log_path, 'w') as log_file:
+        process = subprocess.Popen(
+            command, cwd=ROOT, env={**os.environ, **fake_llm_environment(args, scratch)},
+            stdout=log_file, stderr=subprocess.STDOUT
+        )
+    url = f'http://127.0.0.1:{port}'
+    try:
+        _wait_until_up(url, process)
+
+        def fetch_metrics():
+            with urllib.request.urlopen(url + '/metrics', timeout=5) as response:
+                return response.read().decode()
+
+        summary = run_load(lambda: HTTPStudent(url, args.request_timeout), fetch_metrics, args, slots)
+        summary['server'] = {'worker_class': worker_class, 'workers': args.workers, 'slots': slots}
+        return summary
+    except RuntimeError:
+        with open(log_path) as log_file:
+            print(log_file.read()[-4000:])
+        raise
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def run_in_process(args) -> dict:
+    scratch = tempfile.mkdtemp(prefix='load-test-')
+    os.environ.update(fake_llm_environment(args, scratch))
+    try:
+        import app as app_module
+        client = app_module.app.test_client()
+        summary = run_load(
+            lambda: TestClientStudent(app_module.app),
+            lambda: client.get('/metrics').get_data(as_text=True),
+            args
+        )
+        summary['server'] = {'worker_class': 'in-process'}
+        return summary
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--url', help='drive an already running server instead of launching gunicorn')
+    target.add_argument('--in-process', action='store_true', help="drive the app through Flask's test client")
+    parser.add_argument('--worker-class', default='sync,gthread',
+                        help=f"comma-separated gunicorn worker classes, or 'all' ({', '.join(WORKER_CLASSES)})")
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=8, help='threads per gthread worker')
+    parser.add_argument('--worker-connections', type=int, default=200, help='connections per eventlet/gevent worker')
+    parser.add_argument('--students', type=int, default=200, help='students taken through the flow')
+    parser.add_argument('--users', type=int, default=20, help='students in the flow at the same time')
+    parser.add_argument('--sse', action='store_true', help='wait for the report on /result/stream instead of polling')
+    parser.add_argument('--poll-interval', type=float, default=0.5, help='seconds between /result/status polls')
+    parser.add_argument('--report-timeout', type=float, default=300, help='give up on a report after this many seconds')
+    parser.add_argument('--request-timeout', type=float, default=120, help='HTTP timeout per request')
+    parser.add_argument('--sample-interval', type=float, default=1.0, help='seconds between /metrics samples')
+    parser.add_argument('--llm-latency', default='lognormal:2,0.4', help='fake model latency spec (see fake_gemini.py)')
+    parser.add_argument('--llm-error-rate', type=float, default=0.0, help='share of fake model calls that fail')
+    parser.add_argument('--llm-malformed-rate', type=float, default=0.0, help='share of fake responses that are malformed')
+    parser.add_argument('--llm-time-scale', type=float, default=1.0, help='multiplier for the fake model latency')
+    parser.add_argument('--no-llm-stream', dest='llm_stream', action='store_false', help='disable response streaming')
+    parser.add_argument('--seed', type=int, default=1, help='seed for answers and the fake model')
+    parser.add_argument('--output', help='write the summaries to this JSON file')
+    args = parser.parse_args()
+
+    results = {}
+    if args.in_process:
+        results['in-process'] = run_in_process(args)
+        print_summary('in-process', results['in-process'])
+    elif args.url:
+        def fetch_metrics():
+            with urllib.request.urlopen(args.url.rstrip('/') + '/metrics', timeout=5) as response:
+                return response.read().decode()
+        results[args.url] = run_load(lambda: HTTPStudent(args.url, args.request_timeout), fetch_metrics, args)
+        print_summary(args.url, results[args.url])
+    else:
+        classes = list(WORKER_CLASSES) if args.worker_class == 'all' else args.worker_class.split(',')
+        for worker_class in classes:
+            if worker_class not in WORKER_CLASSES:
+                parser.error(f"Unknown worker class '{worker_class}'")
+            library = WORKER_CLASSES[worker_class]
+            if library and importlib.util.find_spec(library) is None:
+                print(f"\n== {worker_class}: skipped ({library} is not installed)")
+                continue
+            results[worker_class] = run_gunicorn(worker_class, args)
+            print_summary(worker_class, results[worker_class])
+
+        if len(results) > 1:
+            print(f"\n{'worker class':<12} {'students/s':>11} {'requests/s':>11} {'report p95 s':>13} {'failed':>7}")
+            for worker_class, summary in results.items():
+                report = summary['steps'].get('report ready (after last page)', {})
+                print(f"{worker_class:<12} {summary['students_per_s']:>11.2f} {summary['requests_per_s']:>11.1f} "
+                      f"{report.get('p95_ms', float('nan')) / 1000:>13.2f} {summary['students']['failed']:>7}")
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
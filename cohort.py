@@ -0,0 +1,297 @@
+"""
+Bulk cohort assessments.
+
+A cohort upload (CSV or JSONL, one student per row) is normalized into a job
+directory, then each student is scored and sent through suggestion
+generation with bounded concurrency. Results are appended to the job's
+results.jsonl as they complete and streamed back to the caller line by line,
+so an interrupted job can be resumed: students already in results.jsonl are
+not generated again. A job runs under an exclusive lock on its run.lock
+file, so two resumes can't generate the same students at once.
+"""
+import csv
+import fcntl
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from answer_set import AnswerSet, OPTIONS
+from traits import MAX_QUESTION, score_answers
+
+_JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+class CohortError(ValueError):
+    """Raised for malformed cohort uploads or unknown jobs."""
+
+
+def _parse_answers(record: dict, row_number: int) -> str:
+    """
+    Accepts either an `answers` string (character i answers question i + 1,
+    '-' for a skipped question), an `assessment_answers` mapping of question
+    number -> option, or columns q1..qN. Returns the answers in
+    AnswerSet.encode() form. Unknown questions or options are rejected rather
+    than dropped, so no student is generated from fewer answers than uploaded.
+    """
+    answers = {}
+
+    def add(question, option, field: str):
+        option = str(option).strip().upper()
+        if option not in OPTIONS:
+            raise CohortError(
+                f"Row {row_number}: {field} has option '{option}', expected one of {', '.join(OPTIONS)}"
+            )
+        answers[question] = option
+
+    mapping = record.get('assessment_answers')
+    vector = record.get('answers')
+    if isinstance(mapping, dict):
+        for question, option in mapping.items():
+            try:
+                number = int(question)
+            except (TypeError, ValueError):
+                number = None
+            if number is None or not 0 < number <= MAX_QUESTION:
+                raise CohortError(f"Row {row_number}: unknown question '{question}' in 'assessment_answers' "
+                                  f"(expected 1..{MAX_QUESTION})")
+            add(number, option, f"question {number}")
+    elif isinstance(vector, str) and vector.strip():
+        vector = vector.strip().upper()
+        if len(vector) > MAX_QUESTION:
+            raise CohortError(f"Row {row_number}: 'answers' has {len(vector)} characters, expected at most {MAX_QUESTION}")
+        for number, option in enumerate(vector, start=1):
+            if option != '-':
+                add(number, option, f"'answers' character {number}")
+    else:
+        for question in range(1, MAX_QUESTION + 1):
+            option = (record.get(f'q{question}') or '').strip()
+            if option:
+                add(question, option, f"q{question}")
+
+    if not answers:
+        raise CohortError(f"Row {row_number}: no answers found (use 'answers', 'assessment_answers' or q1..q{MAX_QUESTION})")
+    return AnswerSet.from_dict(answers).encode()
+
+
+def _normalize_record(record: dict, row_number: int) -> dict:
+    student = {
+        'student_id': str(record.get('student_id') or row_number),
+        'student_name': (record.get('student_name') or 'Student').strip(),
+        'graduation_subjects': (record.get('graduation_subjects') or 'None specified').strip(),
+        'preferred_field': (record.get('preferred_field') or 'None specified').strip(),
+    }
+    student['assessment_answers'] = _parse_answers(record, row_number)
+    return student
+
+
+def parse_cohort(stream, file_format: str, max_students: int):
+    """
+    Parses an uploaded cohort file.
+
+    Args:
+        stream: Binary file object (e.g. request.files['file'].stream)
+        file_format (str): 'csv' or 'jsonl'
+        max_students (int): Upper bound on rows accepted
+
+    Yields:
+        dict: Normalized student records
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if file_format == 'csv':
+        records = csv.DictReader(text)
+    elif file_format == 'jsonl':
+        records = (json.loads(line) for line in text if line.strip())
+    else:
+        raise CohortError(f"Unsupported cohort format '{file_format}'. Use 'csv' or 'jsonl'.")
+
+    seen_ids = set()
+    try:
+        for row_number, record in enumerate(records, start=1):
+            if row_number > max_students:
+                raise CohortError(f"Cohort is larger than the limit of {max_students} students")
+            if not isinstance(record, dict):
+                raise CohortError(f"Row {row_number}: expected an object")
+            student = _normalize_record(record, row_number)
+            if student['student_id'] in seen_ids:
+                raise CohortError(f"Row {row_number}: duplicate student_id '{student['student_id']}'")
+            seen_ids.add(student['student_id'])
+            yield student
+    except CohortError:
+        raise
+    except (ValueError, csv.Error) as e:
+        raise CohortError(f"Could not parse cohort file: {e}")
+
+
+class CohortJob:
+    """A cohort run persisted under `<base_dir>/<job_id>/` (input.jsonl + results.jsonl)."""
+
+    def __init__(self, base_dir: str, job_id: str):
+        if not _JOB_ID_PATTERN.match(job_id):
+            raise CohortError(f"Invalid cohort job id '{job_id}'")
+        self.job_id = job_id
+        self.directory = os.path.join(base_dir, job_id)
+        self.input_path = os.path.join(self.directory, 'input.jsonl')
+        self.results_path = os.path.join(self.directory, 'results.jsonl')
+        self.lock_path = os.path.join(self.directory, 'run.lock')
+        self._write_lock = threading.Lock()
+        self._run_lock_fd = None
+
+    @classmethod
+    def create(cls, base_dir: str, students) -> 'CohortJob':
+        """
+        Writes the normalized students of a new upload to a fresh job directory.
+        `students` may raise CohortError midway, so the input is written under a
+        temporary name and renamed once complete; a rejected upload leaves nothing.
+        """
+        job = cls(base_dir, uuid.uuid4().hex)
+        os.makedirs(base_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix='.upload-', dir=base_dir)
+        try:
+            count = 0
+            with open(os.path.join(staging, os.path.basename(job.input_path)), 'w', encoding='utf-8') as input_file:
+                for student in students:
+                    input_file.write(json.dumps(student) + '\n')
+                    count += 1
+            if not count:
+                raise CohortError("Cohort file contains no students")
+            os.rename(staging, job.directory)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return job
+
+    @classmethod
+    def load(cls, base_dir: str, job_id: str) -> 'CohortJob':
+        job = cls(base_dir, job_id)
+        if not os.path.exists(job.input_path):
+            raise CohortError(f"Unknown cohort job '{job_id}'")
+        return job
+
+    def acquire_run_lock(self) -> bool:
+        """
+        Takes the job's run lock without waiting. Returns False if another run
+        (in any thread or process on this host) holds it. The lock is an flock,
+        so the OS releases it if the holding process dies.
+        """
+        fd = os.open(self.lock_path, os.O_CREAT | os.O_WRONLY, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._run_lock_fd = fd
+        return True
+
+    def release_run_lock(self):
+        if self._run_lock_fd is not None:
+            fd, self._run_lock_fd = self._run_lock_fd, None
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def students(self):
+        with open(self.input_path, encoding='utf-8') as input_file:
+            for line in input_file:
+                yield json.loads(line)
+
+    def results(self):
+        """Yields the raw JSONL lines recorded so far (a trailing partial line is skipped)."""
+        if not os.path.exists(self.results_path):
+            return
+        with open(self.results_path, encoding='utf-8') as results_file:
+            for line in results_file:
+                if line.endswith('\n'):
+                    yield line
+
+    def completed_ids(self) -> set:
+        completed = set()
+        for line in self.results():
+            result = json.loads(line)
+            if result.get('status') == 'ok':
+                completed.add(result['student_id'])
+        return completed
+
+    def record(self, result: dict) -> str:
+        line = json.dumps(result) + '\n'
+        with self._write_lock:
+            with open(self.results_path, 'a', encoding='utf-8') as results_file:
+                results_file.write(line)
+                results_file.flush()
+        return line
+
+
+def process_student(student: dict, generate) -> dict:
+    """Scores one student and generates their suggestion with `generate(profile)`."""
+    started = time.perf_counter()
+    trait_scores = score_answers(student['assessment_answers'], top_n=10)
+    result = {
+        'student_id': student['student_id'],
+        'student_name': student['student_name'],
+        'top_traits': trait_scores.top,
+        'trait_summary': trait_scores.summary,
+    }
+    try:
+        result['suggestion'] = generate(student)
+        result['status'] = 'ok'
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = str(e)
+    result['elapsed_ms'] = round((time.perf_counter() - started) * 1000)
+    return result
+
+
+def _process_and_record(job: CohortJob, student: dict, generate) -> str:
+    # Recorded from the worker thread, so finished work is kept even if nobody is reading the stream
+    return job.record(process_student(student, generate))
+
+
+def run_cohort(job: CohortJob, generate, max_concurrency: int = 4, include_previous: bool = True):
+    """
+    Runs the students of `job` that have no successful result yet.
+
+    Keeps at most `max_concurrency` generations in flight and yields each
+    result as a JSONL line as soon as it completes. If the consumer stops
+    early (e.g. the client disconnects), queued work is cancelled and the job
+    can be resumed later.
+
+    The caller must hold the job's run lock (CohortJob.acquire_run_lock());
+    it is released when the run finishes or is abandoned.
+    """
+    if job._run_lock_fd is None:
+        raise CohortError(f"Cohort job '{job.job_id}' must be locked before it runs")
+    try:
+        yield from _run_locked(job, generate, max_concurrency, include_previous)
+    finally:
+        job.release_run_lock()
+
+
+def _run_locked(job: CohortJob, generate, max_concurrency: int, include_previous: bool):
+    if include_previous:
+        for line in job.results():
+            if json.loads(line).get('status') == 'ok':
+                yield line
+
+    completed = job.completed_ids()
+    pending_students = (student for student in job.students() if student['student_id'] not in completed)
+
+    executor = ThreadPoolExecutor(max_workers=max_concurrency)
+    in_flight = set()
+    try:
+        for student in pending_students:
+            if len(in_flight) >= max_concurrency:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            in_flight.add(executor.submit(_process_and_record, job, student, generate))
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
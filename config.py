@@ -8,6 +8,123 @@ class Config:
     if os.environ.get('FLASK_ENV') == 'production' and SECRET_KEY is None:
         raise ValueError("SECRET_KEY is not set in production environment variables!")
     GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
+    # 'grpc' (the SDK default when unset) or 'rest'; cooperative gunicorn workers need 'rest'
+    # (gunicorn.conf.py sets it for them).
+    GEMINI_TRANSPORT = os.environ.get('GEMINI_TRANSPORT') or None
+    # 'gemini' calls the API. 'fake' answers locally with FakeGeminiModel (fake_gemini.py) for
+    # offline load tests; the FAKE_LLM_* settings shape its latency, errors and malformed outputs.
+    LLM_BACKEND = os.environ.get('LLM_BACKEND', 'gemini')
+    FAKE_LLM_LATENCY = os.environ.get('FAKE_LLM_LATENCY', 'lognormal:2,0.4')
+    FAKE_LLM_ERROR_RATE = float(os.environ.get('FAKE_LLM_ERROR_RATE', 0))
+    FAKE_LLM_MALFORMED_RATE = float(os.environ.get('FAKE_LLM_MALFORMED_RATE', 0))
+    FAKE_LLM_STREAM_CHUNKS = int(os.environ.get('FAKE_LLM_STREAM_CHUNKS', 12))
+    FAKE_LLM_TIME_SCALE = float(os.environ.get('FAKE_LLM_TIME_SCALE', 1))
+    FAKE_LLM_SEED = int(os.environ['FAKE_LLM_SEED']) if os.environ.get('FAKE_LLM_SEED') else None
+
+    # Report generation runs in the background; see jobs.py for the available backends.
+    REPORT_JOB_BACKEND = os.environ.get('REPORT_JOB_BACKEND', 'thread')
+    REPORT_JOB_WORKERS = int(os.environ.get('REPORT_JOB_WORKERS', 4))
+    # Seconds a finished job's status is kept (for the generating page) before it is dropped.
+    REPORT_JOB_TTL = int(os.environ.get('REPORT_JOB_TTL', 3600))
+    # How often (in milliseconds) the "generating" page polls for the report status.
+    REPORT_POLL_INTERVAL_MS = int(os.environ.get('REPORT_POLL_INTERVAL_MS', 2000))
+    # Stream the Gemini response and push finished sections to the generating page over SSE.
+    REPORT_STREAMING = os.environ.get('REPORT_STREAMING', '1') == '1'
+    REPORT_STREAM_TIMEOUT = int(os.environ.get('REPORT_STREAM_TIMEOUT', 300))
+    # 'single': one request for the whole report. 'fanout': an analysis call, then concurrent
+    # per-career and clarity calls (see report_fanout.py).
+    GENERATION_MODE = os.environ.get('GENERATION_MODE', 'single')
+    GENERATION_FANOUT_WORKERS = int(os.environ.get('GENERATION_FANOUT_WORKERS', 9))
+    # Local recommender (local_recommender.py): 'fallback' serves it when the LLM fails,
+    # 'instant' also shows it immediately while the LLM report is generated, 'off' disables it.
+    LOCAL_RECOMMENDER = os.environ.get('LOCAL_RECOMMENDER', 'fallback')
+    # Careers x traits table; defaults to data/career_profiles_v1.json.
+    CAREER_PROFILES_PATH = os.environ.get('CAREER_PROFILES_PATH')
+
+    # Outbound Gemini calls (see llm_client.py). Limits are per process; divide by the worker count.
+    LLM_RATE_PER_SECOND = float(os.environ.get('LLM_RATE_PER_SECOND', 5))
+    LLM_BURST = int(os.environ.get('LLM_BURST', 10))
+    LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', 8))
+    LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', 2))
+    LLM_RETRY_BASE_DELAY = float(os.environ.get('LLM_RETRY_BASE_DELAY', 1.0))
+    LLM_RETRY_MAX_DELAY = float(os.environ.get('LLM_RETRY_MAX_DELAY', 30.0))
+    LLM_REQUEST_TIMEOUT = float(os.environ.get('LLM_REQUEST_TIMEOUT', 120.0))
+    LLM_BREAKER_FAILURES = int(os.environ.get('LLM_BREAKER_FAILURES', 5))
+    LLM_BREAKER_RESET_SECONDS = float(os.environ.get('LLM_BREAKER_RESET_SECONDS', 30.0))
+
+    # Cache of validated suggestions keyed on the prompt inputs (see suggestion_cache.py).
+    # Set SUGGESTION_CACHE_PATH to an SQLite file to share entries between workers.
+    SUGGESTION_CACHE_SIZE = int(os.environ.get('SUGGESTION_CACHE_SIZE', 1024))
+    SUGGESTION_CACHE_PATH = os.environ.get('SUGGESTION_CACHE_PATH')
+    SUGGESTION_CACHE_TTL = int(os.environ.get('SUGGESTION_CACHE_TTL', 7 * 24 * 3600))
+    # Near-identical profiles (trait counts within SIMILARITY_CACHE_THRESHOLD, same subjects and
+    # field) reuse a stored report's careers; only the personalized text is generated (see
+    # similarity_cache.py). A threshold of 0 disables it.
+    SIMILARITY_CACHE_SIZE = int(os.environ.get('SIMILARITY_CACHE_SIZE', 1024))
+    SIMILARITY_CACHE_THRESHOLD = int(os.environ.get('SIMILARITY_CACHE_THRESHOLD', 4))
+
+    # Session storage shared by all workers (see session_store.py). Relative SQLite
+    # paths are created in the Flask instance folder; any SQLAlchemy URL works.
+    SESSION_STORE_BACKEND = os.environ.get('SESSION_STORE_BACKEND', 'sqlalchemy')
+    SESSION_STORE_TTL = int(os.environ.get('SESSION_STORE_TTL', 24 * 3600))
+    SESSION_STORE_SWEEP_INTERVAL = int(os.environ.get('SESSION_STORE_SWEEP_INTERVAL', 600))
+    # Sessions in use get their TTL pushed back at most this often (seconds), even when unchanged
+    SESSION_REFRESH_INTERVAL = int(os.environ.get('SESSION_REFRESH_INTERVAL', 600))
+
+    # Identical suggestion generations are coalesced (see singleflight.py); a worker's claim on
+    # a prompt expires after SINGLE_FLIGHT_LEASE_SECONDS so a crashed worker can't block others.
+    SINGLE_FLIGHT_LEASE_SECONDS = int(os.environ.get('SINGLE_FLIGHT_LEASE_SECONDS', 600))
+    SINGLE_FLIGHT_POLL_INTERVAL = float(os.environ.get('SINGLE_FLIGHT_POLL_INTERVAL', 0.5))
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///sessions.db')
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DATABASE_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DATABASE_MAX_OVERFLOW', 10)),
+        'pool_pre_ping': True,
+        'pool_recycle': 1800,
+    }
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # 'server' keeps only an opaque session id in the cookie and the session contents
+    # in the session store; 'cookie' uses Flask's default signed-cookie sessions.
+    SESSION_MODE = os.environ.get('SESSION_MODE', 'server')
+
+    # Rendered PDFs are kept here (defaults to <instance folder>/reports) and in a
+    # bounded in-memory LRU, so repeat downloads don't re-render.
+    REPORT_ARTIFACT_DIR = os.environ.get('REPORT_ARTIFACT_DIR')
+    REPORT_ARTIFACT_MEMORY_MB = int(os.environ.get('REPORT_ARTIFACT_MEMORY_MB', 64))
+    # Compress HTML and JSON responses on the fly (gzip, or brotli if installed; see response_compression.py).
+    COMPRESS_RESPONSES = os.environ.get('COMPRESS_RESPONSES', '1') == '1'
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 500))
+    COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 5))
+
+    # Load the Gemini SDK and the PDF renderer at import instead of on first use. gunicorn.conf.py
+    # turns this on with GUNICORN_PRELOAD=1, so it happens once in the master before workers fork.
+    WARM_UP = os.environ.get('WARM_UP', '0') == '1'
+
+    # Rendered /result pages, kept in memory per worker and revalidated with ETags.
+    RESULT_PAGE_CACHE_MB = int(os.environ.get('RESULT_PAGE_CACHE_MB', 16))
+
+    # Bulk cohort runs (see cohort.py); job files default to <instance folder>/cohorts.
+    # Every student is a paid Gemini call, so the /cohort endpoints require this key
+    # (as 'Authorization: Bearer <key>') and are disabled while it is unset.
+    COHORT_API_KEY = os.environ.get('COHORT_API_KEY')
+    COHORT_DIR = os.environ.get('COHORT_DIR')
+    COHORT_MAX_CONCURRENCY = int(os.environ.get('COHORT_MAX_CONCURRENCY', 4))
+    COHORT_MAX_STUDENTS = int(os.environ.get('COHORT_MAX_STUDENTS', 500))
+
+    # Render processes for a cohort's bulk PDF archive (batch_reports.py); unset = all cores.
+    BATCH_REPORT_WORKERS = int(os.environ['BATCH_REPORT_WORKERS']) if os.environ.get('BATCH_REPORT_WORKERS') else None
+
+    # Prometheus metrics (see metrics.py). Every worker writes its counters to METRICS_DIR
+    # (defaults to <instance folder>/metrics) every METRICS_FLUSH_INTERVAL seconds, and
+    # /metrics on any worker reports the sum. gunicorn.conf.py empties it on startup; do the
+    # same when running under another server.
+    METRICS_DIR = os.environ.get('METRICS_DIR')
+    METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+
+    # Versioned question bank data file; defaults to data/question_bank_v1.json (see question_bank.py).
+    QUESTION_BANK_PATH = os.environ.get('QUESTION_BANK_PATH')
 
     HIGH_SCHOOL_SUBJECTS = [
         "Physics", "Chemistry", "Biology", "Mathematics", "Computer Science",
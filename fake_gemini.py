@@ -0,0 +1,211 @@
+"""
+Offline stand-in for the Gemini model.
+
+FakeGeminiModel has the slice of the genai.GenerativeModel interface the
+LLM client uses (generate_content, unary or streamed) and answers every
+prompt with schema-valid JSON of the shape the prompt asks for: a full
+suggestion, or one of the fan-out or personalization pieces. Latency, API
+errors and malformed outputs are drawn from configurable distributions, so
+the whole flow can be load-tested without network access or API quota.
+
+Enabled with LLM_BACKEND=fake (see config.py).
+"""
+import json
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+from google.api_core import exceptions as api_exceptions
+
+_WORDS = ("curious analytical creative structured empathetic resilient focused driven adaptable "
+          "research design leadership communication teamwork innovation").split()
+
+_CAREERS = (
+    ('Software Engineer', ['JEE Main', 'JEE Advanced', 'BITSAT'], ['B.Tech Computer Science', 'B.Sc. Computer Science']),
+    ('Data Scientist', ['JEE Main', 'CUET'], ['B.Sc. Statistics', 'B.Tech Data Science']),
+    ('Product Designer', ['UCEED', 'NID DAT'], ['B.Des. Interaction Design', 'B.Des. Product Design']),
+    ('Doctor', ['NEET UG'], ['MBBS', 'BDS']),
+    ('Chartered Accountant', ['CA Foundation'], ['B.Com', 'CA']),
+    ('Lawyer', ['CLAT', 'AILET'], ['BA LLB', 'BBA LLB']),
+    ('Psychologist', ['CUET'], ['B.A. Psychology', 'B.Sc. Psychology']),
+    ('Architect', ['NATA', 'JEE Main Paper 2'], ['B.Arch']),
+    ('Journalist', ['IIMC Entrance', 'CUET'], ['B.A. Journalism and Mass Communication']),
+    ('Civil Services Officer', ['UPSC CSE'], ['B.A. Political Science', 'B.A. Economics']),
+)
+_MATCH_SCORES = ('Highly Aligned', 'Well Aligned', 'Decently Aligned')
+
+
+def parse_latency(spec: str):
+    """
+    Returns a sampler for a latency spec, in seconds:
+      'fixed:1.5', 'uniform:0.5,3', 'lognormal:2,0.5' (median, sigma) or 'exponential:1.2' (mean).
+    """
+    name, _, args = spec.partition(':')
+    try:
+        values = [float(value) for value in args.split(',')] if args else []
+        if name == 'fixed' and len(values) == 1:
+            return lambda rng: values[0]
+        if name == 'uniform' and len(values) == 2:
+            return lambda rng: rng.uniform(values[0], values[1])
+        if name == 'lognormal' and len(values) == 2:
+            import math
+            mu = math.log(values[0])
+            return lambda rng: rng.lognormvariate(mu, values[1])
+        if name == 'exponential' and len(values) == 1:
+            return lambda rng: rng.expovariate(1 / values[0])
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid latency spec '{spec}'")
+
+
+def _text(rng, words: int) -> str:
+    sentences = []
+    while words > 0:
+        length = min(words, rng.randint(8, 16))
+        sentence = ' '.join(rng.choice(_WORDS) for _ in range(length))
+        sentences.append(sentence[0].upper() + sentence[1:] + '.')
+        words -= length
+    # A bit of markdown, as the real model returns
+    return f"**{sentences[0]}** " + ' '.join(sentences[1:])
+
+
+def _career(rng, index: int, with_details: bool = True) -> dict:
+    name, exams, degrees = _CAREERS[index % len(_CAREERS)]
+    career = {'name': name, 'match_score': _MATCH_SCORES[min(index // 3, 2)]}
+    if with_details:
+        career.update(explanation=_text(rng, 250), competitive_exams=list(exams), degree_courses=list(degrees))
+    return career
+
+
+def _mbti(rng) -> dict:
+    return {
+        'type': rng.choice(['INTJ - The Architect', 'ENFP - The Campaigner', 'ISTJ - The Logistician', 'ENTJ - The Commander']),
+        'explanation': _text(rng, 400),
+        'strengths': rng.sample(['Analytical', 'Strategic', 'Creative', 'Organized', 'Empathetic', 'Focused', 'Curious'], 5),
+        'weaknesses': rng.sample(['Stubborn', 'Critical', 'Impatient', 'Perfectionist', 'Overthinking', 'Restless'], 5),
+    }
+
+
+def fake_response_document(prompt: str, rng) -> dict:
+    """Builds a valid response for whichever JSON structure `prompt` requests."""
+    structure = prompt.split('### Required JSON Structure:', 1)[-1]
+    if '"career_alignments"' in structure:
+        return {
+            'mbti_result': _mbti(rng),
+            'career_alignments': [_career(rng, index) for index in range(8)],
+            'clarity_and_impact': _text(rng, 400),
+        }
+    if '"mbti_result"' in structure and '"clarity_and_impact"' in structure:
+        return {'mbti_result': _mbti(rng), 'clarity_and_impact': _text(rng, 400)}
+    if '"careers"' in structure:
+        return {'mbti_result': _mbti(rng), 'careers': [_career(rng, index, with_details=False) for index in range(8)]}
+    if '"competitive_exams"' in structure:
+        career = _career(rng, rng.randrange(len(_CAREERS)))
+        keys = ('explanation', 'competitive_exams', 'degree_courses')
+        if '"match_score"' in structure:
+            keys = ('match_score',) + keys
+        return {key: career[key] for key in keys}
+    if '"clarity_and_impact"' in structure:
+        return {'clarity_and_impact': _text(rng, 400)}
+    return _mbti(rng)
+
+
+def _malform(text: str, rng) -> str:
+    """A malformed variant of a valid response: some are repairable near-misses, some are not."""
+    kind = rng.choice(('fence', 'trailing_comma', 'truncated', 'not_json'))
+    if kind == 'fence':
+        return f"```json\n{text}\n```"
+    if kind == 'trailing_comma':
+        return text[:-1] + ',}'
+    if kind == 'truncated':
+        return text[:rng.randint(1, max(1, len(text) // 2))]
+    return "I'm sorry, I can't help with that."
+
+
+def _chunk(text: str):
+    return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[SimpleNamespace(text=text)]))])
+
+
+class _StreamedResponse:
+    """Iterates over chunks with the latency spread out, then exposes usage_metadata like the SDK."""
+
+    def __init__(self, chunks, delays, usage):
+        self._chunks = chunks
+        self._delays = delays
+        self.usage_metadata = usage
+
+    def __iter__(self):
+        for chunk, delay in zip(self._chunks, self._delays):
+            time.sleep(delay)
+            yield _chunk(chunk)
+
+
+class FakeGeminiModel:
+    """
+    Args:
+        latency (str): Latency spec for a whole response (see parse_latency)
+        error_rate (float): Share of calls failing with a retryable API error (429/503)
+        malformed_rate (float): Share of responses that are not schema-valid JSON
+        stream_chunks (int): Chunks a streamed response is split into
+        time_scale (float): Multiplies every sampled latency (e.g. 0.01 for quick runs)
+        seed (int): Seed for reproducible runs; None for a random one
+    """
+
+    def __init__(self, latency: str = 'lognormal:2,0.4', error_rate: float = 0.0, malformed_rate: float = 0.0,
+                 stream_chunks: int = 12, time_scale: float = 1.0, seed: int = None):
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.stream_chunks = max(1, stream_chunks)
+        self.time_scale = time_scale
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            latency=config['FAKE_LLM_LATENCY'],
+            error_rate=config['FAKE_LLM_ERROR_RATE'],
+            malformed_rate=config['FAKE_LLM_MALFORMED_RATE'],
+            stream_chunks=config['FAKE_LLM_STREAM_CHUNKS'],
+            time_scale=config['FAKE_LLM_TIME_SCALE'],
+            seed=config['FAKE_LLM_SEED'],
+        )
+
+    def _draw(self):
+        # One shared generator, so a seeded run is reproducible; each call gets its own child generator
+        with self._lock:
+            self.calls += 1
+            return (
+                random.Random(self._rng.random()),
+                self.sample_latency(self._rng) * self.time_scale,
+                self._rng.random() < self.error_rate,
+                self._rng.random() < self.malformed_rate,
+            )
+
+    def generate_content(self, prompt, generation_config=None, request_options=None, stream=False):
+        rng, latency, fail, malformed = self._draw()
+        if fail:
+            time.sleep(latency * rng.uniform(0.05, 0.3))
+            error_class = rng.choice((api_exceptions.ResourceExhausted, api_exceptions.ServiceUnavailable))
+            raise error_class("Fake Gemini: simulated upstream failure")
+
+        text = json.dumps(fake_response_document(prompt, rng))
+        if malformed:
+            text = _malform(text, rng)
+        usage = SimpleNamespace(prompt_token_count=len(prompt) // 4, candidates_token_count=len(text) // 4)
+
+        if not stream:
+            time.sleep(latency)
+            response = _chunk(text)
+            response.usage_metadata = usage
+            return response
+
+        size = -(-len(text) // self.stream_chunks)
+        chunks = [text[start:start + size] for start in range(0, len(text), size)]
+        # About a fifth of the latency before the first chunk, the rest spread over the others
+        first = latency * 0.2
+        rest = (latency - first) / max(1, len(chunks) - 1)
+        return _StreamedResponse(chunks, [first] + [rest] * (len(chunks) - 1), usage)
@@ -0,0 +1,89 @@
+"""
+Gunicorn settings; gunicorn loads this file from the working directory, so
+`gunicorn app:app` is all the Procfile, render.yaml and Dockerfile need.
+
+GUNICORN_WORKER_CLASS selects the serving mode:
+  * 'eventlet' (default): cooperative workers. Sockets, sleeps, locks and
+    threads are monkey-patched, so a report generation waiting on Gemini
+    costs a greenlet instead of an OS thread, and one worker holds hundreds
+    of them. Gemini is called over REST, since gRPC blocks the event loop.
+  * 'gthread' / 'sync': OS threads or a single request per worker, with the
+    thread-sized defaults from config.py.
+Command-line flags (e.g. --worker-class) override these settings, and the
+per-worker defaults below follow the worker class actually in use.
+
+GUNICORN_PRELOAD=1 (gthread / sync only) imports the app once in the master,
+with WARM_UP on so the Gemini SDK and report fonts load there too, and forks
+workers that share those pages copy-on-write: a new worker serves its first
+request without paying the import. Cooperative workers can't preload, since
+the standard library must be monkey-patched before the app is imported; they
+rely on the app loading its heavy parts lazily instead.
+
+See "Serving modes" in README.md for measured throughput of each mode.
+"""
+import gc
+import glob
+import os
+
+COOPERATIVE_WORKER_CLASSES = ('eventlet', 'gevent')
+
+# Defaults for cooperative workers; any of them set in the environment wins
+COOPERATIVE_DEFAULTS = {
+    # requests' sockets are patched; gRPC's are not and would stall every greenlet in the worker
+    'GEMINI_TRANSPORT': 'rest',
+    # Generations waiting on the API are greenlets, so these can be in the hundreds
+    'REPORT_JOB_WORKERS': '500',
+    'LLM_MAX_CONCURRENCY': '500',
+}
+
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'eventlet')
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+# gunicorn turns any worker class into gthread when threads > 1, so only gthread gets more than one
+threads = int(os.environ.get('GUNICORN_THREADS', 8)) if worker_class == 'gthread' else 1
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+# Cooperative workers must import the app after monkey-patching the standard library
+preload_app = (os.environ.get('GUNICORN_PRELOAD', '0') == '1'
+               and worker_class not in COOPERATIVE_WORKER_CLASSES)
+if preload_app:
+    # Read by config.py when the master imports the app
+    os.environ.setdefault('WARM_UP', '1')
+
+
+def _metrics_dir():
+    return os.environ.get('METRICS_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'metrics')
+
+
+def on_starting(server):
+    # Counters left by the previous deployment's workers would be summed into /metrics
+    for path in glob.glob(os.path.join(_metrics_dir(), 'metrics-*.json')):
+        os.remove(path)
+
+
+def child_exit(server, worker):
+    # Keep the exited worker's counters (in metrics-dead.json) without leaving its snapshot behind.
+    # metrics.py only uses the standard library, so importing it doesn't load the app into the master.
+    import metrics
+    try:
+        metrics.retire_snapshot(_metrics_dir(), worker.pid)
+    except OSError as e:
+        server.log.warning("Could not retire metrics of worker %s: %s", worker.pid, e)
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        # Move the preloaded objects out of the collector's reach, so collections in
+        # the workers don't write to (and un-share) the pages holding them
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    # Runs in the new worker before it imports the app, so config.py sees these
+    if server.cfg.worker_class_str in COOPERATIVE_WORKER_CLASSES:
+        for name, value in COOPERATIVE_DEFAULTS.items():
+            os.environ.setdefault(name, value)
+        if os.environ.get('REPORT_JOB_BACKEND', 'thread') == 'process':
+            server.log.warning("REPORT_JOB_BACKEND=process does not work with %s workers; use 'thread'",
+                               server.cfg.worker_class_str)
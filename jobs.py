@@ -0,0 +1,177 @@
+"""
+Background job queue for report generation.
+
+Jobs are keyed (by session id for reports) so that a key only ever has one
+job queued or running at a time. The web process submits work and returns
+immediately; the browser then polls the job status instead of holding a
+gunicorn worker while the LLM call runs.
+
+Finished records are kept for `finished_ttl` seconds, long enough for the
+browser to see the outcome, and then dropped, so a long-lived worker
+doesn't hold one record per report it ever generated.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+
+class JobBackend:
+    """Interface every job backend implements."""
+
+    def submit(self, key: str, fn, *args, **kwargs) -> dict:
+        """Queues `fn(*args, **kwargs)` under `key` unless a job for it is already active."""
+        raise NotImplementedError
+
+    def status(self, key: str):
+        """Returns the job record for `key`, or None if nothing was submitted."""
+        raise NotImplementedError
+
+    def active_count(self) -> int:
+        """Returns how many submitted jobs are pending or running."""
+        raise NotImplementedError
+
+    def forget(self, key: str):
+        """Drops a finished job record so the key can be submitted again."""
+        raise NotImplementedError
+
+    def shutdown(self, wait: bool = True):
+        raise NotImplementedError
+
+
+class ExecutorJobBackend(JobBackend):
+    """Job backend on top of a concurrent.futures executor."""
+
+    executor_class = ThreadPoolExecutor
+
+    def __init__(self, max_workers: int = 4, finished_ttl: float = 3600):
+        self._executor = self.executor_class(max_workers=max_workers)
+        self.finished_ttl = finished_ttl
+        self._jobs = {}
+        self._finished = OrderedDict()  # key -> finished_at, oldest first
+        self._lock = threading.Lock()
+
+    def submit(self, key: str, fn, *args, **kwargs) -> dict:
+        with self._lock:
+            self._evict_finished()
+            job = self._jobs.get(key)
+            if job and job['status'] in (JOB_PENDING, JOB_RUNNING):
+                return dict(job)
+            job = {'key': key, 'status': JOB_PENDING, 'error': None, 'submitted_at': time.time(), 'finished_at': None}
+            self._jobs[key] = job
+            self._finished.pop(key, None)
+
+        future = self._start(job, fn, args, kwargs)
+        future.add_done_callback(lambda f: self._finish(job, f))
+        return dict(job)
+
+    def _start(self, job: dict, fn, args, kwargs):
+        """Hands the job to the executor and returns its future."""
+        def run():
+            # Marked from the worker thread, when the job actually starts
+            with self._lock:
+                if job['status'] == JOB_PENDING:
+                    job['status'] = JOB_RUNNING
+            return fn(*args, **kwargs)
+        return self._executor.submit(run)
+
+    def _finish(self, job: dict, future):
+        with self._lock:
+            error = future.exception()
+            job['status'] = JOB_FAILED if error else JOB_DONE
+            job['error'] = str(error) if error else None
+            job['finished_at'] = time.time()
+            # A newer job may have replaced this record already
+            if self._jobs.get(job['key']) is job:
+                self._finished[job['key']] = job['finished_at']
+                self._finished.move_to_end(job['key'])
+        if error:
+            print(f"Background job {job['key']} failed: {error}")
+
+    def _evict_finished(self):
+        # Caller holds self._lock.
+        cutoff = time.time() - self.finished_ttl
+        while self._finished:
+            key, finished_at = next(iter(self._finished.items()))
+            if finished_at > cutoff:
+                break
+            del self._finished[key]
+            del self._jobs[key]
+
+    def status(self, key: str):
+        with self._lock:
+            self._evict_finished()
+            job = self._jobs.get(key)
+            return dict(job) if job else None
+
+    def active_count(self) -> int:
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job['status'] in (JOB_PENDING, JOB_RUNNING))
+
+    def forget(self, key: str):
+        with self._lock:
+            job = self._jobs.get(key)
+            if job and job['status'] in (JOB_DONE, JOB_FAILED):
+                del self._jobs[key]
+                self._finished.pop(key, None)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+class ThreadPoolJobBackend(ExecutorJobBackend):
+    """Runs jobs on threads inside the web worker process."""
+    executor_class = ThreadPoolExecutor
+
+
+class ProcessPoolJobBackend(ExecutorJobBackend):
+    """
+    Runs jobs in child processes. The job function and its arguments must be
+    picklable, and results must be written to a store shared between processes.
+    """
+    executor_class = ProcessPoolExecutor
+
+    def __init__(self, max_workers: int = 4, finished_ttl: float = 3600):
+        super().__init__(max_workers, finished_ttl)
+        self._futures = {}
+
+    def _start(self, job: dict, fn, args, kwargs):
+        # The child process can't update this process's records, so status() asks the future instead
+        future = self._executor.submit(fn, *args, **kwargs)
+        with self._lock:
+            self._futures[job['key']] = future
+        return future
+
+    def _finish(self, job: dict, future):
+        with self._lock:
+            if self._futures.get(job['key']) is future:
+                del self._futures[job['key']]
+        super()._finish(job, future)
+
+    def status(self, key: str):
+        with self._lock:
+            job = self._jobs.get(key)
+            future = self._futures.get(key)
+            if job and job['status'] == JOB_PENDING and future is not None and future.running():
+                job['status'] = JOB_RUNNING
+        return super().status(key)
+
+
+JOB_BACKENDS = {
+    'thread': ThreadPoolJobBackend,
+    'process': ProcessPoolJobBackend,
+}
+
+
+def create_job_backend(name: str = 'thread', max_workers: int = 4, finished_ttl: float = 3600) -> JobBackend:
+    """Builds the job backend registered under `name`. Finished job records are dropped after `finished_ttl` seconds."""
+    try:
+        backend_class = JOB_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown job backend '{name}'. Choose from: {', '.join(JOB_BACKENDS)}")
+    return backend_class(max_workers=max_workers, finished_ttl=finished_ttl)
@@ -0,0 +1,354 @@
+"""
+Gemini client layer.
+
+Every outbound generation goes through one LLMClient per process. The client
+reuses a single model (and its transport), and it:
+  - paces calls with a token bucket;
+  - caps concurrent calls with a semaphore;
+  - retries transient failures with jittered exponential backoff, honoring
+    the delay the server asks for on 429s;
+  - trips a circuit breaker after repeated upstream failures, so calls fail
+    fast while Gemini is unhealthy instead of tying up workers.
+"""
+import random
+import re
+import threading
+import time
+
+import metrics
+
+# HTTP status codes worth retrying; anything else from the API (400, 403, ...) fails immediately
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+_RETRY_DELAY_PATTERN = re.compile(r'retry_delay\s*\{\s*seconds:\s*(\d+)')
+
+
+LLM_CALL_SECONDS = metrics.histogram(
+    'llm_call_duration_seconds', 'Duration of Gemini API calls (one attempt), by outcome and mode.',
+    ('outcome', 'mode')
+)
+LLM_RETRIES = metrics.counter('llm_retries_total', 'Gemini calls retried after a failed or unusable attempt.')
+LLM_ERRORS = metrics.counter('llm_errors_total', 'Gemini API calls that raised, by whether they were retried.', ('retryable',))
+LLM_INVALID_RESPONSES = metrics.counter(
+    'llm_invalid_responses_total', 'Gemini responses rejected by their parser/validator.'
+)
+LLM_REJECTED = metrics.counter(
+    'llm_circuit_rejections_total', 'Generations refused without calling Gemini because the circuit was open.'
+)
+LLM_TOKENS = metrics.counter('llm_tokens_total', 'Tokens reported by Gemini usage metadata, by kind.', ('kind',))
+LLM_IN_FLIGHT = metrics.gauge('llm_calls_in_flight', 'Gemini API calls currently running.')
+
+
+def _record_usage(response):
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is None:
+        return
+    for kind, attribute in (('prompt', 'prompt_token_count'), ('completion', 'candidates_token_count')):
+        count = getattr(usage, attribute, None)
+        if isinstance(count, int) and count:
+            LLM_TOKENS.inc(count, kind=kind)
+
+
+class LLMError(RuntimeError):
+    """Raised when a generation could not be completed."""
+
+
+class CircuitOpenError(LLMError):
+    """Raised without calling the API while the circuit breaker is open."""
+
+
+class RateLimitTimeout(LLMError):
+    """Raised when no rate-limit token or concurrency slot became free in time."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float = None) -> bool:
+        """Takes one token, waiting up to `timeout` seconds (forever if None). Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+class LazyModel:
+    """
+    Stands in for a model that is built on first use. Importing
+    google.generativeai takes most of a second, which every worker would
+    otherwise pay before serving pages that never call the API.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._model = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Builds the model now (if it isn't yet) and returns it."""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._factory()
+        return self._model
+
+    def generate_content(self, *args, **kwargs):
+        return self.load().generate_content(*args, **kwargs)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive upstream failures. While open,
+    calls are rejected; after `reset_timeout` seconds a single trial call is
+    let through (half-open), and its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+            # Half-open: only one trial call at a time
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def release(self):
+        """Gives up a half-open trial slot without reporting an outcome."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+def retry_after_hint(error: Exception):
+    """Returns the delay in seconds the server asked for, if the error carries one."""
+    for detail in getattr(error, 'details', None) or ():
+        retry_delay = getattr(detail, 'retry_delay', None)
+        if retry_delay is not None:
+            return retry_delay.seconds + retry_delay.nanos / 1e9
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if headers:
+        try:
+            return float(headers.get('Retry-After'))
+        except (TypeError, ValueError):
+            pass
+    match = _RETRY_DELAY_PATTERN.search(str(error))
+    if match:
+        return float(match.group(1))
+    return None
+
+
+def classify_error(error: Exception):
+    """
+    Returns (retryable, upstream_failure) for an exception raised by the API call.
+
+    Status codes in RETRYABLE_STATUS_CODES and transport errors are retried
+    and count towards the circuit breaker. Other API errors (bad request,
+    permission denied, ...) are not retried. Errors without a status code,
+    such as an empty candidate list, are retried without blaming the upstream.
+    """
+    code = getattr(error, 'code', None)
+    if isinstance(code, int):
+        retryable = code in RETRYABLE_STATUS_CODES
+        return retryable, retryable
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True, True
+    return True, False
+
+
+class LLMClient:
+    """Rate-limited, concurrency-capped JSON generation with retries and a circuit breaker."""
+
+    def __init__(self, model, rate_per_second: float = 5.0, burst: int = 10, max_concurrency: int = 8,
+                 max_retries: int = 3, base_delay: float = 1.0, max_delay: float = 30.0,
+                 request_timeout: float = 120.0, acquire_timeout: float = 60.0,
+                 breaker: CircuitBreaker = None):
+        self.model = model
+        self.bucket = TokenBucket(rate_per_second, burst)
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.request_timeout = request_timeout
+        self.acquire_timeout = acquire_timeout
+        self.breaker = breaker or CircuitBreaker()
+        self._stats_lock = threading.Lock()
+        self._stats = {'calls': 0, 'retries': 0, 'failures': 0, 'rejected': 0, 'in_flight': 0}
+
+    def _count(self, name: str, delta: int = 1):
+        with self._stats_lock:
+            self._stats[name] += delta
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['circuit'] = self.breaker.state
+        return stats
+
+    def backoff_delay(self, attempt: int, hint: float = None) -> float:
+        """Full-jitter exponential backoff; a server hint sets the minimum wait."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if hint is not None:
+            delay = max(delay, hint + random.uniform(0, self.base_delay))
+        return min(delay, self.max_delay)
+
+    def _call(self, prompt: str, stream=None) -> str:
+        if not self.bucket.acquire(self.acquire_timeout):
+            raise RateLimitTimeout("Timed out waiting for the LLM rate limiter")
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise RateLimitTimeout("Timed out waiting for a free LLM concurrency slot")
+        self._count('in_flight')
+        LLM_IN_FLIGHT.inc()
+        mode = 'unary' if stream is None else 'stream'
+        outcome = 'error'
+        start = time.perf_counter()
+        try:
+            self._count('calls')
+            response = self.model.generate_content(
+                prompt,
+                generation_config={"response_mime_type": "application/json"},
+                request_options={"timeout": self.request_timeout},
+                stream=stream is not None
+            )
+            if stream is None:
+                text = response.candidates[0].content.parts[0].text
+            else:
+                stream.reset()
+                chunks = []
+                for chunk in response:
+                    parts = chunk.candidates[0].content.parts if chunk.candidates else ()
+                    chunk_text = ''.join(part.text for part in parts)
+                    if chunk_text:
+                        chunks.append(chunk_text)
+                        stream.feed(chunk_text)
+                text = ''.join(chunks)
+            outcome = 'ok'
+            # A streamed response carries the usage of the whole call once it has been consumed
+            _record_usage(response)
+            return text
+        finally:
+            LLM_CALL_SECONDS.observe(time.perf_counter() - start, outcome=outcome, mode=mode)
+            LLM_IN_FLIGHT.dec()
+            self._count('in_flight', -1)
+            self._slots.release()
+
+    def generate_json(self, prompt: str, parse=None, stream=None):
+        """
+        Generates a JSON response for `prompt`.
+
+        Args:
+            prompt (str): The full prompt
+            parse (callable): Optional parser/validator for the response text (e.g.
+                FinalSuggestionModel.model_validate_json); a ValueError from it
+                triggers a retry without counting against the circuit breaker
+            stream: Optional listener with reset() and feed(text); when given, the
+                response is streamed and fed to it chunk by chunk as it arrives
+                (reset() is called at the start of every attempt)
+
+        Returns:
+            The parsed result, or the raw text if no parser was given
+
+        Raises:
+            CircuitOpenError: The upstream is marked unhealthy
+            LLMError: All attempts failed
+        """
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._count('retries')
+                LLM_RETRIES.inc()
+                time.sleep(self.backoff_delay(attempt - 1, retry_after_hint(last_error)))
+            if not self.breaker.allow():
+                self._count('rejected')
+                LLM_REJECTED.inc()
+                raise CircuitOpenError("LLM circuit breaker is open; not calling the API")
+
+            try:
+                text = self._call(prompt, stream)
+            except RateLimitTimeout:
+                self.breaker.release()
+                raise
+            except Exception as e:
+                self._count('failures')
+                retryable, upstream_failure = classify_error(e)
+                LLM_ERRORS.inc(retryable=str(retryable).lower())
+                if upstream_failure:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.release()
+                if not retryable:
+                    raise LLMError(f"LLM request rejected: {e}") from e
+                print(f"LLM call failed (attempt {attempt + 1}): {e}")
+                last_error = e
+                continue
+
+            # The API answered, so the upstream is healthy even if the content is unusable
+            self.breaker.record_success()
+            if parse is None:
+                return text
+            try:
+                return parse(text)
+            except ValueError as e:
+                LLM_INVALID_RESPONSES.inc()
+                print(f"LLM response rejected (attempt {attempt + 1}): {e}")
+                last_error = e
+
+        raise LLMError("Failed to get a valid response from the API after multiple retries.") from last_error
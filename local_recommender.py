@@ -0,0 +1,297 @@
+"""
+Deterministic local career recommender.
+
+Builds a FinalSuggestionModel from the student's trait vector alone, in a
+few milliseconds and without calling Gemini. A versioned data file
+(data/career_profiles_v1.json) holds a careers x traits weight table (with
+exams and degree courses per career) and the trait weights of the four MBTI
+axes. At load time every career is turned into a centred unit vector, so a
+lookup is one exact nearest-neighbour pass (cosine similarity) over the
+index.
+
+The app serves it as the instant first response and as the fallback when the
+LLM fails; the LLM report replaces it when it arrives.
+"""
+import heapq
+import json
+import math
+import os
+from functools import lru_cache
+from typing import NamedTuple, Tuple
+
+from models import FinalSuggestionModel, MbtiResultModel, CareerDetail, normalize_match_score
+from traits import TRAIT_MAPPING, TRAIT_NAMES, score_answers
+
+DEFAULT_CAREER_PROFILES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'career_profiles_v1.json')
+CAREER_PROFILES_PATH = os.environ.get('CAREER_PROFILES_PATH') or DEFAULT_CAREER_PROFILES_PATH
+
+CAREER_COUNT = 8
+# Added to the similarity of careers matching the preferred field / a studied subject
+PREFERRED_FIELD_BOOST = 0.15
+SUBJECT_BOOST = 0.05
+# Pseudo-answers pulling each trait share towards 50%, so traits only one or two questions
+# offer don't swing the vector between 0 and 1
+SHARE_PRIOR_WEIGHT = 2
+
+
+class CareerProfilesError(ValueError):
+    """Raised when the career profiles file is malformed."""
+
+
+class CareerProfile(NamedTuple):
+    name: str
+    vector: Tuple[float, ...]      # centred unit vector over TRAIT_NAMES
+    top_traits: Tuple[str, ...]    # traits by descending weight
+    competitive_exams: Tuple[str, ...]
+    degree_courses: Tuple[str, ...]
+    fields: Tuple[str, ...]
+    subjects: Tuple[str, ...]
+    summary: str
+
+
+class MbtiAxis(NamedTuple):
+    letters: Tuple[str, str]
+    names: Tuple[str, str]
+    weights: Tuple[float, ...]     # over TRAIT_NAMES; positive leans to letters[0]
+
+
+# How often each trait can be picked at all; scores are divided by it so that
+# traits offered by many questions don't dominate the vector.
+_TRAIT_OPPORTUNITIES = tuple(
+    sum(1 for options in TRAIT_MAPPING.values() if trait in options.values()) for trait in TRAIT_NAMES
+)
+
+
+def _centred_unit(values) -> Tuple[float, ...]:
+    mean = sum(values) / len(values)
+    centred = [value - mean for value in values]
+    norm = math.sqrt(sum(value * value for value in centred))
+    return tuple(value / norm for value in centred) if norm else tuple(0.0 for _ in centred)
+
+
+def _trait_weights(raw: dict, context: str) -> Tuple[float, ...]:
+    unknown = set(raw) - set(TRAIT_NAMES)
+    if unknown:
+        raise CareerProfilesError(f"{context} uses unknown traits: {', '.join(sorted(unknown))}")
+    return tuple(float(raw.get(trait, 0.0)) for trait in TRAIT_NAMES)
+
+
+class LocalRecommender:
+    """Nearest-neighbour career matching and MBTI estimation over trait vectors."""
+
+    __slots__ = ('version', 'careers', 'axes', 'types')
+
+    def __init__(self, version: str, careers, axes, types: dict):
+        self.version = version
+        self.careers = tuple(careers)
+        self.axes = tuple(axes)
+        self.types = types
+
+    # --- Vectors ---
+    @staticmethod
+    def trait_shares(trait_summary: dict) -> Tuple[float, ...]:
+        """Share of the opportunities to pick each trait that the student took (smoothed), over TRAIT_NAMES."""
+        return tuple(
+            (trait_summary.get(trait, 0) + SHARE_PRIOR_WEIGHT / 2) / (opportunities + SHARE_PRIOR_WEIGHT)
+            for trait, opportunities in zip(TRAIT_NAMES, _TRAIT_OPPORTUNITIES)
+        )
+
+    def nearest(self, vector, k: int = CAREER_COUNT, boosts: dict = None):
+        """Returns the `k` best (similarity, CareerProfile) pairs for a centred unit `vector`; ties keep table order."""
+        boosts = boosts or {}
+        scored = (
+            (sum(a * b for a, b in zip(vector, career.vector)) + boosts.get(career.name, 0.0), -position, career)
+            for position, career in enumerate(self.careers)
+        )
+        return [(similarity, career) for similarity, _, career in heapq.nlargest(k, scored, key=lambda item: item[:2])]
+
+    def mbti_type(self, shares) -> Tuple[str, list]:
+        """Returns the four-letter type and, per axis, (letter, name, lean in 50..100 percent)."""
+        centred = _centred_unit(shares)
+        letters = []
+        leans = []
+        for axis in self.axes:
+            score = sum(a * b for a, b in zip(centred, axis.weights))
+            norm = math.sqrt(sum(weight * weight for weight in axis.weights)) or 1.0
+            side = 0 if score >= 0 else 1
+            letters.append(axis.letters[side])
+            leans.append((axis.letters[side], axis.names[side], round(50 + 50 * min(1.0, abs(score) / norm))))
+        return ''.join(letters), leans
+
+    # --- Recommendation ---
+    def _boosts(self, preferred_field: str, graduation_subjects: str) -> dict:
+        preferred = _preferred(preferred_field)
+        subjects = {subject.strip().lower() for subject in (graduation_subjects or '').split(',') if subject.strip()}
+        boosts = {}
+        for career in self.careers:
+            boost = 0.0
+            if _matches_field(career, preferred):
+                boost += PREFERRED_FIELD_BOOST
+            boost += SUBJECT_BOOST * min(2, sum(1 for subject in career.subjects if subject.lower() in subjects))
+            if boost:
+                boosts[career.name] = boost
+        return boosts
+
+    def recommend(self, profile: dict) -> FinalSuggestionModel:
+        """
+        Builds a complete suggestion for a student profile (the session data
+        fields used by generate_prompt()).
+        """
+        answers = profile.get('assessment_answers', {}) or {}
+        trait_summary = score_answers(answers, top_n=0).summary
+        shares = self.trait_shares(trait_summary)
+        student_top = [trait for trait, _ in sorted(
+            ((trait, share) for trait, share in zip(TRAIT_NAMES, shares) if trait_summary.get(trait)),
+            key=lambda item: -item[1]
+        )][:5]
+
+        mbti_code, leans = self.mbti_type(shares)
+        mbti = self.types[mbti_code]
+        mbti_result = MbtiResultModel(
+            type=f"{mbti_code} - {mbti['name']}",
+            explanation=_mbti_explanation(mbti_code, mbti['name'], leans, student_top),
+            strengths=list(mbti['strengths']),
+            weaknesses=list(mbti['weaknesses']),
+        )
+
+        matches = self.nearest(
+            _centred_unit(shares),
+            boosts=self._boosts(profile.get('preferred_field', ''), profile.get('graduation_subjects', ''))
+        )
+        career_alignments = [
+            CareerDetail(
+                name=career.name,
+                match_score=normalize_match_score(50 + 50 * max(-1.0, min(1.0, similarity))),
+                explanation=_career_explanation(career, student_top),
+                competitive_exams=list(career.competitive_exams),
+                degree_courses=list(career.degree_courses),
+            )
+            for similarity, career in matches
+        ]
+        return FinalSuggestionModel(
+            mbti_result=mbti_result,
+            career_alignments=career_alignments,
+            clarity_and_impact=_clarity(
+                mbti_code, career_alignments, student_top, profile.get('preferred_field', ''),
+                any(_matches_field(career, _preferred(profile.get('preferred_field', ''))) for _, career in matches)
+            ),
+        )
+
+
+def _preferred(preferred_field: str) -> str:
+    preferred = (preferred_field or '').strip().lower()
+    return '' if preferred in ('none specified', 'none') else preferred
+
+
+def _matches_field(career: CareerProfile, preferred: str) -> bool:
+    return bool(preferred) and any(field in preferred or preferred in field for field in career.fields)
+
+
+# --- Text ---
+def _join(items) -> str:
+    items = list(items)
+    if len(items) <= 1:
+        return ''.join(items)
+    return ', '.join(items[:-1]) + ' and ' + items[-1]
+
+
+def _mbti_explanation(code: str, name: str, leans: list, student_top: list) -> str:
+    lean_lines = '\n'.join(f"- **{axis_name} ({letter})**: {percent}%" for letter, axis_name, percent in leans)
+    traits = _join(f"**{trait}**" for trait in student_top[:3]) or 'a balanced mix of traits'
+    return (
+        f"Your answers point to the **{code} ({name})** personality type. Across the assessment you most often "
+        f"chose options reflecting {traits}, and those choices shape how you approach people, information and "
+        f"decisions.\n\n"
+        f"How strongly you lean on each dimension:\n{lean_lines}\n\n"
+        f"Percentages close to 50% mean you are comfortable on both sides of that dimension; higher values show "
+        f"a clearer preference. Personality types describe tendencies rather than limits, so use this as a "
+        f"starting point for reflection, not a label."
+    )
+
+
+def _career_explanation(career: CareerProfile, student_top: list) -> str:
+    shared = [trait for trait in career.top_traits[:4] if trait in student_top]
+    if shared:
+        fit = (f"It draws on {_join(f'**{trait}**' for trait in shared)}, which stand out in your answers, "
+               f"so the day-to-day work is likely to feel natural to you.")
+    else:
+        fit = (f"It mostly calls for {_join(f'**{trait}**' for trait in career.top_traits[:3])}; your answers "
+               f"suggest you could grow into these, and they are worth exploring through projects or internships.")
+    return f"{career.summary}\n\n{fit}"
+
+
+def _clarity(code: str, careers: list, student_top: list, preferred_field: str, field_matched: bool) -> str:
+    strongest = [career.name for career in careers if career.match_score == 'Highly Aligned'] or [careers[0].name]
+    text = (
+        f"Your profile ({code}) and your strongest traits ({_join(student_top[:3]) or 'still emerging'}) fit best "
+        f"with careers such as **{_join(strongest[:3])}**. The list above is ordered by how closely each career's "
+        f"typical demands match the traits you showed in the assessment.\n\n"
+        f"Use it to decide which entrance exams to prepare for and which degree courses to shortlist, and test "
+        f"your interest early through school projects, online courses or conversations with people in these fields."
+    )
+    if _preferred(preferred_field) and not field_matched:
+        text += (f"\n\nYou mentioned an interest in **{preferred_field}**. It isn't among your closest matches, "
+                 f"but interests grow with experience; the careers above may offer a similar sense of purpose "
+                 f"while using more of your natural strengths.")
+    return text
+
+
+# --- Loading ---
+def parse_career_profiles(document: dict) -> LocalRecommender:
+    """Builds a LocalRecommender from the decoded JSON document."""
+    try:
+        version = str(document['version'])
+        raw_careers = document['careers']
+        raw_axes = document['mbti']['axes']
+        raw_types = document['mbti']['types']
+    except (KeyError, TypeError) as e:
+        raise CareerProfilesError(f"Career profiles file is missing a required field: {e}")
+
+    careers = []
+    try:
+        for raw_career in raw_careers:
+            name = raw_career['name']
+            weights = _trait_weights(raw_career['traits'], f"Career '{name}'")
+            careers.append(CareerProfile(
+                name=name,
+                vector=_centred_unit(weights),
+                top_traits=tuple(trait for weight, trait in sorted(zip(weights, TRAIT_NAMES), key=lambda item: -item[0]) if weight > 0),
+                competitive_exams=tuple(raw_career['competitive_exams']),
+                degree_courses=tuple(raw_career['degree_courses']),
+                fields=tuple(field.lower() for field in raw_career.get('fields', ())),
+                subjects=tuple(raw_career.get('subjects', ())),
+                summary=raw_career['summary'],
+            ))
+        axes = [
+            MbtiAxis(tuple(raw_axis['letters']), tuple(raw_axis['names']), _trait_weights(raw_axis['traits'], 'MBTI axis'))
+            for raw_axis in raw_axes
+        ]
+    except (KeyError, TypeError, AttributeError) as e:
+        raise CareerProfilesError(f"Career profiles file has a malformed entry: {e}")
+    if len(careers) < CAREER_COUNT:
+        raise CareerProfilesError(f"At least {CAREER_COUNT} careers are needed, found {len(careers)}")
+    if len(axes) != 4 or any(len(axis.letters) != 2 for axis in axes):
+        raise CareerProfilesError("The MBTI section needs four axes with two letters each")
+    for letters in _all_types(axes):
+        if letters not in raw_types:
+            raise CareerProfilesError(f"MBTI type {letters} is missing from the types table")
+
+    return LocalRecommender(version, careers, axes, raw_types)
+
+
+def _all_types(axes):
+    codes = ['']
+    for axis in axes:
+        codes = [code + letter for code in codes for letter in axis.letters]
+    return codes
+
+
+def load_career_profiles(path: str = None) -> LocalRecommender:
+    """Returns the recommender for the profiles file at `path` (default CAREER_PROFILES_PATH). Parsed once per process."""
+    return _load_career_profiles(os.path.abspath(path or CAREER_PROFILES_PATH))
+
+
+@lru_cache(maxsize=None)
+def _load_career_profiles(path: str) -> LocalRecommender:
+    with open(path, encoding='utf-8') as profiles_file:
+        return parse_career_profiles(json.load(profiles_file))
@@ -0,0 +1,352 @@
+"""
+Prometheus-style metrics.
+
+Counters, gauges and histograms are registered once at import (module-level,
+like prometheus_client's default registry) and updated with a single short
+lock per metric. Each gunicorn worker periodically writes a snapshot of its
+values to a shared directory; /metrics on any worker merges every worker's
+snapshot (counters and histograms are summed, gauges of exited workers are
+dropped) and renders the Prometheus text format.
+
+When a worker exits, retire_snapshot() (called from gunicorn's child_exit
+hook) folds its counters and histograms into metrics-dead.json and deletes
+its snapshot, so totals survive worker restarts without stale files piling
+up. Snapshots carry a per-process token, so a new worker that reuses a dead
+one's pid doesn't mistake that worker's snapshot for its own.
+"""
+import bisect
+import fcntl
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+DEAD_SNAPSHOT = 'metrics-dead.json'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+SIZE_BUCKETS = (16e3, 32e3, 64e3, 128e3, 256e3, 512e3, 1e6, 2e6, 5e6)
+
+
+def _label_key(labelnames, labels: dict) -> tuple:
+    return tuple(str(labels.get(name, '')) for name in labelnames)
+
+
+def _format_labels(pairs) -> str:
+    if not pairs:
+        return ''
+    escaped = (
+        '{}="{}"'.format(name, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {json.dumps(key): value for key, value in self._values.items()}
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set_total(self, value: float, **labels):
+        """Mirrors a monotonic count kept elsewhere (e.g. a cache's own statistics)."""
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Gauge(_Metric):
+    """
+    A value that can go up and down. With several workers, `aggregate` says how
+    their values combine: 'sum' (per-worker quantities such as in-flight calls)
+    or 'max' (shared quantities every worker observes, such as the session count).
+    """
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames=(), aggregate: str = 'sum'):
+        if aggregate not in ('sum', 'max'):
+            raise ValueError(f"Unknown gauge aggregate '{aggregate}'")
+        super().__init__(name, documentation, labelnames)
+        self.aggregate = aggregate
+
+    def set(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # Per-bucket (non-cumulative) counts with a final +Inf slot, then sum
+                entry = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            entry[index] += 1
+            entry[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+class Registry:
+    """Holds every metric of the process and merges the snapshots of all workers."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self.directory = None
+        self._flusher = None
+        # Tells this process's snapshots apart from those of an earlier process with the same pid
+        self._token = uuid.uuid4().hex
+        self._predecessor_checked = False
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric '{metric.name}' is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), aggregate='sum') -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames, aggregate))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_callback(self, fn):
+        """
+        Registers `fn()`, called just before every snapshot, to copy values kept
+        elsewhere (e.g. cache statistics) into metrics of this registry.
+        """
+        self._callbacks.append(fn)
+
+    # --- multi-worker aggregation ---
+    def enable_multiprocess(self, directory: str, flush_interval: float = 5.0):
+        """Writes this process's snapshot to `directory` every `flush_interval` seconds."""
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        if self._flusher is None:
+            self._start_flusher(flush_interval)
+            os.register_at_fork(after_in_child=lambda: self._after_fork(flush_interval))
+
+    def _after_fork(self, flush_interval: float):
+        # A worker forked from a preloading gunicorn master is a new process: new
+        # token, and its own flusher, since threads don't survive fork()
+        self._token = uuid.uuid4().hex
+        self._predecessor_checked = False
+        self._start_flusher(flush_interval)
+
+    def _start_flusher(self, flush_interval: float):
+        def flush_forever():
+            while True:
+                time.sleep(flush_interval)
+                try:
+                    self.flush()
+                except OSError as e:
+                    print(f"Metrics flush failed: {e}")
+        self._flusher = threading.Thread(target=flush_forever, name='metrics-flush', daemon=True)
+        self._flusher.start()
+
+    def snapshot(self) -> dict:
+        for callback in self._callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Metrics callback failed: {e}")
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+    def _own_snapshot(self) -> dict:
+        with self._lock:
+            kinds = {name: metric.kind for name, metric in self._metrics.items()}
+        return {'pid': os.getpid(), 'token': self._token, 'kinds': kinds, 'metrics': self.snapshot()}
+
+    def flush(self):
+        if not self.directory:
+            return
+        if not self._predecessor_checked:
+            # An exited worker with our pid whose snapshot wasn't retired yet
+            retire_snapshot(self.directory, os.getpid(), keep_token=self._token)
+            self._predecessor_checked = True
+        _write_json(os.path.join(self.directory, f'metrics-{os.getpid()}.json'), self._own_snapshot())
+
+    def _collect_snapshots(self):
+        """Returns every snapshot, this process's first, each with 'live' set when its process is running."""
+        own = {**self._own_snapshot(), 'live': True}
+        if not self.directory:
+            return [own]
+        snapshots = [own]
+        for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+            try:
+                with open(path) as snapshot_file:
+                    snapshot = json.load(snapshot_file)
+            except (OSError, ValueError):
+                continue
+            pid = snapshot.get('pid')
+            if pid == own['pid'] and snapshot.get('token') == own['token']:
+                continue
+            # metrics-dead.json has no pid; a snapshot with our pid but another token is a predecessor's
+            snapshot['live'] = pid is not None and pid != own['pid'] and _pid_alive(pid)
+            snapshots.append(snapshot)
+        return snapshots
+
+    def render(self) -> str:
+        """Returns every metric, merged across workers, in the Prometheus text exposition format."""
+        snapshots = self._collect_snapshots()
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            merged = {}
+            for snapshot in snapshots:
+                values = snapshot['metrics'].get(metric.name, {})
+                if metric.kind == 'gauge' and not snapshot['live']:
+                    continue
+                for key, value in values.items():
+                    if metric.kind == 'gauge' and metric.aggregate == 'max':
+                        merged[key] = max(merged.get(key, value), value)
+                    else:
+                        merged[key] = _add_values(merged.get(key), value)
+
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for key in sorted(merged):
+                label_pairs = list(zip(metric.labelnames, json.loads(key)))
+                value = merged[key]
+                if metric.kind != 'histogram':
+                    lines.append(f'{metric.name}{_format_labels(label_pairs)} {_format_value(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (float('inf'),), value[:-1]):
+                    cumulative += count
+                    bucket_labels = _format_labels(label_pairs + [('le', _format_value(bound))])
+                    lines.append(f'{metric.name}_bucket{bucket_labels} {cumulative}')
+                lines.append(f'{metric.name}_sum{_format_labels(label_pairs)} {_format_value(value[-1])}')
+                lines.append(f'{metric.name}_count{_format_labels(label_pairs)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+def _add_values(current, value):
+    """Sums a counter value or, element by element, a histogram's bucket counts and sum."""
+    if current is None:
+        return value
+    if isinstance(value, list):
+        return [a + b for a, b in zip(current, value)]
+    return current + value
+
+
+def _write_json(path: str, data: dict):
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w') as temp_file:
+        json.dump(data, temp_file)
+    os.replace(temp_path, path)
+
+
+def retire_snapshot(directory: str, pid: int, keep_token: str = None):
+    """
+    Folds the counters and histograms of the exited process `pid` into
+    metrics-dead.json and deletes its snapshot; its gauges are dropped. A
+    snapshot written with `keep_token` (the caller's own) is left alone.
+    """
+    path = os.path.join(directory, f'metrics-{pid}.json')
+    if not os.path.exists(path):
+        return
+    # The gunicorn master and a worker that reused the pid may both get here
+    with open(os.path.join(directory, 'metrics-dead.lock'), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            with open(path) as snapshot_file:
+                snapshot = json.load(snapshot_file)
+        except FileNotFoundError:
+            return
+        except ValueError:
+            snapshot = {}
+        if keep_token is not None and snapshot.get('token') == keep_token:
+            return
+
+        dead_path = os.path.join(directory, DEAD_SNAPSHOT)
+        try:
+            with open(dead_path) as dead_file:
+                dead = json.load(dead_file)
+        except (FileNotFoundError, ValueError):
+            dead = {'pid': None, 'kinds': {}, 'metrics': {}}
+        kinds = snapshot.get('kinds', {})
+        for name, values in snapshot.get('metrics', {}).items():
+            if kinds.get(name) not in ('counter', 'histogram'):
+                continue
+            dead['kinds'][name] = kinds[name]
+            totals = dead['metrics'].setdefault(name, {})
+            for key, value in values.items():
+                totals[key] = _add_values(totals.get(key), value)
+        _write_json(dead_path, dead)
+        os.remove(path)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
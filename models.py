@@ -0,0 +1,93 @@
+"""Pydantic models for validating the suggestion data returned by the AI."""
+import re
+from pydantic import BaseModel, field_validator
+from typing import List, Literal
+
+MATCH_SCORE_LABELS = ('Highly Aligned', 'Well Aligned', 'Decently Aligned')
+
+_NUMBER_PATTERN = re.compile(r'(\d+(?:\.\d+)?)')
+
+
+def normalize_match_score(value):
+    """Maps numbers ('85', 85, '85%') and label variants ('highly-aligned', 'High') onto MATCH_SCORE_LABELS."""
+    if isinstance(value, (int, float)):
+        number = float(value)
+    elif isinstance(value, str):
+        lowered = value.strip().lower()
+        for label in MATCH_SCORE_LABELS:
+            if lowered.replace('-', ' ').replace('_', ' ') == label.lower():
+                return label
+        match = _NUMBER_PATTERN.search(lowered)
+        if match:
+            number = float(match.group(1))
+            if '/10' in lowered and '/100' not in lowered:
+                number *= 10
+        elif lowered.startswith(('high', 'strong', 'excellent')):
+            return MATCH_SCORE_LABELS[0]
+        elif lowered.startswith(('well', 'good', 'moderate', 'medium')):
+            return MATCH_SCORE_LABELS[1]
+        elif lowered.startswith(('decent', 'fair', 'low', 'partial')):
+            return MATCH_SCORE_LABELS[2]
+        else:
+            return value
+    else:
+        return value
+    # Same thresholds the prompt asks for
+    if number > 80:
+        return MATCH_SCORE_LABELS[0]
+    if number >= 60:
+        return MATCH_SCORE_LABELS[1]
+    return MATCH_SCORE_LABELS[2]
+
+
+# --- Pydantic Models for Data Validation ---
+# This model reflects the MBTI output from the AI.
+class MbtiResultModel(BaseModel):
+    type: str
+    explanation: str
+    strengths: List[str]
+    weaknesses: List[str]
+
+class CareerDetail(BaseModel):
+    name: str
+    match_score: str
+    explanation: str
+    competitive_exams: List[str]
+    degree_courses: List[str]
+
+    # Valid responses still say '85%' or 'highly aligned'; store the label either way
+    _normalize_match_score = field_validator('match_score', mode='before')(normalize_match_score)
+
+class FinalSuggestionModel(BaseModel):
+    mbti_result: MbtiResultModel  
+    career_alignments: List[CareerDetail] # Note: The prompt now requests exactly 8 careers.
+    clarity_and_impact: str
+
+
+# --- Models for sectioned (fan-out) generation, see report_fanout.py ---
+class CareerChoice(BaseModel):
+    name: str
+    match_score: str
+
+    _normalize_match_score = field_validator('match_score', mode='before')(normalize_match_score)
+
+class ProfileAnalysisModel(BaseModel):
+    mbti_result: MbtiResultModel
+    careers: List[CareerChoice]
+
+class CareerExplanationModel(BaseModel):
+    explanation: str
+    competitive_exams: List[str]
+    degree_courses: List[str]
+
+# A career re-requested without a usable match_score is rated by the model as well (see suggestion_repair.py)
+class RatedCareerExplanationModel(CareerExplanationModel):
+    match_score: Literal['Highly Aligned', 'Well Aligned', 'Decently Aligned']
+
+class ClarityModel(BaseModel):
+    clarity_and_impact: str
+
+# The personalized text written around reused career alignments (see similarity_cache.py)
+class PersonalizedTextModel(BaseModel):
+    mbti_result: MbtiResultModel
+    clarity_and_impact: str
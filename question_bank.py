@@ -0,0 +1,127 @@
+"""
+Assessment question bank.
+
+The bank is a versioned JSON data file (data/question_bank_v1.json by
+default, or QUESTION_BANK_PATH) that is parsed once per process into an
+immutable, indexed structure: questions with their options and trait ids,
+plus precomputed page slices. A new bank can be swapped in by pointing
+QUESTION_BANK_PATH at another file; its version is part of every cache key
+derived from it.
+"""
+import json
+import os
+from functools import lru_cache
+from typing import NamedTuple, Tuple
+
+DEFAULT_QUESTION_BANK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'question_bank_v1.json')
+QUESTION_BANK_PATH = os.environ.get('QUESTION_BANK_PATH') or DEFAULT_QUESTION_BANK_PATH
+
+
+class QuestionBankError(ValueError):
+    """Raised when a question bank file is malformed."""
+
+
+class Option(NamedTuple):
+    key: str        # submitted form value, e.g. 'A'
+    text: str
+    trait: str
+    trait_id: int   # index into QuestionBank.trait_names
+
+
+class Question(NamedTuple):
+    number: int     # 1-based; also the answer key ('q<number>' in forms, str(number) in sessions)
+    options: Tuple[Option, ...]
+
+    @property
+    def field_name(self) -> str:
+        return f'q{self.number}'
+
+
+class QuestionBank:
+    """Read-only view of a parsed question bank."""
+
+    __slots__ = ('version', 'prompt', 'questions_per_page', 'questions', 'pages',
+                 'trait_names', 'option_keys', '_by_number')
+
+    def __init__(self, version: str, prompt: str, questions_per_page: int, questions: Tuple[Question, ...]):
+        self.version = version
+        self.prompt = prompt
+        self.questions_per_page = questions_per_page
+        self.questions = questions
+        self.pages = tuple(
+            questions[start:start + questions_per_page]
+            for start in range(0, len(questions), questions_per_page)
+        )
+        # Trait ids follow the order in which traits first appear in the bank
+        self.trait_names = tuple(dict.fromkeys(option.trait for question in questions for option in question.options))
+        self.option_keys = tuple(dict.fromkeys(option.key for question in questions for option in question.options))
+        self._by_number = {question.number: question for question in questions}
+
+    @property
+    def total_questions(self) -> int:
+        return len(self.questions)
+
+    @property
+    def total_pages(self) -> int:
+        return len(self.pages)
+
+    def page(self, page_num: int) -> Tuple[Question, ...]:
+        """Returns the questions on 1-based `page_num`, or an empty tuple if it is out of range."""
+        if 1 <= page_num <= len(self.pages):
+            return self.pages[page_num - 1]
+        return ()
+
+    def question(self, number: int):
+        return self._by_number.get(number)
+
+    def trait_mapping(self) -> dict:
+        """Returns {question number: {option key: trait}}."""
+        return {
+            question.number: {option.key: option.trait for option in question.options}
+            for question in self.questions
+        }
+
+
+def parse_question_bank(document: dict) -> QuestionBank:
+    """Builds a QuestionBank from the decoded JSON document."""
+    try:
+        version = str(document['version'])
+        questions_per_page = int(document.get('questions_per_page', 12))
+        raw_questions = document['questions']
+    except (KeyError, TypeError, ValueError) as e:
+        raise QuestionBankError(f"Question bank is missing a required field: {e}")
+    if questions_per_page < 1:
+        raise QuestionBankError("questions_per_page must be at least 1")
+
+    trait_ids = {}
+    questions = []
+    for position, raw_question in enumerate(raw_questions, start=1):
+        number = int(raw_question.get('number', position))
+        if number != position:
+            raise QuestionBankError(f"Question {position} is numbered {number}; numbers must run 1..N in order")
+        options = []
+        try:
+            for raw_option in raw_question['options']:
+                trait = raw_option['trait']
+                trait_id = trait_ids.setdefault(trait, len(trait_ids))
+                options.append(Option(str(raw_option['key']), raw_option['text'].strip(), trait, trait_id))
+        except (KeyError, TypeError, AttributeError) as e:
+            raise QuestionBankError(f"Question {number} has a malformed option: {e}")
+        if len({option.key for option in options}) != len(options) or len(options) < 2:
+            raise QuestionBankError(f"Question {number} needs at least two options with distinct keys")
+        questions.append(Question(number, tuple(options)))
+    if not questions:
+        raise QuestionBankError("Question bank has no questions")
+
+    return QuestionBank(version, document.get('prompt', ''), questions_per_page, tuple(questions))
+
+
+def load_question_bank(path: str = None) -> QuestionBank:
+    """Returns the question bank at `path` (default QUESTION_BANK_PATH). Each file is parsed once per process."""
+    return _load_question_bank(os.path.abspath(path or QUESTION_BANK_PATH))
+
+
+@lru_cache(maxsize=None)
+def _load_question_bank(path: str) -> QuestionBank:
+    with open(path, encoding='utf-8') as bank_file:
+        return parse_question_bank(json.load(bank_file))
@@ -0,0 +1,234 @@
+"""
+Sectioned (fan-out) suggestion generation.
+
+Instead of one long request for the whole report, generation runs in two
+phases: one call for the MBTI analysis and a shortlist of careers, then
+concurrent calls for each career's details and for clarity_and_impact. Each
+piece is validated against its own model and retried on its own by the LLM
+client, and the pieces are assembled into a FinalSuggestionModel.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from models import (
+    FinalSuggestionModel, CareerDetail, ProfileAnalysisModel, CareerExplanationModel, ClarityModel,
+    PersonalizedTextModel
+)
+
+CAREER_COUNT = 8
+
+_GUIDELINES = """Return ONLY valid JSON - no trailing commas, code or text in the output.
+All strings must be properly escaped.
+Focus on Indian education system, competitive exams, and degree courses."""
+
+
+def build_analysis_prompt(student_profile: str) -> str:
+    return f"""
+You are a career guidance expert for high school students in India.
+Analyze the assessment answers to determine the student's MBTI personality type, and shortlist the careers that suit them best.
+
+{student_profile}
+
+### Required JSON Structure:
+{{
+  "mbti_result": {{
+    "type": "ENTJ - The Commander",
+    "explanation": "A detailed explanation (around 400 words) of the MBTI type based on the selected assessment options and calculated traits. This should describe the user's personality traits, preferences, and natural inclinations and the text should use markdown for formatting.",
+    "strengths": ["Analytical", "Strategic", "Independent", "Organized", "Focused"],
+    "weaknesses": ["Stubborn", "Critical", "Impatient", "Perfectionist", "Overthinking"]
+  }},
+  "careers": [
+    {{
+      "name": "Fashion Designer",
+      "match_score": (if the match_score is more than 80 return "Highly Aligned", else if the match_score between 80 to 60 return "Well Aligned", else if the match_score is less than 60 return "Decently Aligned")
+    }}
+    ... (exactly {CAREER_COUNT} careers, best match first; don't use the subjects as the top priority, if the student's traits match a different domain suggest that as well)
+  ]
+}}
+
+{_GUIDELINES}
+"""
+
+
+def build_mbti_prompt(student_profile: str) -> str:
+    return f"""
+You are a career guidance expert for high school students in India.
+Analyze the assessment answers to determine the student's MBTI personality type.
+
+{student_profile}
+
+### Required JSON Structure:
+{{
+  "type": "ENTJ - The Commander",
+  "explanation": "A detailed explanation (around 400 words) of the MBTI type based on the selected assessment options and calculated traits. This should describe the user's personality traits, preferences, and natural inclinations and the text should use markdown for formatting.",
+  "strengths": ["Analytical", "Strategic", "Independent", "Organized", "Focused"],
+  "weaknesses": ["Stubborn", "Critical", "Impatient", "Perfectionist", "Overthinking"]
+}}
+
+{_GUIDELINES}
+"""
+
+
+def build_career_prompt(student_profile: str, career_name: str, match_score: str = None) -> str:
+    """Prompt for one career's details. Without `match_score`, the model is asked to rate the career too."""
+    if match_score is None:
+        task = (f'Rate how well the career "{career_name}" fits the student below as "Highly Aligned", '
+                f'"Well Aligned" or "Decently Aligned", then explain the fit and the path into it.')
+        rating_field = '\n  "match_score": "Highly Aligned",'
+    else:
+        task = f'The career "{career_name}" has been rated "{match_score}" for the student below. Explain the fit and the path into it.'
+        rating_field = ''
+    return f"""
+You are a career guidance expert for high school students in India.
+{task}
+
+{student_profile}
+
+### Required JSON Structure:
+{{{rating_field}
+  "explanation": "A detailed explanation (of about 250 words) of why this career domain is a good fit, linking it to the user's calculated traits. This text should use markdown for formatting.",
+  "competitive_exams": ["NIFT Entrance Exam", "NID DAT", "UCEED"],
+  "degree_courses": ["B.Des. Fashion Design", "B.F.Tech", "B.A. in fashion design"]
+}}
+
+{_GUIDELINES}
+"""
+
+
+def build_clarity_prompt(student_profile: str, mbti_type: str, careers) -> str:
+    career_list = "\n".join(f"- {career.name} ({career.match_score})" for career in careers)
+    return f"""
+You are a career guidance expert for high school students in India.
+The student below has MBTI type {mbti_type} and these suggested careers:
+{career_list}
+
+{student_profile}
+
+### Required JSON Structure:
+{{
+  "clarity_and_impact": "A detailed paragraph (of about 400 words) explaining the clarity and impact of these career choices, and what the student can expect to achieve at the end of their careers and if their preferred career field is not aligning with their behaviour then tell them why they should try their hands in the above given career suggestions. This text should use markdown for formatting."
+}}
+
+{_GUIDELINES}
+"""
+
+
+def build_personalization_prompt(student_profile: str, careers) -> str:
+    career_list = "\n".join(f"- {career.name} ({career.match_score})" for career in careers)
+    return f"""
+You are a career guidance expert for high school students in India.
+Analyze the assessment answers to determine the student's MBTI personality type. These careers have already been suggested for the student:
+{career_list}
+
+{student_profile}
+
+### Required JSON Structure:
+{{
+  "mbti_result": {{
+    "type": "ENTJ - The Commander",
+    "explanation": "A detailed explanation (around 400 words) of the MBTI type based on the selected assessment options and calculated traits. This should describe the user's personality traits, preferences, and natural inclinations and the text should use markdown for formatting.",
+    "strengths": ["Analytical", "Strategic", "Independent", "Organized", "Focused"],
+    "weaknesses": ["Stubborn", "Critical", "Impatient", "Perfectionist", "Overthinking"]
+  }},
+  "clarity_and_impact": "A detailed paragraph (of about 400 words) explaining the clarity and impact of these career choices, and what the student can expect to achieve at the end of their careers and if their preferred career field is not aligning with their behaviour then tell them why they should try their hands in the above given career suggestions. This text should use markdown for formatting."
+}}
+
+{_GUIDELINES}
+"""
+
+
+def generate_personalized(student_profile: str, career_alignments, llm_client,
+                          progress=None, repairer=None) -> FinalSuggestionModel:
+    """
+    Builds a suggestion around career alignments reused from a similar
+    student's report: one call writes the MBTI result and clarity_and_impact.
+
+    Args:
+        student_profile (str): The '### Student Profile' prompt block
+        career_alignments (list): CareerDetail dicts to keep as they are
+        llm_client: LLMClient used for the call
+        progress: Optional ReportProgress; the reused careers are published at once
+        repairer: Optional SuggestionRepairer used to parse the response leniently
+
+    Returns:
+        FinalSuggestionModel: The assembled suggestion
+    """
+    careers = [CareerDetail.model_validate(career) for career in career_alignments]
+    if progress is not None:
+        progress.reset()
+        for index, career in enumerate(careers):
+            progress.add_section(('career_alignments', index), career.model_dump())
+
+    parse = repairer.parser(PersonalizedTextModel) if repairer is not None else PersonalizedTextModel.model_validate_json
+    text = llm_client.generate_json(build_personalization_prompt(student_profile, careers), parse)
+    if progress is not None:
+        progress.add_section(('mbti_result',), text.mbti_result.model_dump())
+        progress.add_section(('clarity_and_impact',), text.clarity_and_impact)
+
+    return FinalSuggestionModel(
+        mbti_result=text.mbti_result,
+        career_alignments=careers,
+        clarity_and_impact=text.clarity_and_impact
+    )
+
+
+def generate_sections(student_profile: str, llm_client, max_workers: int = CAREER_COUNT + 1,
+                      progress=None, repairer=None) -> FinalSuggestionModel:
+    """
+    Generates a full suggestion with one analysis call followed by concurrent
+    per-career and clarity calls.
+
+    Args:
+        student_profile (str): The '### Student Profile' prompt block
+        llm_client: LLMClient used for every call (its limits apply to all of them)
+        max_workers (int): Concurrent calls in the second phase
+        progress: Optional ReportProgress; each section is published as soon as it is ready
+        repairer: Optional SuggestionRepairer used to parse each piece leniently
+
+    Returns:
+        FinalSuggestionModel: The assembled suggestion
+    """
+    def parser(model):
+        return repairer.parser(model) if repairer is not None else model.model_validate_json
+
+    if progress is not None:
+        progress.reset()
+
+    analysis = llm_client.generate_json(build_analysis_prompt(student_profile), parser(ProfileAnalysisModel))
+    careers = analysis.careers[:CAREER_COUNT]
+    if progress is not None:
+        progress.add_section(('mbti_result',), analysis.mbti_result.model_dump())
+
+    def career_detail(index: int, choice) -> CareerDetail:
+        body = llm_client.generate_json(
+            build_career_prompt(student_profile, choice.name, choice.match_score),
+            parser(CareerExplanationModel)
+        )
+        career = CareerDetail(name=choice.name, match_score=choice.match_score, **body.model_dump())
+        if progress is not None:
+            progress.add_section(('career_alignments', index), career.model_dump())
+        return career
+
+    def clarity() -> str:
+        result = llm_client.generate_json(
+            build_clarity_prompt(student_profile, analysis.mbti_result.type, careers),
+            parser(ClarityModel)
+        )
+        if progress is not None:
+            progress.add_section(('clarity_and_impact',), result.clarity_and_impact)
+        return result.clarity_and_impact
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        career_futures = [executor.submit(career_detail, index, choice) for index, choice in enumerate(careers)]
+        clarity_future = executor.submit(clarity)
+        # result() re-raises a piece's failure once its own retries are exhausted
+        career_alignments = [future.result() for future in career_futures]
+        clarity_and_impact = clarity_future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return FinalSuggestionModel(
+        mbti_result=analysis.mbti_result,
+        career_alignments=career_alignments,
+        clarity_and_impact=clarity_and_impact
+    )
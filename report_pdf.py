@@ -0,0 +1,420 @@
+"""
+PDF report rendering.
+
+Building a report used to re-parse both DejaVu TTF files and re-run line
+breaking over the same boilerplate paragraphs on every download. This module
+parses each font once per process and clones it cheaply into every new
+document, and caches the line layout of the static text blocks so only the
+personalized MBTI and career sections are laid out per request.
+
+Both caches reach into fpdf2 internals (TTFFont slots, SubsetMap, TextLine,
+FPDF._render_styled_text_line) that change between releases, so they are
+only used with the fpdf2 versions in SUPPORTED_FPDF_VERSIONS. With any other
+version reports are rendered through the public add_font()/multi_cell() path.
+"""
+import copy
+import io
+import os
+import re
+import threading
+
+import fpdf
+from fpdf import FPDF
+from fpdf.enums import Align, MethodReturnValue, XPos, YPos
+from fontTools import subset as ftsubset
+from fontTools import ttLib
+
+FONTS_DIR = os.path.join(os.path.dirname(__file__), 'fonts')
+FONT_FAMILY = 'DejaVuSansCondensed'
+FONT_FILES = {
+    '': 'DejaVuSansCondensed.ttf',
+    'B': 'DejaVuSansCondensed-Bold.ttf',
+}
+FALLBACK_FONT_FAMILY = 'Helvetica'
+
+# fpdf2 releases whose internals the font and layout caches were checked against
+SUPPORTED_FPDF_VERSIONS = ('2.7.7',)
+try:
+    from fpdf.fonts import TTFFont, SubsetMap
+    from fpdf.line_break import TextLine
+    FPDF_INTERNALS_SUPPORTED = fpdf.FPDF_VERSION in SUPPORTED_FPDF_VERSIONS
+except ImportError:
+    FPDF_INTERNALS_SUPPORTED = False
+if not FPDF_INTERNALS_SUPPORTED:
+    print(f"WARNING: fpdf2 {fpdf.FPDF_VERSION} is not a supported version ({', '.join(SUPPORTED_FPDF_VERSIONS)}). "
+          "Report font and layout caches are disabled.")
+
+# Bump whenever the report layout or text changes, so stored PDFs are re-rendered.
+REPORT_VERSION = '1'
+
+_MARKDOWN_CHARS = re.compile(r'[\*_`]')
+
+# --- Static report text, shared by every report ---
+INTRO_TEXT = """We extend our heartfelt appreciation for your active participation in our psychometric assessment designed to evaluate engineering potential. Your thoughtful responses have significantly contributed to the creation of this comprehensive report, aimed at assessing your alignment with a future in engineering.
+
+As you embark on this journey of self-discovery and academic exploration, we invite you to engage deeply with the insights presented in the following pages. This report offers a detailed analysis of your inherent strengths, preferences, and aptitudes — serving as a personalized guide to help you make informed decisions about pursuing engineering as a potential career path. We encourage you to read the report in its entirety, as each section offers a valuable perspective that contributes to a well-rounded understanding of your suitability for the field.
+    """.strip()
+
+REFLECTION_TEXT = """Choosing a college major or academic discipline is often a complex and overwhelming decision, frequently influenced by external pressures such as job market trends, career prospects, and societal expectations. While seeking advice from parents, educators, and peers is a natural and often helpful step, it is equally important to reflect inward — to understand your own capabilities, interests, and aspirations.
+    
+Can we enhance our decision-making process by gaining clarity about ourselves? Are we aware of how our personal strengths and interests align with the unique demands of different academic fields?
+    
+Thriving in any discipline, especially engineering, requires a distinctive set of cognitive abilities — including logical reasoning, critical thinking, mathematical aptitude, and problem-solving skills. Each individual possesses a unique profile of abilities — some innate, others cultivated through experience and learning.
+    
+What if there were a structured and objective way to evaluate how well your natural strengths align with the demands of engineering? This report strives to do precisely that — to provide personalized, evidence-based insights to support your academic and career planning.
+    """.strip()
+
+DISCLAIMER_TEXT = 'This psychometric assessment has been developed with the intention of guiding students in evaluating their suitability for engineering studies. The analysis is based on your individual responses to scenario-based questions and should be viewed as one of several tools in your decision-making toolkit. We advise against relying solely on this report and recommend consulting with career counselors or academic advisors for additional perspective. Please refer to the terms and conditions section at the end of this report for further clarification.'
+
+IMPORTANT_NOTE_TEXT = 'This assessment specifically focuses on alignment with engineering disciplines. A result indicating a lower alignment does not imply an absence of potential or talent in other fields. Your strengths may lie in domains not covered by this evaluation. We urge you to interpret your results within the context of engineering suitability while remaining open to exploring a broad spectrum of academic and career opportunities.'
+
+INTENDED_AUDIENCE_TEXT = 'This report is most beneficial for students who are in the process of selecting their undergraduate field of study, parents guiding their children through college decisions, and individuals preparing for engineering admission counseling or considering engineering as a future course of study.'
+
+METHODOLOGY_TEXT = """
+This assessment is grounded in a personality-driven framework. Your responses have been analyzed using associative techniques that map your answers to a defined set of personality traits. These traits are then correlated with specific factors relevant to your academic and career alignment.
+    
+It is important to recognize that, like any psychometric instrument, a degree of subjectivity and a margin of error may be present. Factors such as the test environment, individual context, and the ever-evolving landscape of education can influence results. To ensure relevance and accuracy, the assessment framework is regularly updated and refined in line with emerging academic standards and technological advancements.
+    
+The test design incorporates significant contributions from generative AI, which supports the creation, validation, and enhancement of content in accordance with psychometric best practices for reliability and validity.
+    """.strip()
+
+TERMS_TEXT = """
+Disclaimer of Outcome: This assessment is intended solely for informational and guidance purposes. It does not guarantee specific academic, professional, or personal outcomes. The organization does not warrant the accuracy, completeness, or reliability of the information presented in the assessment.
+    
+Decision-Making Responsibility: Any actions or decisions taken based on this report are entirely the responsibility of the individual participant. The organization bears no responsibility for any direct or indirect consequences resulting from decisions made based on the assessment.
+    
+Limitation of Liability: Under no circumstances shall the organization be held liable for any direct, indirect, incidental, consequential, or special damages arising from the use or interpretation of the assessment results.
+    
+Indemnification: By participating in this assessment, you agree to indemnify and hold harmless the organization and its representatives (including officers, employees, and agents) from any claims or liabilities that may arise due to your decisions or actions based on the assessment findings.
+    
+Scope of Liability: To the fullest extent permitted by applicable law, the organization's liability in relation to this assessment is strictly limited to the amount paid, if any, for access to the assessment.
+    
+AI-Assisted Design: The assessment’s content and structure have been significantly informed by generative AI technologies. All prompts and processes used adhere to the foundational standards of reliability and validity as required in psychometric assessments.
+    
+Not a Substitute for Professional Advice: This assessment is not intended to replace expert guidance. Participants are encouraged to consult qualified academic or career professionals before making significant decisions based on the results.
+    
+Subject to Change: The organization reserves the right to update, modify, suspend, or terminate the assessment or its features at any time, without prior notification.
+    
+Acknowledgement & Consent: By undertaking this assessment, you acknowledge that your participation is voluntary and that you accept all the terms and conditions stated herein.
+    """.strip()
+
+
+# Code points the report is expected to use: ASCII, Latin-1, general punctuation
+# (dashes, curly quotes, bullets) and the rupee sign. Fonts are pre-subset to this
+# set once per process, which makes the per-document subsetting on output cheap.
+REPORT_CHARSET = frozenset(
+    list(range(0x20, 0x7F)) + list(range(0xA0, 0x100)) + list(range(0x2010, 0x2040)) + [0x20B9, 0x2122]
+)
+
+
+if FPDF_INTERNALS_SUPPORTED:
+    class _ReportSubsetMap(SubsetMap):
+        """
+        SubsetMap whose per-character cache actually hits: fpdf2 2.7.7 fills it with
+        tuple keys but looks it up with ints, so every character took the slow path.
+        """
+
+        def pick(self, unicode: int):
+            char_id = self._char_id_per_unicode.get(unicode)
+            if char_id is None:
+                char_id = super().pick(unicode)
+                if char_id is not None:
+                    self._char_id_per_unicode[unicode] = char_id
+            return char_id
+
+
+def _subset_font_bytes(font_path: str, charset) -> bytes:
+    options = ftsubset.Options(notdef_outline=True, recommended_glyphs=True, name_IDs=['*'], glyph_names=True)
+    options.drop_tables += ['FFTM', 'GDEF', 'GPOS', 'GSUB', 'MATH', 'hdmx', 'meta']
+    font = ttLib.TTFont(font_path, recalcTimestamp=False, fontNumber=0)
+    subsetter = ftsubset.Subsetter(options)
+    subsetter.populate(unicodes=sorted(charset))
+    subsetter.subset(font)
+    output = io.BytesIO()
+    font.save(output)
+    font.close()
+    return output.getvalue()
+
+
+class _FontPrototype:
+    """A font parsed once per process, from which per-document copies are made."""
+
+    def __init__(self, style: str, font_path: str, charset=None):
+        if charset:
+            self.data = _subset_font_bytes(font_path, charset)
+        else:
+            with open(font_path, 'rb') as font_file:
+                self.data = font_file.read()
+        # The prototype belongs to a throwaway document that is never output, so
+        # its fontTools object is never subset and stays complete.
+        self.font = TTFFont(FPDF(), io.BytesIO(self.data), f"{FONT_FAMILY.lower()}{style}", style)
+
+    def clone_into(self, pdf: FPDF) -> TTFFont:
+        """Returns a copy of the font registered as the next font of `pdf`."""
+        font = TTFFont.__new__(TTFFont)
+        for slot in TTFFont.__slots__:
+            if hasattr(self.font, slot):
+                setattr(font, slot, getattr(self.font, slot))
+        font.i = len(pdf.fonts) + 1
+        # Output assigns the descriptor its object id and font file, so documents
+        # written concurrently must not share it
+        font.desc = copy.copy(self.font.desc)
+        # Subsetting on output mutates the fontTools object, so every document
+        # gets its own, loaded lazily from the bytes already in memory.
+        font.ttfont = ttLib.TTFont(io.BytesIO(self.data), recalcTimestamp=False, fontNumber=0, lazy=True)
+        font.hbfont = None
+        font.missing_glyphs = []
+        reserved = "\x00 \r\n"
+        if pdf.str_alias_nb_pages:
+            reserved += "0123456789" + pdf.str_alias_nb_pages
+        font.subset = _ReportSubsetMap(font, [ord(char) for char in reserved])
+        return font
+
+
+_font_prototypes = {}
+_font_lock = threading.Lock()
+
+
+def _get_font_prototype(style: str, report_charset: bool = True) -> _FontPrototype:
+    key = (style, report_charset)
+    prototype = _font_prototypes.get(key)
+    if prototype is None:
+        with _font_lock:
+            prototype = _font_prototypes.get(key)
+            if prototype is None:
+                prototype = _FontPrototype(
+                    style,
+                    os.path.join(FONTS_DIR, FONT_FILES[style]),
+                    charset=REPORT_CHARSET if report_charset else None
+                )
+                _font_prototypes[key] = prototype
+    return prototype
+
+
+def uses_report_charset(*texts) -> bool:
+    """True when every character of `texts` is covered by the pre-subset report fonts."""
+    return all(ord(char) in REPORT_CHARSET or char in '\n\r\t' for text in texts for char in text)
+
+
+def preload_fonts():
+    """Parses the report fonts now instead of on the first download."""
+    if not FPDF_INTERNALS_SUPPORTED:
+        return
+    for style in FONT_FILES:
+        _get_font_prototype(style)
+        _get_font_prototype(style, report_charset=False)
+
+
+_static_layouts = {}
+_layout_lock = threading.Lock()
+
+
+class ReportPDF(FPDF):
+    """FPDF with process-wide font and static text layout caches."""
+
+    def __init__(self, cache_fonts: bool = True, cache_layout: bool = True, report_charset: bool = True):
+        super().__init__()
+        self.cache_fonts = cache_fonts and FPDF_INTERNALS_SUPPORTED
+        self.cache_layout = cache_layout and FPDF_INTERNALS_SUPPORTED
+        self.report_charset = report_charset
+        self.report_font = FONT_FAMILY
+
+    def load_report_fonts(self):
+        """Registers the DejaVu fonts, falling back to a core font if they can't be loaded."""
+        try:
+            for style, file_name in FONT_FILES.items():
+                if self.cache_fonts:
+                    self.fonts[f"{FONT_FAMILY.lower()}{style}"] = _get_font_prototype(style, self.report_charset).clone_into(self)
+                else:
+                    self.add_font(FONT_FAMILY, style, os.path.join(FONTS_DIR, file_name))
+        except Exception as e:
+            print(f"WARNING: Could not load {FONT_FAMILY} fonts: {e}. Falling back to {FALLBACK_FONT_FAMILY}.")
+            self.report_font = FALLBACK_FONT_FAMILY
+        self.set_font(self.report_font, '', 12)
+
+    def _static_lines(self, w: float, h: float, text: str):
+        # Line breaks depend on the font and width only, not on the line height
+        key = (text, self.report_font, self.font_style, self.font_size_pt, w)
+        lines = _static_layouts.get(key)
+        if lines is None:
+            lines = []
+            for paragraph in text.replace('\r', '').split('\n'):
+                paragraph_lines = self.multi_cell(w, h, paragraph, dry_run=True, output=MethodReturnValue.LINES)
+                paragraph_lines = paragraph_lines or ['']
+                lines.extend((line, index == len(paragraph_lines) - 1) for index, line in enumerate(paragraph_lines))
+            with _layout_lock:
+                _static_layouts[key] = lines
+        return lines
+
+    def write_static(self, w: float, h: float, text: str):
+        """
+        Equivalent to `multi_cell(w, h, text)` for text that is the same in every
+        report: the line breaks are computed once and reused.
+        """
+        if not self.cache_layout:
+            self.multi_cell(w, h, text)
+            return
+
+        lines = self._static_lines(w, h, text)
+        for index, (line, ends_paragraph) in enumerate(lines):
+            is_last_line = index == len(lines) - 1
+            text_line = TextLine(
+                self._preload_font_styles(line, False),
+                text_width=self.get_string_width(line),
+                number_of_spaces=line.count(' '),
+                align=Align.L if ends_paragraph else Align.J,
+                height=h,
+                max_width=w,
+                trailing_nl=not is_last_line,
+            )
+            self._render_styled_text_line(
+                text_line,
+                h,
+                new_x=XPos.RIGHT if is_last_line else XPos.LEFT,
+                new_y=YPos.NEXT,
+            )
+
+
+def render_report(suggestion, student_name: str, cache_fonts: bool = True, cache_layout: bool = True,
+                  creation_date=None) -> bytes:
+    """
+    Renders the career guidance report for a validated FinalSuggestionModel.
+
+    Args:
+        suggestion: FinalSuggestionModel (or any object with the same attributes)
+        student_name (str): Name used in the greeting
+        cache_fonts (bool): Reuse the process-wide parsed fonts (supported fpdf2 versions only)
+        cache_layout (bool): Reuse the cached layout of the static text blocks (likewise)
+        creation_date (datetime): Date stored in the document; defaults to now. Fixing it
+            makes the output byte-for-byte reproducible.
+
+    Returns:
+        bytes: The PDF document
+    """
+    mbti_result = suggestion.mbti_result
+    report_charset = uses_report_charset(
+        student_name, mbti_result.type, mbti_result.explanation, suggestion.clarity_and_impact,
+        *mbti_result.strengths, *mbti_result.weaknesses,
+        *(text for career in suggestion.career_alignments for text in (
+            career.name, career.match_score, career.explanation, *career.competitive_exams, *career.degree_courses
+        ))
+    )
+
+    pdf = ReportPDF(cache_fonts=cache_fonts, cache_layout=cache_layout, report_charset=report_charset)
+    if creation_date is not None:
+        pdf.set_creation_date(creation_date)
+    pdf.load_report_fonts()
+    font = pdf.report_font
+
+    pdf.add_page()
+
+    pdf.set_font(font, 'B', 16)
+    pdf.ln()
+    pdf.cell(0, 10, 'Your Personalized Career Guidance Report', new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
+    pdf.ln(10)
+
+    # Define a width for multi_cell to prevent horizontal overflow
+    page_width = pdf.w - 2 * pdf.l_margin
+    pdf.set_font(font, '', 10)
+    pdf.write_static(page_width, 5, INTRO_TEXT)
+    pdf.ln(10)
+
+    pdf.set_font(font, 'B', 11)
+    pdf.multi_cell(page_width, 5, f"Dear {student_name},")
+    pdf.ln(10)
+
+    pdf.set_font(font, '', 10)
+    pdf.write_static(page_width, 5, REFLECTION_TEXT)
+    pdf.ln(10)
+
+    for heading, text in (
+        ('Disclaimer:', DISCLAIMER_TEXT),
+        ('Important Note:', IMPORTANT_NOTE_TEXT),
+        ('Intended Audience:', INTENDED_AUDIENCE_TEXT),
+    ):
+        pdf.set_font(font, 'B', 12)
+        pdf.write_static(page_width, 10, heading)
+        pdf.ln(1)
+        pdf.set_font(font, '', 10)
+        pdf.write_static(page_width, 5, text)
+        pdf.ln(10)
+
+    # Section for MBTI result
+    pdf.set_font(font, 'B', 14)
+    pdf.ln()
+    pdf.cell(0, 10, 'MBTI Personality Analysis', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+    pdf.set_font(font, 'B', 12)
+    pdf.ln()
+    pdf.cell(0, 10, f"Personality Type: {mbti_result.type}", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+    pdf.set_font(font, '', 10)
+    pdf.multi_cell(0, 5, f"Explanation: {_MARKDOWN_CHARS.sub('', mbti_result.explanation)}")
+
+    pdf.set_font(font, 'B', 10)
+    pdf.ln()
+    pdf.cell(0, 10, "Strengths:", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.set_font(font, '', 10)
+    pdf.multi_cell(0, 5, ", ".join(mbti_result.strengths))
+
+    pdf.set_font(font, 'B', 10)
+    pdf.ln()
+    pdf.cell(0, 10, "Weaknesses:", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.set_font(font, '', 10)
+    pdf.multi_cell(0, 5, ", ".join(mbti_result.weaknesses))
+
+    pdf.ln(10) # Add a bigger space before the next section
+
+    pdf.set_font(font, 'B', 14)
+    pdf.ln()
+    pdf.cell(0, 10, 'Recommended Career Alignments', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+    for career in suggestion.career_alignments:
+        pdf.ln(2)
+
+        pdf.set_font(font, 'B', 12)
+        pdf.multi_cell(0, 5, f"{career.name} ({career.match_score})")
+
+        pdf.set_font(font, '', 10)
+        pdf.ln() # New line before explanation
+        pdf.multi_cell(0, 5, f"Explanation: {_MARKDOWN_CHARS.sub('', career.explanation)}\n")
+
+        pdf.set_font(font, 'B', 10)
+        pdf.ln() # New line before exams heading
+        pdf.multi_cell(0, 5, "Competitive Exams:")
+        pdf.set_font(font, '', 10)
+        for exam in career.competitive_exams:
+            pdf.ln() # New line for each exam entry
+            pdf.multi_cell(0, 5, f"- {exam}")
+
+        pdf.set_font(font, 'B', 10)
+        pdf.ln() # New line before degree courses heading
+        pdf.multi_cell(0, 5, "Degree Courses:")
+        pdf.set_font(font, '', 10)
+        for course in career.degree_courses:
+            pdf.ln() # New line for each degree course entry
+            pdf.multi_cell(0, 5, f"- {course}")
+
+        pdf.ln(5)
+
+    pdf.set_font(font, 'B', 12)
+    pdf.cell(0, 5, 'Clarity and Impact', new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.set_font(font, '', 10)
+    pdf.ln() # New line before clarity content
+    pdf.multi_cell(0, 5, _MARKDOWN_CHARS.sub('', suggestion.clarity_and_impact))
+    pdf.ln(5)
+
+    for heading, text in (
+        ('About the Methodology:', METHODOLOGY_TEXT),
+        ('Terms & Conditions:', TERMS_TEXT),
+    ):
+        pdf.set_font(font, 'B', 12)
+        pdf.set_x(pdf.l_margin)
+        pdf.write_static(page_width, 10, heading)
+        pdf.ln(1)
+        pdf.set_font(font, '', 10)
+        pdf.set_x(pdf.l_margin)
+        pdf.write_static(page_width, 5, text)
+        pdf.ln(5)
+
+    return bytes(pdf.output())
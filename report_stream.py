@@ -0,0 +1,163 @@
+"""
+Progressive report delivery.
+
+While a suggestion is streamed from Gemini, ReportProgress parses the
+partial JSON, validates each finished section (the MBTI result, every career,
+clarity_and_impact) against its model and publishes it to the session store.
+progress_events() turns what has been published into Server-Sent Events, so
+the browser can render sections as they arrive, whichever worker it is
+connected to.
+"""
+import json
+import threading
+import time
+
+import markdown
+from pydantic import ValidationError
+
+import metrics
+from models import MbtiResultModel, CareerDetail
+from stream_json import JSONSectionParser
+
+
+def progress_key(session_id: str) -> str:
+    return f'progress:{session_id}'
+
+
+MARKDOWN_RENDER_SECONDS = metrics.histogram(
+    'markdown_render_duration_seconds', 'Time spent converting report text from markdown to HTML, by view.', ('view',)
+)
+
+
+def _render_markdown(text: str) -> str:
+    with MARKDOWN_RENDER_SECONDS.time(view='stream'):
+        return markdown.markdown(text, extensions=['nl2br'])
+
+
+def render_section(path: tuple, value):
+    """Validates one parsed section and returns its browser payload, or None if it isn't a usable section."""
+    try:
+        if path == ('mbti_result',):
+            mbti_result = MbtiResultModel.model_validate(value)
+            return {
+                'section': 'mbti_result',
+                'type': mbti_result.type,
+                'explanation_html': _render_markdown(mbti_result.explanation),
+                'strengths': mbti_result.strengths,
+                'weaknesses': mbti_result.weaknesses,
+            }
+        if len(path) == 2 and path[0] == 'career_alignments':
+            career = CareerDetail.model_validate(value)
+            return {
+                'section': 'career',
+                'index': path[1],
+                'name': career.name,
+                'match_score': career.match_score,
+                'explanation_html': _render_markdown(career.explanation),
+                'competitive_exams': career.competitive_exams,
+                'degree_courses': career.degree_courses,
+            }
+        if path == ('clarity_and_impact',) and isinstance(value, str):
+            return {'section': 'clarity_and_impact', 'html': _render_markdown(value)}
+    except ValidationError:
+        pass
+    return None
+
+
+class ReportProgress:
+    """
+    Publishes validated sections for one session. Works as a stream listener
+    (see LLMClient.generate_json) or is handed sections directly via add_section().
+    """
+
+    def __init__(self, store, session_id: str, ttl_seconds: int = 3600):
+        self.store = store
+        self.key = progress_key(session_id)
+        self.ttl_seconds = ttl_seconds
+        self.attempt = 0
+        self.sections = []
+        self._parser = None
+        self._lock = threading.Lock()
+
+    def reset(self):
+        # A retry starts a new document; the browser drops what it has shown so far
+        self.attempt += 1
+        self.sections = []
+        self._parser = JSONSectionParser(self.add_section)
+        self._publish()
+
+    def feed(self, text: str):
+        self._parser.feed(text)
+
+    def fail(self, error: str):
+        self._publish(error=error)
+
+    def add_section(self, path: tuple, value):
+        """Publishes one finished section; path as in JSONSectionParser. Safe to call from several threads."""
+        section = render_section(path, value)
+        if section is not None:
+            with self._lock:
+                self.sections.append(section)
+                self._publish()
+
+    def _publish(self, error: str = None):
+        data = {'attempt': self.attempt, 'sections': self.sections}
+        if error:
+            data['error'] = error
+        self.store.save(self.key, data, ttl_seconds=self.ttl_seconds)
+
+
+def _event(name: str, data=None) -> str:
+    return f"event: {name}\ndata: {json.dumps(data or {})}\n\n"
+
+
+def progress_events(store, session_id: str, get_status, poll_interval: float = 0.25,
+                    timeout: float = 300.0, keepalive: float = 15.0):
+    """
+    Yields Server-Sent Events for a session's report: 'section' for each newly
+    published section, 'reset' when generation restarts, then one of 'done',
+    'failed', 'missing' or 'timeout'.
+
+    Args:
+        store: The session store the generating job publishes to
+        session_id (str): The assessment session
+        get_status (callable): session_id -> report status (see get_report_status())
+    """
+    key = progress_key(session_id)
+    started = last_sent = time.monotonic()
+    attempt = None
+    sent = 0
+    while True:
+        progress = store.get(key)
+        if progress.get('attempt') != attempt:
+            if sent:
+                yield _event('reset')
+                last_sent = time.monotonic()
+            attempt = progress.get('attempt')
+            sent = 0
+        sections = progress.get('sections', [])
+        for section in sections[sent:]:
+            yield _event('section', section)
+            last_sent = time.monotonic()
+        sent = len(sections)
+
+        status = get_status(session_id)
+        if status == 'done':
+            yield _event('done')
+            return
+        if status == 'failed' or progress.get('error'):
+            yield _event('failed')
+            return
+        # Another worker may own the job; only give up if nobody has published anything
+        if status == 'missing' and not progress:
+            yield _event('missing')
+            return
+
+        now = time.monotonic()
+        if now - started > timeout:
+            yield _event('timeout')
+            return
+        if now - last_sent > keepalive:
+            yield ': keep-alive\n\n'
+            last_sent = now
+        time.sleep(poll_interval)
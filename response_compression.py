@@ -0,0 +1,82 @@
+"""
+On-the-fly compression of dynamic responses.
+
+HTML and JSON bodies are compressed with brotli (when the optional `brotli`
+package is installed) or gzip, whichever the client prefers. Streamed
+responses (Server-Sent Events, report downloads) and already encoded ones
+are left alone. A strong ETag becomes weak, since it names the uncompressed
+representation; views compare If-None-Match weakly.
+"""
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only without it
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = ('text/html', 'application/json', 'text/plain', 'text/css', 'application/javascript')
+
+
+def _choose_encoding():
+    if not request.headers.get('Accept-Encoding'):
+        return None
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br'] and accepted['br'] >= accepted['gzip']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def _vary_on_accept_encoding(response):
+    # Plain header edit; response.vary parses and re-serializes the header on every change
+    vary = response.headers.get('Vary')
+    if not vary:
+        response.headers['Vary'] = 'Accept-Encoding'
+    elif 'accept-encoding' not in vary.lower():
+        response.headers['Vary'] = f'{vary}, Accept-Encoding'
+
+
+def compress_response(response, min_size: int = 500, gzip_level: int = 6, brotli_quality: int = 5):
+    """Compresses `response` in place if the client accepts it and it is worth it. Returns the response."""
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES or 'Content-Encoding' in response.headers):
+        return response
+    # Even when this response stays uncompressed, its representation depends on Accept-Encoding
+    _vary_on_accept_encoding(response)
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < min_size:
+        return response
+
+    if encoding == 'br':
+        compressed = brotli.compress(data, quality=brotli_quality)
+    else:
+        compressed = gzip.compress(data, compresslevel=gzip_level)
+    if len(compressed) >= len(data):
+        return response
+    response.set_data(compressed)
+    response.content_encoding = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app):
+    """Registers compress_response as an after_request hook, configured by the COMPRESS_* settings."""
+    if not app.config['COMPRESS_RESPONSES']:
+        return
+
+    @app.after_request
+    def _compress(response):
+        return compress_response(
+            response,
+            min_size=app.config['COMPRESS_MIN_SIZE'],
+            gzip_level=app.config['COMPRESS_GZIP_LEVEL'],
+            brotli_quality=app.config['COMPRESS_BROTLI_QUALITY']
+        )
@@ -0,0 +1,77 @@
+"""
+Server-side Flask sessions.
+
+The cookie carries only an opaque random session id; the session contents
+live in the shared session store. This keeps every request small and avoids
+re-verifying a multi-KB signed cookie on each hit. Reading a session keeps
+it alive (see SessionStore.get_and_refresh()), so an active user's session
+doesn't expire just because nothing in it changed.
+"""
+import re
+import secrets
+
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+_SID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{43}$')
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session dict that remembers its id and whether it was changed."""
+
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Stores session contents in a SessionStore, keyed by the id in the cookie."""
+
+    key_prefix = 'cookie:'
+
+    def __init__(self, store, refresh_interval: float = 600):
+        self.store = store
+        self.refresh_interval = refresh_interval
+
+    def _generate_sid(self) -> str:
+        return secrets.token_urlsafe(32)
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid and _SID_PATTERN.match(sid):
+            data = self.store.get_and_refresh(self.key_prefix + sid, self.refresh_interval)
+            if data:
+                return ServerSideSession(data, sid=sid)
+        # Never adopt an unknown id from the client; always hand out a fresh one.
+        return ServerSideSession(sid=self._generate_sid(), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified:
+                self.store.delete(self.key_prefix + session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if session.modified:
+            self.store.save(self.key_prefix + session.sid, dict(session))
+
+        if session.new or self.should_set_cookie(app, session):
+            response.set_cookie(
+                name,
+                session.sid,
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app),
+            )
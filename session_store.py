@@ -0,0 +1,264 @@
+"""
+Session storage backends.
+
+Assessment sessions must be visible to every gunicorn worker (and every
+node), so they live in a database instead of a per-process dict. The default
+backend is SQLite in WAL mode through Flask-SQLAlchemy; anything implementing
+SessionStore can be plugged in through SESSION_STORE_BACKEND.
+"""
+import json
+import os
+import threading
+import time
+
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, select, update, insert, delete, func
+from sqlalchemy.exc import IntegrityError
+
+db = SQLAlchemy()
+
+
+class SessionRecord(db.Model):
+    __tablename__ = 'sessions'
+
+    id = db.Column(db.String(64), primary_key=True)
+    data = db.Column(db.Text, nullable=False)
+    expires_at = db.Column(db.Float, nullable=False, index=True)
+
+
+class SessionStore:
+    """Interface every session backend implements."""
+
+    def __init__(self, ttl_seconds: int = 24 * 3600, sweep_interval: int = 600):
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval = sweep_interval
+        self._last_sweep = time.time()
+        self._sweep_lock = threading.Lock()
+
+    def get(self, session_id: str) -> dict:
+        """Returns the session's data, or an empty dict if it is missing or expired."""
+        raise NotImplementedError
+
+    def get_entry(self, session_id: str):
+        """Returns (data, expires_at) for a live session, or ({}, None)."""
+        raise NotImplementedError
+
+    def touch(self, session_id: str, ttl_seconds: int = None):
+        """Pushes a live session's expiry `ttl_seconds` into the future without rewriting its data."""
+        raise NotImplementedError
+
+    def get_and_refresh(self, session_id: str, refresh_interval: float) -> dict:
+        """
+        Like get(), but a session in use doesn't expire: once its expiry was set
+        more than `refresh_interval` seconds ago, it is pushed back to a full TTL.
+        At most one extra write per session every `refresh_interval`, across workers.
+        """
+        data, expires_at = self.get_entry(session_id)
+        if expires_at is not None and expires_at - time.time() < self.ttl_seconds - refresh_interval:
+            self.touch(session_id)
+        return data
+
+    def save(self, session_id: str, data: dict, ttl_seconds: int = None):
+        """Stores the session's data and pushes its expiry `ttl_seconds` (default: the store's TTL) into the future."""
+        raise NotImplementedError
+
+    def add(self, session_id: str, data: dict, ttl_seconds: int = None) -> bool:
+        """
+        Stores `data` only if no live entry exists for `session_id`, atomically
+        across workers. Returns True if it was stored. Used for short leases.
+        """
+        raise NotImplementedError
+
+    def delete(self, session_id: str):
+        raise NotImplementedError
+
+    def sweep_expired(self) -> int:
+        """Removes expired sessions and returns how many were removed."""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def maybe_sweep(self):
+        """Runs sweep_expired() at most once every `sweep_interval` seconds per process."""
+        now = time.time()
+        if now - self._last_sweep < self.sweep_interval or not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_sweep = now
+            removed = self.sweep_expired()
+            if removed:
+                print(f"Session store sweep removed {removed} expired sessions.")
+        finally:
+            self._sweep_lock.release()
+
+
+class MemorySessionStore(SessionStore):
+    """Per-process dict store. Only suitable for a single worker or local development."""
+
+    def __init__(self, app=None, **kwargs):
+        super().__init__(**kwargs)
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> dict:
+        return self.get_entry(session_id)[0]
+
+    def get_entry(self, session_id: str):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+        if entry is None or entry[1] <= time.time():
+            return {}, None
+        return entry
+
+    def touch(self, session_id: str, ttl_seconds: int = None):
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None and entry[1] > now:
+                self._sessions[session_id] = (entry[0], now + (ttl_seconds or self.ttl_seconds))
+
+    def save(self, session_id: str, data: dict, ttl_seconds: int = None):
+        with self._lock:
+            self._sessions[session_id] = (data, time.time() + (ttl_seconds or self.ttl_seconds))
+        self.maybe_sweep()
+
+    def add(self, session_id: str, data: dict, ttl_seconds: int = None) -> bool:
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None and entry[1] > now:
+                return False
+            self._sessions[session_id] = (data, now + (ttl_seconds or self.ttl_seconds))
+        return True
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def sweep_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [key for key, (_, expires_at) in self._sessions.items() if expires_at <= now]
+            for key in expired:
+                del self._sessions[key]
+        return len(expired)
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA busy_timeout=5000')
+    cursor.close()
+
+
+class SQLAlchemySessionStore(SessionStore):
+    """
+    Database-backed store shared by every worker pointing at the same database.
+    Uses the pooled engine Flask-SQLAlchemy builds from SQLALCHEMY_DATABASE_URI.
+    """
+
+    def __init__(self, app, **kwargs):
+        super().__init__(**kwargs)
+        if 'sqlalchemy' not in app.extensions:
+            db.init_app(app)
+        with app.app_context():
+            self.engine = db.engine
+            if self.engine.dialect.name == 'sqlite':
+                event.listen(self.engine, 'connect', _set_sqlite_pragmas)
+            db.create_all()
+        self.table = SessionRecord.__table__
+        # Pooled connections must not be shared with a forked child (a preloading gunicorn
+        # master's workers); the child drops its copies without closing the parent's
+        os.register_at_fork(after_in_child=lambda: self.engine.dispose(close=False))
+
+    def get(self, session_id: str) -> dict:
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                select(self.table.c.data).where(
+                    self.table.c.id == session_id, self.table.c.expires_at > time.time()
+                )
+            ).first()
+        return json.loads(row[0]) if row else {}
+
+    def get_entry(self, session_id: str):
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                select(self.table.c.data, self.table.c.expires_at).where(
+                    self.table.c.id == session_id, self.table.c.expires_at > time.time()
+                )
+            ).first()
+        return (json.loads(row[0]), row[1]) if row else ({}, None)
+
+    def touch(self, session_id: str, ttl_seconds: int = None):
+        now = time.time()
+        with self.engine.begin() as conn:
+            conn.execute(
+                update(self.table)
+                .where(self.table.c.id == session_id, self.table.c.expires_at > now)
+                .values(expires_at=now + (ttl_seconds or self.ttl_seconds))
+            )
+
+    def save(self, session_id: str, data: dict, ttl_seconds: int = None):
+        values = {'data': json.dumps(data), 'expires_at': time.time() + (ttl_seconds or self.ttl_seconds)}
+        with self.engine.begin() as conn:
+            updated = conn.execute(update(self.table).where(self.table.c.id == session_id).values(**values))
+            if updated.rowcount == 0:
+                try:
+                    with conn.begin_nested():
+                        conn.execute(insert(self.table).values(id=session_id, **values))
+                except IntegrityError:
+                    # Another worker inserted the same session in the meantime.
+                    conn.execute(update(self.table).where(self.table.c.id == session_id).values(**values))
+        self.maybe_sweep()
+
+    def add(self, session_id: str, data: dict, ttl_seconds: int = None) -> bool:
+        now = time.time()
+        values = {'id': session_id, 'data': json.dumps(data), 'expires_at': now + (ttl_seconds or self.ttl_seconds)}
+        with self.engine.begin() as conn:
+            # An expired entry doesn't count; clear it so the insert can take its place
+            conn.execute(delete(self.table).where(self.table.c.id == session_id, self.table.c.expires_at <= now))
+            try:
+                with conn.begin_nested():
+                    conn.execute(insert(self.table).values(**values))
+            except IntegrityError:
+                return False
+        return True
+
+    def delete(self, session_id: str):
+        with self.engine.begin() as conn:
+            conn.execute(delete(self.table).where(self.table.c.id == session_id))
+
+    def sweep_expired(self) -> int:
+        with self.engine.begin() as conn:
+            result = conn.execute(delete(self.table).where(self.table.c.expires_at <= time.time()))
+        return result.rowcount
+
+    def count(self) -> int:
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(self.table)).scalar()
+
+
+SESSION_STORE_BACKENDS = {
+    'sqlalchemy': SQLAlchemySessionStore,
+    'memory': MemorySessionStore,
+}
+
+
+def create_session_store(app) -> SessionStore:
+    """Builds the backend named by the app's SESSION_STORE_BACKEND setting."""
+    name = app.config['SESSION_STORE_BACKEND']
+    try:
+        store_class = SESSION_STORE_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown session store backend '{name}'. Choose from: {', '.join(SESSION_STORE_BACKENDS)}")
+    return store_class(
+        app,
+        ttl_seconds=app.config['SESSION_STORE_TTL'],
+        sweep_interval=app.config['SESSION_STORE_SWEEP_INTERVAL']
+    )
@@ -0,0 +1,113 @@
+"""
+Approximate cache of suggestions for near-identical trait profiles.
+
+Exact caching (suggestion_cache.py) only helps when every answer matches.
+Students whose answers differ in one or two questions get almost the same
+trait counts, and the same careers suit them, so generated reports are also
+indexed by their trait-count vector, partitioned on the normalized subjects,
+preferred field and prompt version. A lookup returns the nearest stored
+report within `threshold` (L1 distance between count vectors; one changed
+answer moves at most 2), whose career alignments can be reused while the
+personalized text is regenerated.
+
+The index splits each vector into threshold + 1 disjoint groups of traits.
+Vectors within the threshold differ in at most `threshold` traits, so at
+least one of their groups is identical: a lookup only compares against the
+entries sharing one of its group keys, found with threshold + 1 dict lookups.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_partition_key(graduation_subjects: str, preferred_field: str, version: str) -> tuple:
+    """Returns the exact-match part of a lookup: subjects (as a set), preferred field and version."""
+    subjects = frozenset(
+        subject.strip().lower() for subject in (graduation_subjects or '').split(',') if subject.strip()
+    )
+    return (subjects, (preferred_field or '').strip().lower(), version)
+
+
+class SimilarityCache:
+    """Bounded LRU of suggestion dicts, searchable by nearest trait-count vector."""
+
+    def __init__(self, max_entries: int = 1024, threshold: int = 4, ttl_seconds: int = 7 * 24 * 3600):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self._groups = max(1, threshold + 1)
+        self._entries = OrderedDict()   # entry id -> (partition, vector, value, expires_at)
+        self._index = {}                # (partition, group, group values) -> set of entry ids
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'stores': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.threshold > 0
+
+    def _group_keys(self, partition: tuple, vector: tuple):
+        # With more groups than traits some groups are empty and match every entry in the partition
+        for group in range(self._groups):
+            start = group * len(vector) // self._groups
+            end = (group + 1) * len(vector) // self._groups
+            yield (partition, group, vector[start:end])
+
+    def find(self, partition: tuple, vector):
+        """
+        Returns (suggestion dict, distance) for the nearest entry within the
+        threshold, or None. Ties go to the most recently stored entry.
+        """
+        vector = tuple(vector)
+        now = time.time()
+        best = None
+        with self._lock:
+            seen = set()
+            for key in self._group_keys(partition, vector):
+                for entry_id in self._index.get(key, ()):
+                    if entry_id in seen:
+                        continue
+                    seen.add(entry_id)
+                    _, stored, value, expires_at = self._entries[entry_id]
+                    if expires_at <= now or len(stored) != len(vector):
+                        continue
+                    distance = sum(abs(a - b) for a, b in zip(stored, vector))
+                    if distance <= self.threshold and (best is None or (distance, -entry_id) < (best[0], -best[1])):
+                        best = (distance, entry_id, value)
+            if best is None:
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(best[1])
+            self._stats['hits'] += 1
+        return best[2], best[0]
+
+    def add(self, partition: tuple, vector, value: dict):
+        """Stores a suggestion dict under its partition and trait-count vector."""
+        vector = tuple(vector)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (partition, vector, value, time.time() + self.ttl_seconds)
+            for key in self._group_keys(partition, vector):
+                self._index.setdefault(key, set()).add(entry_id)
+            self._stats['stores'] += 1
+            while len(self._entries) > self.max_entries:
+                self._evict(next(iter(self._entries)))
+
+    def _evict(self, entry_id: int):
+        # Caller holds self._lock.
+        partition, vector, _, _ = self._entries.pop(entry_id)
+        for key in self._group_keys(partition, vector):
+            ids = self._index[key]
+            ids.discard(entry_id)
+            if not ids:
+                del self._index[key]
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters and the current hit ratio."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
@@ -0,0 +1,104 @@
+"""
+Single-flight request coalescing.
+
+Concurrent callers asking for the same key share one execution: inside a
+process, later callers wait on the first one's result; across workers, the
+first caller takes a short lease in the shared session store and publishes
+its result there, while callers in other workers poll for it. A leader that
+dies simply lets its lease expire, after which a waiter takes over.
+"""
+import secrets
+import threading
+import time
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls per key.
+
+    Args:
+        store: Optional SessionStore shared between workers; results published
+            through it must be JSON-serializable
+        lease_seconds (int): How long a worker may hold the lease for a key
+        result_seconds (int): How long a published result stays readable by other workers
+        poll_interval (float): Seconds between checks while another worker holds the lease
+    """
+
+    key_prefix = 'flight:'
+
+    def __init__(self, store=None, lease_seconds: int = 600, result_seconds: int = 600, poll_interval: float = 0.5):
+        self.store = store
+        self.lease_seconds = lease_seconds
+        self.result_seconds = result_seconds
+        self.poll_interval = poll_interval
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {'leaders': 0, 'coalesced': 0, 'shared_from_store': 0}
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._calls)
+        return stats
+
+    def do(self, key: str, fn):
+        """Returns `fn()`, unless a call for `key` is already in flight, in which case its result is shared."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._stats['leaders'] += 1
+            else:
+                self._stats['coalesced'] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run_shared(key, fn)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def _run_shared(self, key: str, fn):
+        if self.store is None:
+            return fn()
+
+        lease_key = f'{self.key_prefix}lease:{key}'
+        result_key = f'{self.key_prefix}result:{key}'
+        token = secrets.token_hex(16)
+        while True:
+            published = self.store.get(result_key)
+            if published:
+                with self._lock:
+                    self._stats['shared_from_store'] += 1
+                return published['result']
+
+            if self.store.add(lease_key, {'owner': token}, self.lease_seconds):
+                try:
+                    result = fn()
+                    self.store.save(result_key, {'result': result}, ttl_seconds=self.result_seconds)
+                    return result
+                finally:
+                    if self.store.get(lease_key).get('owner') == token:
+                        self.store.delete(lease_key)
+
+            time.sleep(self.poll_interval)
@@ -0,0 +1,163 @@
+"""
+Fingerprinted, precompressed static assets.
+
+`python static_assets.py` (run at build time, see Dockerfile) copies every
+file in static/ to static/dist/ under a name containing a digest of its
+contents, writes gzip (and, when the optional `brotli` package is
+installed, brotli) variants of the compressible ones next to it, and
+records the mapping in static/dist/manifest.json.
+
+At runtime StaticAssets rewrites url_for('static', ...) to the fingerprinted
+names and serves them with immutable far-future caching, picking brotli,
+then gzip, then the plain file, depending on what the client accepts. Files missing from the manifest, or
+changed since it was built, are served as before.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+import sys
+
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # optional; only gzip variants are built and served without it
+    brotli = None
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+COMPRESSIBLE_SUFFIXES = ('.css', '.js', '.svg', '.html', '.json', '.txt', '.map')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# Content-Encoding -> file suffix, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _digest(path: str) -> str:
+    with open(path, 'rb') as source:
+        return hashlib.sha256(source.read()).hexdigest()
+
+
+def _sources(static_dir: str):
+    """Yields the static/-relative paths of the source files (everything outside dist/)."""
+    for root, dirs, files in os.walk(static_dir):
+        if os.path.abspath(root) == os.path.abspath(static_dir):
+            dirs[:] = [name for name in dirs if name != DIST_DIR]
+        for name in sorted(files):
+            yield os.path.relpath(os.path.join(root, name), static_dir).replace(os.sep, '/')
+
+
+def build_assets(static_dir: str) -> dict:
+    """
+    Builds static_dir/dist from the files in static_dir and returns the manifest.
+
+    Returns:
+        dict: Source path -> {'path': fingerprinted path relative to static_dir, 'sha256': source digest,
+              'encodings': Content-Encodings with a precompressed variant}
+    """
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    shutil.rmtree(dist_dir, ignore_errors=True)
+    manifest = {}
+    for source in _sources(static_dir):
+        source_path = os.path.join(static_dir, source)
+        digest = _digest(source_path)
+        stem, suffix = os.path.splitext(source)
+        target = f"{DIST_DIR}/{stem}.{digest[:12]}{suffix}"
+        target_path = os.path.join(static_dir, target)
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        shutil.copyfile(source_path, target_path)
+
+        encodings = []
+        if suffix.lower() in COMPRESSIBLE_SUFFIXES:
+            with open(source_path, 'rb') as source_file:
+                data = source_file.read()
+            variants = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                variants['br'] = brotli.compress(data, quality=11)
+            for encoding, variant_suffix in ENCODINGS:
+                # A variant that doesn't save anything would only cost a lookup
+                if encoding in variants and len(variants[encoding]) < len(data):
+                    with open(target_path + variant_suffix, 'wb') as variant_file:
+                        variant_file.write(variants[encoding])
+                    encodings.append(encoding)
+        manifest[source] = {'path': target, 'sha256': digest, 'encodings': encodings}
+
+    with open(os.path.join(dist_dir, MANIFEST_NAME), 'w', encoding='utf-8') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_dir: str) -> dict:
+    """Returns the built manifest, without entries whose source changed since the build ({} if never built)."""
+    try:
+        with open(os.path.join(static_dir, DIST_DIR, MANIFEST_NAME), encoding='utf-8') as manifest_file:
+            manifest = json.load(manifest_file)
+    except FileNotFoundError:
+        return {}
+    current = {}
+    for source, entry in manifest.items():
+        source_path = os.path.join(static_dir, source)
+        if os.path.exists(source_path) and _digest(source_path) == entry['sha256']:
+            current[source] = entry
+        else:
+            print(f"WARNING: static asset '{source}' changed since the last build; run `python static_assets.py`")
+    return current
+
+
+class StaticAssets:
+    """Serves the built assets of a Flask app's static folder with long-lived caching and content negotiation."""
+
+    def __init__(self, app=None):
+        self.manifest = {}
+        self.fingerprinted = {}
+        self.version = ''
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.static_folder = app.static_folder
+        self.manifest = load_manifest(app.static_folder)
+        # Fingerprinted path -> manifest entry
+        self.fingerprinted = {entry['path']: entry for entry in self.manifest.values()}
+        # Changes with any asset; pages cached with the old asset URLs must be invalidated with it
+        self.version = hashlib.sha256(json.dumps(sorted(self.fingerprinted)).encode('utf-8')).hexdigest()[:16]
+        self._send_static_file = app.send_static_file
+        app.url_defaults(self._rewrite_static_url)
+        app.view_functions['static'] = self.send_static_file
+
+    def _rewrite_static_url(self, endpoint, values):
+        if endpoint == 'static':
+            entry = self.manifest.get(values.get('filename'))
+            if entry is not None:
+                values['filename'] = entry['path']
+
+    def send_static_file(self, filename):
+        entry = self.fingerprinted.get(filename)
+        if entry is None:
+            return self._send_static_file(filename)
+
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        encoding = next(
+            (encoding for encoding, _ in ENCODINGS
+             if encoding in entry['encodings'] and request.accept_encodings[encoding]),
+            None
+        )
+        path = filename if encoding is None else filename + dict(ENCODINGS)[encoding]
+        response = send_from_directory(self.static_folder, path, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE)
+        if encoding is not None:
+            response.content_encoding = encoding
+        if entry['encodings']:
+            response.vary.add('Accept-Encoding')
+        # The name changes whenever the contents do, so the file can be cached forever
+        response.cache_control.immutable = True
+        return response
+
+
+if __name__ == '__main__':
+    static_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    built = build_assets(static_dir)
+    for source, entry in sorted(built.items()):
+        encodings = ', '.join(entry['encodings']) or 'uncompressed'
+        print(f"{source} -> {entry['path']} ({encodings})")
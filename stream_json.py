@@ -0,0 +1,149 @@
+"""
+Incremental JSON section parser.
+
+Fed a JSON object in arbitrary text chunks (as a streamed LLM response
+arrives), it reports each top-level member as soon as its value is complete,
+and each element of a top-level array as soon as that element is complete,
+without waiting for the closing brace of the whole document.
+"""
+import json
+
+_WHITESPACE = ' \t\r\n'
+
+
+class JSONSectionParser:
+    """
+    Calls `on_value(path, value)` for every completed section, where `path` is
+    (key,) for a top-level member and (key, index) for an element of a
+    top-level array. Text outside the top-level object (e.g. a markdown fence)
+    is ignored. Sections that fail to decode are skipped; the caller still
+    validates the complete document at the end.
+    """
+
+    def __init__(self, on_value):
+        self.on_value = on_value
+        self._text = ''
+        self._pos = 0
+        self._depth = 0            # container nesting depth; 1 = inside the top-level object
+        self._containers = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_string = None   # (start, end) of the last string closed at depth 1
+        self._key = None
+        self._value_start = None   # start of the current top-level member's value
+        self._item_start = None    # start of the current element of a top-level array
+        self._item_index = 0
+
+    def feed(self, text: str):
+        self._text += text
+        text = self._text
+        pos = self._pos
+        while pos < len(text):
+            char = text[pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._close_string(pos)
+                pos += 1
+                continue
+
+            if self._depth == 0:
+                if char == '{':
+                    self._open(char, pos)
+                pos += 1
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = pos
+                if self._depth == 1 and self._key is not None and self._value_start is None:
+                    self._value_start = pos
+                elif self._depth == 2 and self._in_top_array() and self._item_start is None:
+                    self._item_start = pos
+            elif char in '{[':
+                self._open(char, pos)
+            elif char in '}]':
+                self._close(pos)
+            elif char == ':' and self._depth == 1 and self._last_string is not None:
+                start, end = self._last_string
+                self._key = json.loads(text[start:end + 1])
+                self._value_start = None
+                self._last_string = None
+            elif char == ',':
+                if self._depth == 1:
+                    self._finish_scalar(pos)
+                elif self._depth == 2 and self._in_top_array():
+                    self._finish_item(pos)
+            elif char not in _WHITESPACE:
+                if self._depth == 1 and self._key is not None and self._value_start is None:
+                    self._value_start = pos
+                elif self._depth == 2 and self._in_top_array() and self._item_start is None:
+                    self._item_start = pos
+            pos += 1
+        self._pos = pos
+
+    def _in_top_array(self) -> bool:
+        return self._containers[1] == '['
+
+    def _open(self, char: str, pos: int):
+        if self._depth == 1 and self._key is not None and self._value_start is None:
+            self._value_start = pos
+        elif self._depth == 2 and self._in_top_array() and self._item_start is None:
+            self._item_start = pos
+        self._containers.append(char)
+        self._depth += 1
+        if self._depth == 2 and char == '[':
+            self._item_index = 0
+            self._item_start = None
+
+    def _close(self, pos: int):
+        if self._depth == 2 and self._in_top_array():
+            self._finish_item(pos)
+        elif self._depth == 1:
+            self._finish_scalar(pos)
+        self._containers.pop()
+        self._depth -= 1
+        if self._depth == 1 and self._value_start is not None:
+            # A container value of a top-level member just closed
+            self._emit((self._key,), self._value_start, pos + 1)
+            self._key = None
+            self._value_start = None
+        elif self._depth == 2 and self._in_top_array() and self._item_start is not None and self._text[self._item_start] in '{[':
+            # An object/array element of a top-level array just closed
+            self._finish_item(pos + 1)
+
+    def _close_string(self, pos: int):
+        if self._depth == 1:
+            if self._key is not None and self._value_start == self._string_start:
+                self._emit((self._key,), self._value_start, pos + 1)
+                self._key = None
+                self._value_start = None
+            else:
+                self._last_string = (self._string_start, pos)
+        elif self._depth == 2 and self._in_top_array() and self._item_start == self._string_start:
+            self._finish_item(pos + 1)
+
+    def _finish_scalar(self, end: int):
+        # Numbers, booleans and null end at the next ',' or '}' of the top-level object
+        if self._key is not None and self._value_start is not None:
+            self._emit((self._key,), self._value_start, end)
+            self._key = None
+            self._value_start = None
+
+    def _finish_item(self, end: int):
+        if self._item_start is not None:
+            self._emit((self._key, self._item_index), self._item_start, end)
+            self._item_index += 1
+            self._item_start = None
+
+    def _emit(self, path: tuple, start: int, end: int):
+        try:
+            value = json.loads(self._text[start:end])
+        except ValueError:
+            return
+        self.on_value(path, value)
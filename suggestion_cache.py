@@ -0,0 +1,122 @@
+"""
+Content-addressed cache for validated LLM suggestions.
+
+The prompt is fully determined by the assessment answers, the student's
+subjects and preferred field, so those (plus the prompt and model versions)
+are hashed into the cache key. Entries live in a bounded in-memory LRU and,
+optionally, in an SQLite file shared by every worker on the machine.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from answer_set import AnswerSet
+
+
+def make_cache_key(assessment_answers, graduation_subjects: str, preferred_field: str,
+                   prompt_version: str, model_name: str) -> str:
+    """Returns a stable SHA-256 key for the inputs that determine the prompt (answers as accepted by AnswerSet.coerce)."""
+    # (question, option) pairs in question order, as the key has always been built
+    normalized_answers = list(AnswerSet.coerce(assessment_answers).items())
+    payload = {
+        'answers': normalized_answers,
+        'subjects': (graduation_subjects or '').strip().lower(),
+        'preferred_field': (preferred_field or '').strip().lower(),
+        'prompt_version': prompt_version,
+        'model': model_name,
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class SuggestionCache:
+    """Two-tier (memory LRU + optional SQLite) cache of suggestion dicts."""
+
+    def __init__(self, max_entries: int = 1024, disk_path: str = None, ttl_seconds: int = 7 * 24 * 3600):
+        self.max_entries = max_entries
+        self.disk_path = disk_path
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0}
+        if disk_path:
+            with self._connect() as conn:
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS suggestions ('
+                    'key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)'
+                )
+
+    def _connect(self):
+        conn = sqlite3.connect(self.disk_path, timeout=5)
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def get(self, key: str):
+        """Returns the cached suggestion for `key`, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._stats['memory_hits'] += 1
+                    return value
+                del self._memory[key]
+
+        if self.disk_path:
+            try:
+                with self._connect() as conn:
+                    row = conn.execute(
+                        'SELECT value, expires_at FROM suggestions WHERE key = ? AND expires_at > ?', (key, now)
+                    ).fetchone()
+            except sqlite3.Error as e:
+                print(f"WARNING: Suggestion cache disk read failed: {e}")
+                row = None
+            if row:
+                value = json.loads(row[0])
+                with self._lock:
+                    self._stats['disk_hits'] += 1
+                    self._remember(key, value, row[1])
+                return value
+
+        with self._lock:
+            self._stats['misses'] += 1
+        return None
+
+    def set(self, key: str, value: dict):
+        """Stores a validated suggestion dict under `key` in every tier."""
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._stats['stores'] += 1
+            self._remember(key, value, expires_at)
+
+        if self.disk_path:
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        'INSERT OR REPLACE INTO suggestions (key, value, expires_at) VALUES (?, ?, ?)',
+                        (key, json.dumps(value), expires_at)
+                    )
+                    conn.execute('DELETE FROM suggestions WHERE expires_at <= ?', (time.time(),))
+            except sqlite3.Error as e:
+                print(f"WARNING: Suggestion cache disk write failed: {e}")
+
+    def _remember(self, key: str, value: dict, expires_at: float):
+        # Caller holds self._lock.
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters and the current hit ratio."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._memory)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['memory_hits'] + stats['disk_hits']) / lookups, 4) if lookups else 0.0
+        return stats
@@ -0,0 +1,361 @@
+"""
+Tolerant decoding and partial repair of LLM suggestions.
+
+Most invalid responses are nearly right: a trailing comma, a markdown fence,
+a list returned as a comma-separated string, a numeric match_score. Before
+giving up on a response, it goes through three stages:
+
+  1. lenient JSON decoding (fences, surrounding text, trailing commas,
+     truncated closing brackets);
+  2. per-field coercion (lists, text, match_score labels, common key aliases);
+  3. re-requesting only the sub-objects that are still invalid (the MBTI
+     result, a single career, or clarity_and_impact).
+
+Only if that fails does the caller regenerate the whole report. Outcome
+counters are kept so we can see how often each stage is needed.
+"""
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from pydantic import ValidationError
+
+import metrics
+from llm_client import CircuitOpenError, LLMError
+from models import (
+    FinalSuggestionModel, MbtiResultModel, CareerDetail, CareerExplanationModel, RatedCareerExplanationModel,
+    ClarityModel, ProfileAnalysisModel, PersonalizedTextModel, MATCH_SCORE_LABELS, normalize_match_score
+)
+from report_fanout import build_mbti_prompt, build_career_prompt, build_clarity_prompt
+
+_FENCE_PATTERN = re.compile(r'^\s*```(?:json)?\s*|\s*```\s*$', re.IGNORECASE)
+_LIST_SPLIT_PATTERN = re.compile(r'\s*(?:\n|;|,)\s*')
+_BULLET_PATTERN = re.compile(r'^(?:[-*•]|\d+[.)])\s+')
+
+REPAIR_OUTCOMES = metrics.counter(
+    'llm_response_repairs_total',
+    'LLM responses by how they were made valid: valid, repaired_locally, repaired_with_requests, regenerated.',
+    ('outcome',)
+)
+
+_CAREER_KEY_ALIASES = {
+    'career': 'name', 'career_name': 'name', 'title': 'name',
+    'score': 'match_score', 'alignment': 'match_score', 'match': 'match_score',
+    'exams': 'competitive_exams', 'entrance_exams': 'competitive_exams',
+    'degrees': 'degree_courses', 'courses': 'degree_courses', 'degree_programs': 'degree_courses',
+    'description': 'explanation', 'reason': 'explanation',
+}
+
+
+# --- Stage 1: lenient JSON ---
+def _strip_trailing_commas(text: str) -> str:
+    """Removes commas directly before a closing bracket, ignoring string contents."""
+    out = []
+    in_string = escape = False
+    pending_comma = None
+    for char in text:
+        if in_string:
+            out.append(char)
+            if escape:
+                escape = False
+            elif char == '\\':
+                escape = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == ',':
+            if pending_comma is not None:
+                out.append(pending_comma)
+            pending_comma = ','
+            continue
+        if pending_comma is not None and not char.isspace():
+            if char not in '}]':
+                out.append(pending_comma)
+            pending_comma = None
+        if char == '"':
+            in_string = True
+        out.append(char)
+    return ''.join(out)
+
+
+def _close_truncated(text: str) -> str:
+    """Closes an unterminated string and any brackets left open by a truncated response."""
+    stack = []
+    in_string = escape = False
+    for char in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif char == '\\':
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in '{[':
+            stack.append('}' if char == '{' else ']')
+        elif char in '}]' and stack:
+            stack.pop()
+    return text + ('"' if in_string else '') + ''.join(reversed(stack))
+
+
+def lenient_json_loads(text: str):
+    """Decodes JSON, tolerating the usual LLM formatting glitches. Raises ValueError if nothing works."""
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    candidate = _FENCE_PATTERN.sub('', text)
+    start = candidate.find('{')
+    if start < 0:
+        raise ValueError("No JSON object in response")
+    end = candidate.rfind('}')
+    body = candidate[start:end + 1] if end > start else candidate[start:]
+    for attempt in (body, _strip_trailing_commas(body), _strip_trailing_commas(_close_truncated(candidate[start:]))):
+        try:
+            return json.loads(attempt)
+        except ValueError:
+            continue
+    raise ValueError("Response is not repairable JSON")
+
+
+# --- Stage 2: per-field coercion ---
+def coerce_list(value):
+    if isinstance(value, str):
+        items = [_BULLET_PATTERN.sub('', item).strip() for item in _LIST_SPLIT_PATTERN.split(value)]
+        return [item for item in items if item]
+    if isinstance(value, list):
+        return [item if isinstance(item, str) else json.dumps(item) for item in value]
+    return value
+
+
+def coerce_text(value):
+    if isinstance(value, list):
+        return '\n\n'.join(str(item) for item in value)
+    return value
+
+
+def coerce_mbti_result(data):
+    if not isinstance(data, dict):
+        return data
+    data = dict(data)
+    if 'explanation' in data:
+        data['explanation'] = coerce_text(data['explanation'])
+    for field in ('strengths', 'weaknesses'):
+        if field in data:
+            data[field] = coerce_list(data[field])
+    return data
+
+
+def coerce_career(data):
+    if not isinstance(data, dict):
+        return data
+    data = {_CAREER_KEY_ALIASES.get(key, key): value for key, value in data.items()}
+    if 'match_score' in data:
+        data['match_score'] = normalize_match_score(data['match_score'])
+    if 'explanation' in data:
+        data['explanation'] = coerce_text(data['explanation'])
+    for field in ('competitive_exams', 'degree_courses'):
+        if field in data:
+            data[field] = coerce_list(data[field])
+    return data
+
+
+def coerce_clarity(data):
+    if not isinstance(data, dict):
+        return data
+    return {**data, 'clarity_and_impact': coerce_text(data.get('clarity_and_impact'))}
+
+
+def coerce_analysis(data):
+    if not isinstance(data, dict):
+        return data
+    data = dict(data)
+    if 'mbti_result' in data:
+        data['mbti_result'] = coerce_mbti_result(data['mbti_result'])
+    if isinstance(data.get('careers'), list):
+        data['careers'] = [coerce_career(career) for career in data['careers']]
+    return data
+
+
+def coerce_suggestion(data):
+    if not isinstance(data, dict):
+        return data
+    data = dict(data)
+    if 'mbti_result' in data:
+        data['mbti_result'] = coerce_mbti_result(data['mbti_result'])
+    careers = data.get('career_alignments')
+    if isinstance(careers, dict):
+        careers = [careers]
+    if isinstance(careers, list):
+        data['career_alignments'] = [coerce_career(career) for career in careers]
+    if 'clarity_and_impact' in data:
+        data['clarity_and_impact'] = coerce_text(data['clarity_and_impact'])
+    return data
+
+
+_PIECE_COERCERS = {
+    MbtiResultModel: coerce_mbti_result,
+    CareerDetail: coerce_career,
+    CareerExplanationModel: coerce_career,
+    RatedCareerExplanationModel: coerce_career,
+    ClarityModel: coerce_clarity,
+    ProfileAnalysisModel: coerce_analysis,
+    FinalSuggestionModel: coerce_suggestion,
+    PersonalizedTextModel: coerce_suggestion,
+}
+
+
+# --- Stage 3: partial re-requests ---
+class SuggestionRepairer:
+    """
+    Parses LLM responses with tolerant decoding, coercion and targeted
+    re-requests, counting the outcome of every response it sees.
+    """
+
+    OUTCOMES = ('valid', 'repaired_locally', 'repaired_with_requests', 'regenerated')
+
+    def __init__(self, llm_client):
+        self.llm_client = llm_client
+        self._lock = threading.Lock()
+        self._stats = {outcome: 0 for outcome in self.OUTCOMES}
+        self._stats['piece_requests'] = 0
+        # Careers whose match_score was missing or unusable, rated by the model when re-requested
+        self._stats['rated_careers'] = 0
+
+    def _count(self, name: str, delta: int = 1):
+        with self._lock:
+            self._stats[name] += delta
+        if name in self.OUTCOMES:
+            REPAIR_OUTCOMES.inc(delta, outcome=name)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        total = sum(stats[outcome] for outcome in self.OUTCOMES)
+        stats['repair_ratio'] = (stats['repaired_locally'] + stats['repaired_with_requests']) / total if total else 0.0
+        return stats
+
+    def parser(self, model):
+        """Returns a parse function for LLMClient.generate_json that validates `model` leniently."""
+        coerce = _PIECE_COERCERS.get(model, lambda data: data)
+
+        def parse(text: str):
+            try:
+                result = model.model_validate_json(text)
+                self._count('valid')
+                return result
+            except ValidationError:
+                pass
+            try:
+                result = model.model_validate(coerce(lenient_json_loads(text)))
+            except ValueError:
+                self._count('regenerated')
+                raise
+            self._count('repaired_locally')
+            return result
+
+        return parse
+
+    def suggestion_parser(self, student_profile: str):
+        """Returns a parse function for full suggestions that re-requests only the invalid sections."""
+
+        def parse(text: str) -> FinalSuggestionModel:
+            try:
+                result = FinalSuggestionModel.model_validate_json(text)
+                self._count('valid')
+                return result
+            except ValidationError:
+                pass
+            try:
+                data = coerce_suggestion(lenient_json_loads(text))
+                if not isinstance(data, dict):
+                    raise ValueError("Response is not a JSON object")
+                try:
+                    result = FinalSuggestionModel.model_validate(data)
+                    self._count('repaired_locally')
+                    return result
+                except ValidationError:
+                    pass
+                result = self._repair_sections(data, student_profile)
+            except ValueError:
+                self._count('regenerated')
+                raise
+            self._count('repaired_with_requests')
+            return result
+
+        return parse
+
+    def _request(self, prompt: str, model):
+        self._count('piece_requests')
+        try:
+            return self.llm_client.generate_json(prompt, self.parser(model))
+        except CircuitOpenError:
+            raise
+        except LLMError as e:
+            # Let the caller fall back to regenerating the whole report
+            raise ValueError(f"Could not repair section: {e}")
+
+    def _repair_career(self, career: dict, student_profile: str) -> CareerDetail:
+        name = career['name']
+        match_score = career.get('match_score')
+        if match_score in MATCH_SCORE_LABELS:
+            body = self._request(build_career_prompt(student_profile, name, match_score), CareerExplanationModel)
+            return CareerDetail(name=name, match_score=match_score, **body.model_dump())
+        # No usable rating to build on; ask for one with the explanation rather than invent it
+        self._count('rated_careers')
+        body = self._request(build_career_prompt(student_profile, name), RatedCareerExplanationModel)
+        return CareerDetail(name=name, **body.model_dump())
+
+    def _repair_sections(self, data: dict, student_profile: str) -> FinalSuggestionModel:
+        careers = data.get('career_alignments')
+        if not isinstance(careers, list) or not careers:
+            raise ValueError("Response has no career alignments to repair")
+        career_alignments = []
+        invalid = []  # (index, career) of the careers to re-request
+        for index, career in enumerate(careers):
+            try:
+                career_alignments.append(CareerDetail.model_validate(career))
+                continue
+            except ValidationError:
+                pass
+            if not isinstance(career, dict) or not isinstance(career.get('name'), str):
+                raise ValueError("A career without a name can't be repaired on its own")
+            career_alignments.append(None)
+            invalid.append((index, career))
+
+        try:
+            mbti_result = MbtiResultModel.model_validate(data.get('mbti_result'))
+        except ValidationError:
+            mbti_result = None
+
+        # The invalid sections are independent, so they are re-requested concurrently (as in report_fanout)
+        if invalid or mbti_result is None:
+            executor = ThreadPoolExecutor(max_workers=len(invalid) + 1)
+            try:
+                career_futures = [
+                    (index, executor.submit(self._repair_career, career, student_profile)) for index, career in invalid
+                ]
+                mbti_future = None
+                if mbti_result is None:
+                    mbti_future = executor.submit(self._request, build_mbti_prompt(student_profile), MbtiResultModel)
+                # result() re-raises a piece's failure once its own retries are exhausted
+                for index, future in career_futures:
+                    career_alignments[index] = future.result()
+                if mbti_future is not None:
+                    mbti_result = mbti_future.result()
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+        clarity_and_impact = data.get('clarity_and_impact')
+        if not isinstance(clarity_and_impact, str) or not clarity_and_impact.strip():
+            clarity_and_impact = self._request(
+                build_clarity_prompt(student_profile, mbti_result.type, career_alignments), ClarityModel
+            ).clarity_and_impact
+
+        return FinalSuggestionModel(
+            mbti_result=mbti_result,
+            career_alignments=career_alignments,
+            clarity_and_impact=clarity_and_impact
+        )
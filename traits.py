@@ -0,0 +1,138 @@
+"""
+Trait scoring.
+
+TRAIT_MAPPING comes from the question bank data file and is compiled at
+import into one bitmask per trait and option (the questions where that
+option scores that trait). Answers are scored as an AnswerSet (see
+answer_set.py): each trait count is a popcount of the answer masks ANDed
+with the trait's masks, and counts, ranking and top-N come out together.
+score_batch() and count_matrix() do the same for whole cohorts.
+"""
+from array import array
+from typing import NamedTuple
+
+from answer_set import AnswerSet
+from question_bank import load_question_bank
+
+# --- TRAIT MAPPING FOR DYNAMIC CALCULATION ---
+# Question number -> option -> trait, as defined by the question bank data file
+_QUESTION_BANK = load_question_bank()
+TRAIT_MAPPING = _QUESTION_BANK.trait_mapping()
+
+# --- Compiled trait index ---
+# Trait ids follow the order in which traits first appear in TRAIT_MAPPING.
+TRAIT_NAMES = tuple(dict.fromkeys(
+    trait for question in sorted(TRAIT_MAPPING) for trait in TRAIT_MAPPING[question].values()
+))
+TRAIT_IDS = {trait: trait_id for trait_id, trait in enumerate(TRAIT_NAMES)}
+OPTIONS = _QUESTION_BANK.option_keys
+_OPTION_SLOTS = {option: slot for slot, option in enumerate(OPTIONS)}
+MAX_QUESTION = max(TRAIT_MAPPING)
+
+# _TRAIT_MASKS[trait id][slot] has bit q set when option OPTIONS[slot] of question q scores that trait
+_TRAIT_MASKS = [[0] * len(OPTIONS) for _ in TRAIT_NAMES]
+for _question, _options in TRAIT_MAPPING.items():
+    for _option, _trait in _options.items():
+        _TRAIT_MASKS[TRAIT_IDS[_trait]][_OPTION_SLOTS[_option]] |= 1 << _question
+_TRAIT_MASKS = tuple(tuple(masks) for masks in _TRAIT_MASKS)
+
+
+class TraitScores(NamedTuple):
+    summary: dict   # trait -> count, in the order traits were first seen
+    ranking: list   # traits by descending count; ties keep first-seen order
+    top: list       # the first top_n entries of ranking
+
+
+def _trait_hits(masks):
+    """Yields, per trait id, the bitmask of answered questions that scored it."""
+    if len(masks) == 2:
+        # The usual two-option bank, unrolled
+        first, second = masks
+        for first_trait, second_trait in _TRAIT_MASKS:
+            yield (first & first_trait) | (second & second_trait)
+    else:
+        for trait_masks in _TRAIT_MASKS:
+            hits = 0
+            for mask, trait_mask in zip(masks, trait_masks):
+                hits |= mask & trait_mask
+            yield hits
+
+
+def score_answers(user_answers, top_n=5) -> TraitScores:
+    """
+    Scores one answer set with a popcount per trait.
+
+    Args:
+        user_answers: An AnswerSet, its encoded form, or a dict with question numbers
+            (int or str) as keys and 'A' or 'B' as values
+        top_n (int): Number of top traits to include in `top`
+
+    Returns:
+        TraitScores: summary counts, full ranking and top N traits
+    """
+    masks = AnswerSet.coerce(user_answers).masks
+    if not any(masks):
+        return TraitScores({}, [], [])
+    counts = [0] * len(TRAIT_NAMES)
+    first_bits = {}
+    for trait_id, hits in enumerate(_trait_hits(masks)):
+        if hits:
+            counts[trait_id] = hits.bit_count()
+            first_bits[trait_id] = hits & -hits
+
+    # "First seen" is the lowest-numbered question scoring the trait; sorted() is
+    # stable, so ties keep that order like Counter.most_common() on answers in question order
+    first_seen = sorted(first_bits, key=first_bits.__getitem__)
+    ranked_ids = sorted(first_seen, key=counts.__getitem__, reverse=True)
+    ranking = [TRAIT_NAMES[trait_id] for trait_id in ranked_ids]
+    summary = {TRAIT_NAMES[trait_id]: counts[trait_id] for trait_id in first_seen}
+    return TraitScores(summary, ranking, ranking[:top_n])
+
+
+def score_batch(answer_sets, top_n=5) -> list:
+    """Scores many answer sets (as accepted by score_answers). Returns a list of TraitScores."""
+    return [score_answers(user_answers, top_n) for user_answers in answer_sets]
+
+
+def count_matrix(answer_vectors) -> array:
+    """
+    Counts traits for a cohort of answer vectors.
+
+    Args:
+        answer_vectors (iterable of str): One string per student where character i is the
+            answer ('A' or 'B', anything else = unanswered) to question number i + 1
+
+    Returns:
+        array: Row-major counts, len(TRAIT_NAMES) columns per student
+    """
+    matrix = array('H')
+    for vector in answer_vectors:
+        matrix.extend(hits.bit_count() for hits in _trait_hits(AnswerSet.from_vector(vector).masks))
+    return matrix
+
+
+def calculate_top_traits(user_answers, top_n=5):
+    """
+    Calculate the top traits based on user answers to the assessment questions.
+    
+    Args:
+        user_answers (dict): Dictionary with question numbers as keys and 'A' or 'B' as values
+                            e.g., {1: 'A', 2: 'B', 3: 'A', ...}
+        top_n (int): Number of top traits to return (default: 5)
+    
+    Returns:
+        list: List of top N trait strings
+    """
+    return score_answers(user_answers, top_n).top
+
+def get_trait_summary(user_answers):
+    """
+    Get a summary of all traits and their frequencies.
+    
+    Args:
+        user_answers (dict): Dictionary with question numbers as keys and 'A' or 'B' as values
+    
+    Returns:
+        dict: Dictionary with traits as keys and their counts as values
+    """
+    return score_answers(user_answers).summary